@@ -11,8 +11,8 @@ def system(cmd):
    f = os.popen(cmd)
    return f.read()
 
-# Include directories
-INC_DIRS = []
+# Include directories (src contains odetimer.h)
+INC_DIRS = ["src"]
 # Library directories
 LIB_DIRS = []
 # Libraries to link with
@@ -43,8 +43,18 @@ cdef class Body:
     # (set via __getattr__ and __setattr__)
     cdef object userattribs
 
+    # The material of the body's geoms (or None) and the user data of
+    # the ODE body
+    cdef Material material
+    cdef _ObjectData odata
+
     def __cinit__(self, World world not None):
+        self.material = None
+        self.odata.wrapper = <void*>self
+        self.odata.material = NULL
         self.bid = dBodyCreate(world.wid)
+        dBodySetData(self.bid, &self.odata)
+        world._addBody(self.bid)
 
     def __init__(self, World world not None):
         """Constructor.
@@ -56,7 +66,12 @@ cdef class Body:
         self.userattribs = {}
 
     def __dealloc__(self):
+        cdef World world
+        if self.bid!=NULL:
+            dBodySetData(self.bid, NULL)
         if self.bid!=NULL and self.world:
+            world = self.world
+            world._removeBody(self.bid)
             dBodyDestroy(self.bid)
 
     def __getattr__(self, name):
@@ -74,6 +89,28 @@ cdef class Body:
         except:
             raise AttributeError, "Body object has no attribute '%s'"%name
 
+    # setMaterial
+    def setMaterial(self, Material material):
+        """setMaterial(material)
+
+        Set the surface material of the geoms that are attached to the
+        body (or remove it by passing None). A material that is set on
+        a geom takes precedence over this one.
+
+        @param material: Material or None
+        @type material: Material
+        """
+        self.material = material
+        self.odata.material = _material_data(material)
+
+    # getMaterial
+    def getMaterial(self):
+        """getMaterial() -> Material
+
+        Return the material of the body or None.
+        """
+        return self.material
+
     # setPosition
     def setPosition(self, pos):
         """setPosition(pos)
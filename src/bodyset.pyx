@@ -0,0 +1,287 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# Number of floats that are stored per body for the given state fields
+# (see BodySet.getState()).
+cdef int _state_width(int fields) except -1:
+    cdef int width
+
+    if fields & ~StateAll:
+        raise ValueError, "invalid state fields (0x%x)"%fields
+    width = 0
+    if fields & StatePosition:
+        width = width+3
+    if fields & StateQuaternion:
+        width = width+4
+    if fields & StateLinearVel:
+        width = width+3
+    if fields & StateAngularVel:
+        width = width+3
+    return width
+
+
+# BodySet
+cdef class BodySet:
+    """A fixed sequence of bodies whose state can be accessed at once.
+
+    A BodySet reads the state of all its bodies with one call, which
+    is much faster than calling getPosition(), getQuaternion(), etc.
+    on every single body. The order of the bodies is the order in
+    which they were passed to the constructor and never changes.
+
+    Constructor::
+
+      BodySet(bodies)
+
+    The set keeps a reference to every body, so the bodies won't be
+    destroyed while the set is still alive.
+    """
+
+    # The ODE body ids (one per body)
+    cdef dBodyID* bids
+    cdef int count
+    # A tuple with the Body objects
+    cdef object bodies
+
+    def __cinit__(self, bodies):
+        self.bids = NULL
+        self.count = 0
+        self.bodies = ()
+
+    def __init__(self, bodies):
+        """Constructor.
+
+        @param bodies: The bodies in the set
+        @type bodies: sequence of Body objects
+        """
+        cdef Body b
+        cdef int i, n
+
+        bodies = tuple(bodies)
+        n = len(bodies)
+        for b in bodies:
+            if b is None:
+                raise TypeError, "BodySet items must be Body objects, not None"
+
+        if n>0:
+            self.bids = <dBodyID*>malloc(n*sizeof(dBodyID))
+            if self.bids==NULL:
+                raise MemoryError("can't allocate body id array")
+        for i from 0 <= i < n:
+            b = bodies[i]
+            self.bids[i] = b.bid
+        self.count = n
+        self.bodies = bodies
+
+    def __dealloc__(self):
+        if self.bids!=NULL:
+            free(self.bids)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        return self.bodies[idx]
+
+    def __iter__(self):
+        return iter(self.bodies)
+
+    # getState
+    def getState(self, out=None, int fields=StateAll):
+        """getState(out=None, fields=StateAll) -> array
+
+        Return the state of all bodies as an array of floats with one
+        row per body. fields is a combination of StatePosition,
+        StateQuaternion, StateLinearVel and StateAngularVel and selects
+        the columns of the array. The columns always appear in this
+        order::
+
+          position (3), quaternion (4), linear vel. (3), angular vel. (3)
+
+        So with the default StateAll the result is an N x 13 array.
+
+        If out is given it must be a writable contiguous buffer of C
+        doubles with exactly N*k elements (e.g. a NumPy float64 array
+        of shape (N, k)). The state is written into this buffer and
+        out is returned. Otherwise a new array.array is returned.
+
+        @param out: Output buffer
+        @type out: buffer of doubles
+        @param fields: The state components to read
+        @type fields: int
+        """
+        cdef double* buf
+        cdef long size
+        cdef int width, i
+        cdef int pos, quat, lvel, avel
+        cdef dReal* p
+
+        width = _state_width(fields)
+        if out is None:
+            out = _newdoubles(self.count*width)
+        _getdoubles(out, 1, &buf, &size)
+        _checkcount("out", size, self.count*width)
+
+        pos = fields & StatePosition
+        quat = fields & StateQuaternion
+        lvel = fields & StateLinearVel
+        avel = fields & StateAngularVel
+        for i from 0 <= i < self.count:
+            if pos:
+                p = <dReal*>dBodyGetPosition(self.bids[i])
+                buf[0] = p[0]
+                buf[1] = p[1]
+                buf[2] = p[2]
+                buf = buf+3
+            if quat:
+                p = <dReal*>dBodyGetQuaternion(self.bids[i])
+                buf[0] = p[0]
+                buf[1] = p[1]
+                buf[2] = p[2]
+                buf[3] = p[3]
+                buf = buf+4
+            if lvel:
+                p = <dReal*>dBodyGetLinearVel(self.bids[i])
+                buf[0] = p[0]
+                buf[1] = p[1]
+                buf[2] = p[2]
+                buf = buf+3
+            if avel:
+                p = <dReal*>dBodyGetAngularVel(self.bids[i])
+                buf[0] = p[0]
+                buf[1] = p[1]
+                buf[2] = p[2]
+                buf = buf+3
+        return out
+
+    # setState
+    def setState(self, state, int fields=StateAll):
+        """setState(state, fields=StateAll)
+
+        Set the state of all bodies from an array of floats with one
+        row per body. The layout of the array is the same as the one
+        returned by getState() with the same fields argument, i.e.
+        only the selected state components are stored in each row and
+        only those components are written to the bodies.
+
+        state must be a contiguous buffer of C doubles with exactly
+        N*k elements (e.g. a NumPy float64 array of shape (N, k)).
+
+        @param state: Input buffer
+        @type state: buffer of doubles
+        @param fields: The state components to write
+        @type fields: int
+        """
+        cdef double* buf
+        cdef long size
+        cdef int width, i
+        cdef int pos, quat, lvel, avel
+        cdef dQuaternion q
+
+        width = _state_width(fields)
+        _getdoubles(state, 0, &buf, &size)
+        _checkcount("state", size, self.count*width)
+
+        pos = fields & StatePosition
+        quat = fields & StateQuaternion
+        lvel = fields & StateLinearVel
+        avel = fields & StateAngularVel
+        for i from 0 <= i < self.count:
+            if pos:
+                dBodySetPosition(self.bids[i], buf[0], buf[1], buf[2])
+                buf = buf+3
+            if quat:
+                q[0] = buf[0]
+                q[1] = buf[1]
+                q[2] = buf[2]
+                q[3] = buf[3]
+                dBodySetQuaternion(self.bids[i], q)
+                buf = buf+4
+            if lvel:
+                dBodySetLinearVel(self.bids[i], buf[0], buf[1], buf[2])
+                buf = buf+3
+            if avel:
+                dBodySetAngularVel(self.bids[i], buf[0], buf[1], buf[2])
+                buf = buf+3
+
+    # addForces
+    def addForces(self, forces):
+        """addForces(forces)
+
+        Add an external force (given in absolute coordinates) to every
+        body. forces must be a contiguous buffer of C doubles with N*3
+        elements (one row per body).
+
+        @param forces: Forces
+        @type forces: buffer of doubles
+        """
+        cdef double* buf
+        cdef long size
+        cdef int i
+
+        _getdoubles(forces, 0, &buf, &size)
+        _checkcount("forces", size, self.count*3)
+        for i from 0 <= i < self.count:
+            dBodyAddForce(self.bids[i], buf[0], buf[1], buf[2])
+            buf = buf+3
+
+    # addTorques
+    def addTorques(self, torques):
+        """addTorques(torques)
+
+        Add an external torque (given in absolute coordinates) to every
+        body. torques must be a contiguous buffer of C doubles with N*3
+        elements (one row per body).
+
+        @param torques: Torques
+        @type torques: buffer of doubles
+        """
+        cdef double* buf
+        cdef long size
+        cdef int i
+
+        _getdoubles(torques, 0, &buf, &size)
+        _checkcount("torques", size, self.count*3)
+        for i from 0 <= i < self.count:
+            dBodyAddTorque(self.bids[i], buf[0], buf[1], buf[2])
+            buf = buf+3
+
+
+def setBodyStates(bodies, state, fields=StateAll):
+    """setBodyStates(bodies, state, fields=StateAll)
+
+    Set the state of several bodies at once. bodies can be a BodySet
+    or a sequence of Body objects. See BodySet.setState() for the
+    layout of the state array.
+
+    When the same bodies are updated repeatedly, it is faster to
+    create a BodySet once and call its setState() method.
+
+    @param bodies: The bodies to modify
+    @type bodies: BodySet or sequence of Body objects
+    @param state: Input buffer
+    @type state: buffer of doubles
+    @param fields: The state components to write
+    @type fields: int
+    """
+    if not isinstance(bodies, BodySet):
+        bodies = BodySet(bodies)
+    bodies.setState(state, fields)
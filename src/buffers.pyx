@@ -0,0 +1,126 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# Helpers for the methods that read or write whole arrays of values at
+# once (e.g. BodySet.getState()). The arrays can be any object that
+# supports the buffer interface (NumPy arrays, array.array objects, ...)
+# as long as their memory is contiguous. Float arrays must contain C
+# doubles (e.g. numpy.float64 or array typecode 'd'), integer arrays
+# must contain C longs (e.g. numpy.int_ or array typecode 'l'). Arrays
+# with another item type are rejected with a TypeError.
+# Multi-dimensional arrays are stored in row-major order.
+
+import array
+
+# _format_ok
+cdef int _format_ok(char* fmt, char typecode):
+    """Check a buffer format string against the typecode 'd' or 'l'.
+
+    Only native byte order is accepted. For 'l' all signed integer
+    formats are accepted (the item size is checked by the caller).
+    """
+    if fmt==NULL:
+        return 0
+    if fmt[0]==c'@' or fmt[0]==c'=':
+        fmt = fmt+1
+    if fmt[0]==0 or fmt[1]!=0:
+        return 0
+    if typecode==c'l':
+        return fmt[0]==c'l' or fmt[0]==c'q' or fmt[0]==c'i'
+    return fmt[0]==typecode
+
+# _getbuffer
+cdef int _getbuffer(object obj, int writable, char typecode, char* typename,
+                    int itemsize, void** data, long* count) except -1:
+    """Get a pointer to the memory of an array of doubles or longs.
+
+    typecode is 'd' (C double) or 'l' (C long), typename the name of
+    the C type (for error messages) and itemsize the size of one
+    item. The number of items is stored in count. A TypeError is
+    raised if the array has a different item type, so that e.g. a
+    float32 array with the same number of bytes isn't misread.
+    """
+    cdef Py_buffer view
+    cdef void* buf
+    cdef Py_ssize_t size
+    cdef int flags, ok
+
+    if PyObject_CheckBuffer(obj):
+        flags = PyBUF_FORMAT|PyBUF_C_CONTIGUOUS
+        if writable:
+            flags = flags|PyBUF_WRITABLE
+        PyObject_GetBuffer(obj, &view, flags)
+        ok = view.itemsize==itemsize and _format_ok(view.format, typecode)
+        # The pointer stays valid as long as the caller holds obj and
+        # doesn't resize it (the view isn't kept beyond this call)
+        buf = view.buf
+        size = view.len
+        PyBuffer_Release(&view)
+        if not ok:
+            raise TypeError, "array must contain C %ss (typecode '%c')"%(typename, typecode)
+    else:
+        # Old-style buffer (e.g. array.array in Python 2): the item type
+        # can only be checked for array objects
+        if getattr(obj, "typecode", None)!="%c"%typecode:
+            raise TypeError, "array must contain C %ss (typecode '%c')"%(typename, typecode)
+        if writable:
+            PyObject_AsWriteBuffer(obj, &buf, &size)
+        else:
+            PyObject_AsReadBuffer(obj, &buf, &size)
+        if size%itemsize!=0:
+            raise ValueError, "buffer size (%d bytes) is not a multiple of the item size"%size
+    data[0] = buf
+    count[0] = size/itemsize
+    return 0
+
+# _getdoubles
+cdef int _getdoubles(object obj, int writable, double** data, long* count) except -1:
+    """Get a pointer to the memory of an array of doubles.
+
+    The number of doubles in the array is stored in count.
+    """
+    return _getbuffer(obj, writable, c'd', "double", sizeof(double), <void**>data, count)
+
+# _getlongs
+cdef int _getlongs(object obj, int writable, long** data, long* count) except -1:
+    """Get a pointer to the memory of an array of longs.
+
+    The number of longs in the array is stored in count.
+    """
+    return _getbuffer(obj, writable, c'l', "long", sizeof(long), <void**>data, count)
+
+# _checkcount
+cdef int _checkcount(char* name, long count, long expected) except -1:
+    """Raise a ValueError if an array doesn't have the expected size.
+    """
+    if count!=expected:
+        raise ValueError, "%s must contain %d values (got %d)"%(name, expected, count)
+    return 0
+
+cdef object _newdoubles(long n):
+    """Return a new array.array with n doubles (initialized to 0).
+    """
+    return array.array('d', [0.0])*n
+
+cdef object _newlongs(long n):
+    """Return a new array.array with n longs (initialized to 0).
+    """
+    return array.array('l', [0])*n
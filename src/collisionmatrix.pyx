@@ -0,0 +1,234 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# Data of a collision matrix that is used by the native near callbacks.
+cdef struct _CollisionMatrixData:
+    # Number of categories
+    int n
+    # n*n flags: Do the categories collide?
+    char* enabled
+    # n*n flags: Does the cell have its own surface parameters?
+    char* custom
+    # n*n surface parameters
+    dSurfaceParameters* surfaces
+
+# _geom_category
+cdef int _geom_category(dGeomID g, int n) nogil:
+    """Return the category index of a geom or -1.
+
+    The category index is the index of the lowest bit that is set in the
+    category bits of the geom. -1 is returned if none of the lowest n
+    bits is set.
+    """
+    cdef unsigned long bits
+    cdef int i
+
+    bits = dGeomGetCategoryBits(g)
+    i = 0
+    while i<n:
+        if bits & ((<unsigned long>1)<<i):
+            return i
+        i = i+1
+    return -1
+
+# _matrix_cell
+cdef int _matrix_cell(_CollisionMatrixData* m, dGeomID o1, dGeomID o2) nogil:
+    """Return the index of the matrix cell of a geom pair or -1.
+
+    -1 is returned if one of the geoms has no category in the matrix.
+    """
+    cdef int c1, c2
+
+    c1 = _geom_category(o1, m.n)
+    if c1<0:
+        return -1
+    c2 = _geom_category(o2, m.n)
+    if c2<0:
+        return -1
+    return c1*m.n+c2
+
+# CollisionMatrix
+cdef class CollisionMatrix:
+    """Collision rules between geom categories.
+
+    A collision matrix stores for every pair of categories whether geoms
+    of these categories may collide and, optionally, the surface
+    parameters of their contacts. The matrix is attached to a space
+    with SpaceBase.setCollisionMatrix() and is then evaluated in C by
+    SpaceBase.collide(), SpaceBase.collideIntoJointGroup(),
+    World.collideStep() and WorldBatch.step(). SpaceBase.collide() only
+    applies the enable flags, the surface parameters are only used by
+    the methods that create the contact joints in C.
+
+    The category of a geom is the index of the lowest bit that is set in
+    its category bits (see GeomObject.setCategoryBits()), so a geom with
+    the category bits 1<<5 belongs to category 5. Geoms whose category
+    is outside of the matrix are not affected by it. The matrix is
+    always symmetric.
+
+    Initially all categories collide and use the surface parameters of
+    the contact template that was passed to the collision method.
+
+    Constructor::
+
+      CollisionMatrix(n=32)
+    """
+
+    cdef _CollisionMatrixData data
+
+    def __cinit__(self, int n=32):
+        cdef long size
+
+        self.data.enabled = NULL
+        self.data.custom = NULL
+        self.data.surfaces = NULL
+        self.data.n = 0
+        if n<1 or n>8*sizeof(unsigned long):
+            raise ValueError, "the number of categories must be between 1 and %d"%(8*sizeof(unsigned long))
+        size = n*n
+        self.data.enabled = <char*>malloc(size)
+        self.data.custom = <char*>malloc(size)
+        self.data.surfaces = <dSurfaceParameters*>malloc(size*sizeof(dSurfaceParameters))
+        if self.data.enabled==NULL or self.data.custom==NULL or self.data.surfaces==NULL:
+            raise MemoryError("can't allocate collision matrix")
+        memset(self.data.enabled, 1, size)
+        memset(self.data.custom, 0, size)
+        memset(self.data.surfaces, 0, size*sizeof(dSurfaceParameters))
+        self.data.n = n
+
+    def __init__(self, int n=32):
+        pass
+
+    def __dealloc__(self):
+        free(self.data.enabled)
+        free(self.data.custom)
+        free(self.data.surfaces)
+
+    cdef int _check(self, int c1, int c2) except -1:
+        if c1<0 or c1>=self.data.n or c2<0 or c2>=self.data.n:
+            raise IndexError, "category index out of range"
+        return 0
+
+    # getNumCategories
+    def getNumCategories(self):
+        """getNumCategories() -> int
+
+        Return the number of categories.
+        """
+        return self.data.n
+
+    # setEnabled
+    def setEnabled(self, int c1, int c2, flag):
+        """setEnabled(c1, c2, flag)
+
+        Enable or disable the collisions between the categories c1 and
+        c2.
+
+        @param c1: First category index
+        @type c1: int
+        @param c2: Second category index
+        @type c2: int
+        @param flag: True = geoms of the categories collide
+        @type flag: bool
+        """
+        cdef char f
+
+        self._check(c1, c2)
+        f = 0
+        if flag:
+            f = 1
+        self.data.enabled[c1*self.data.n+c2] = f
+        self.data.enabled[c2*self.data.n+c1] = f
+
+    # isEnabled
+    def isEnabled(self, int c1, int c2):
+        """isEnabled(c1, c2) -> bool
+
+        Return True if the categories c1 and c2 collide.
+
+        @param c1: First category index
+        @type c1: int
+        @param c2: Second category index
+        @type c2: int
+        """
+        self._check(c1, c2)
+        return bool(self.data.enabled[c1*self.data.n+c2])
+
+    # setSurface
+    def setSurface(self, int c1, int c2, Contact contact):
+        """setSurface(c1, c2, contact)
+
+        Set the surface parameters (mode, mu, bounce, soft ERP/CFM, ...)
+        of the contacts between the categories c1 and c2. The
+        parameters are copied from a Contact object. If contact is None
+        the contacts use the template of the collision method again.
+
+        @param c1: First category index
+        @type c1: int
+        @param c2: Second category index
+        @type c2: int
+        @param contact: Contact that holds the surface parameters or None
+        @type contact: Contact
+        """
+        cdef int k1, k2
+
+        self._check(c1, c2)
+        k1 = c1*self.data.n+c2
+        k2 = c2*self.data.n+c1
+        if contact is None:
+            self.data.custom[k1] = 0
+            self.data.custom[k2] = 0
+        else:
+            self.data.surfaces[k1] = contact._contact.surface
+            self.data.surfaces[k2] = contact._contact.surface
+            self.data.custom[k1] = 1
+            self.data.custom[k2] = 1
+
+    # getSurface
+    def getSurface(self, int c1, int c2):
+        """getSurface(c1, c2) -> Contact or None
+
+        Return a Contact object with the surface parameters of the
+        categories c1 and c2 or None if the cell has no surface
+        parameters of its own.
+
+        @param c1: First category index
+        @type c1: int
+        @param c2: Second category index
+        @type c2: int
+        """
+        cdef Contact c
+        cdef int k
+
+        self._check(c1, c2)
+        k = c1*self.data.n+c2
+        if not self.data.custom[k]:
+            return None
+        c = Contact()
+        c._contact.surface = self.data.surfaces[k]
+        return c
+
+# _matrix_data
+cdef _CollisionMatrixData* _matrix_data(CollisionMatrix matrix):
+    """Return a pointer to the data of a matrix (NULL for None)."""
+    if matrix is None:
+        return NULL
+    return &matrix.data
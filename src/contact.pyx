@@ -293,16 +293,12 @@ cdef class Contact:
         where pos and normal are 3-tuples of floats and depth is a single
         float. geom1 and geom2 are the Geom objects of the geoms in contact.
         """
-        cdef long id1, id2
-
         pos = (self._contact.geom.pos[0], self._contact.geom.pos[1], self._contact.geom.pos[2])
         normal = (self._contact.geom.normal[0], self._contact.geom.normal[1], self._contact.geom.normal[2])
         depth = self._contact.geom.depth
 
-        id1 = <long>self._contact.geom.g1
-        id2 = <long>self._contact.geom.g2
-        g1 = _geom_c2py_lut[id1]
-        g2 = _geom_c2py_lut[id2]
+        g1 = _geom_c2py(self._contact.geom.g1)
+        g2 = _geom_c2py(self._contact.geom.g2)
         return (pos,normal,depth,g1,g2)
 
     # setContactGeomParams
@@ -0,0 +1,272 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# ContactBuffer
+cdef class ContactBuffer:
+    """An array of contacts that is filled in place by collide().
+
+    A ContactBuffer holds a fixed number of dContact structures (see the
+    Contact class). Passing it to collide() stores the generated
+    contacts directly in the buffer instead of creating a new list of
+    Contact objects, so a near callback can reuse the same buffer for
+    every pair:
+
+     >>> buf = ode.ContactBuffer(16)
+     >>> buf.setSurface(template)
+     >>> def near_callback(args, geom1, geom2):
+     ...     n = ode.collide(geom1, geom2, buf)
+     ...     buf.createJoints(world, contactgroup, 0, n)
+
+    Note that collide() only overwrites the geom part of the contacts,
+    the surface parameters and the friction direction stay as they
+    were set via setSurface() or item assignment.
+
+    The buffer remembers the number of contacts that the last
+    collide() call stored (see getNumContacts()). applyMaterials() and
+    createJoints() only operate on these contacts, so stale entries
+    from earlier calls (whose geoms may have been destroyed in the
+    meantime) are never used.
+
+    Constructor::
+
+      ContactBuffer(capacity=150)
+    """
+
+    cdef dContact* contacts
+    cdef int capacity
+    # Number of valid contacts (set by collide())
+    cdef int ncontacts
+
+    def __cinit__(self, int capacity=150):
+        cdef int i
+
+        self.contacts = NULL
+        self.capacity = 0
+        self.ncontacts = 0
+        if capacity<1 or capacity>0xffff:
+            raise ValueError, "capacity must be between 1 and 65535"
+        self.contacts = <dContact*>malloc(capacity*sizeof(dContact))
+        if self.contacts==NULL:
+            raise MemoryError("can't allocate contact buffer")
+        memset(self.contacts, 0, capacity*sizeof(dContact))
+        for i from 0 <= i < capacity:
+            self.contacts[i].surface.mode = ContactBounce
+            self.contacts[i].surface.mu = dInfinity
+            self.contacts[i].surface.bounce = 0.1
+        self.capacity = capacity
+
+    def __init__(self, int capacity=150):
+        pass
+
+    def __dealloc__(self):
+        if self.contacts!=NULL:
+            free(self.contacts)
+
+    def __len__(self):
+        return self.capacity
+
+    cdef int _index(self, int i) except -1:
+        if i<0:
+            i = i+self.capacity
+        if i<0 or i>=self.capacity:
+            raise IndexError, "contact index out of range"
+        return i
+
+    cdef int _range(self, int start, int count) except -1:
+        """Check a range of contacts and return the number of contacts."""
+        if start<0 or start>self.capacity:
+            raise IndexError, "contact index out of range"
+        if count<0:
+            count = self.capacity-start
+        if start+count>self.capacity:
+            raise IndexError, "contact range exceeds the buffer capacity"
+        return count
+
+    cdef int _validrange(self, int start, int count) except -1:
+        """Check a range of valid contacts and return the number of contacts."""
+        if start<0 or start>self.ncontacts:
+            raise IndexError, "contact index out of range"
+        if count<0:
+            count = self.ncontacts-start
+        if start+count>self.ncontacts:
+            raise IndexError, "contact range exceeds the number of contacts (%d)"%self.ncontacts
+        return count
+
+    def __getitem__(self, int i):
+        """Return a copy of contact i as a Contact object."""
+        cdef Contact c
+
+        i = self._index(i)
+        c = Contact()
+        c._contact = self.contacts[i]
+        return c
+
+    def __setitem__(self, int i, Contact c not None):
+        """Overwrite contact i with the values of a Contact object.
+
+        The contacts up to i become valid (see getNumContacts()).
+        """
+        i = self._index(i)
+        self.contacts[i] = c._contact
+        if i>=self.ncontacts:
+            self.ncontacts = i+1
+
+    # getCapacity
+    def getCapacity(self):
+        """getCapacity() -> int
+
+        Return the number of contacts the buffer can hold.
+        """
+        return self.capacity
+
+    # getNumContacts
+    def getNumContacts(self):
+        """getNumContacts() -> int
+
+        Return the number of contacts that were stored by the last
+        collide() call.
+        """
+        return self.ncontacts
+
+    # setSurface
+    def setSurface(self, Contact contact not None, int start=0, int count=-1):
+        """setSurface(contact, start=0, count=-1)
+
+        Copy the surface parameters and the friction direction of a
+        Contact object into the contacts start..start+count-1 (count=-1
+        means up to the end of the buffer).
+
+        @param contact: The contact that holds the surface parameters
+        @type contact: Contact
+        @param start: Index of the first contact
+        @type start: int
+        @param count: Number of contacts
+        @type count: int
+        """
+        cdef int i
+
+        count = self._range(start, count)
+        for i from start <= i < start+count:
+            self.contacts[i].surface = contact._contact.surface
+            self.contacts[i].fdir1[0] = contact._contact.fdir1[0]
+            self.contacts[i].fdir1[1] = contact._contact.fdir1[1]
+            self.contacts[i].fdir1[2] = contact._contact.fdir1[2]
+
+    # getContactGeomParams
+    def getContactGeomParams(self, int i):
+        """getContactGeomParams(i) -> (pos, normal, depth, geom1, geom2)
+
+        Get the ContactGeom structure of contact i (see
+        Contact.getContactGeomParams()).
+
+        @param i: Contact index
+        @type i: int
+        """
+        cdef dContactGeom* g
+
+        i = self._index(i)
+        g = &self.contacts[i].geom
+        pos = (g.pos[0], g.pos[1], g.pos[2])
+        normal = (g.normal[0], g.normal[1], g.normal[2])
+        return (pos, normal, g.depth, _geom_c2py(g.g1), _geom_c2py(g.g2))
+
+    # applyMaterials
+    def applyMaterials(self, int start=0, int count=-1,
+                       int combine=_COMBINE_AVERAGE):
+        """applyMaterials(start=0, count=-1, combine=MaterialCombineAverage) -> int
+
+        Set the surface parameters of the contacts start..start+count-1
+        (count=-1 means all contacts of the last collide() call) from
+        the materials of the geoms in contact (see Material). Contacts
+        where none of the geoms has a material are left unchanged. The
+        number of modified contacts is returned.
+
+        @param start: Index of the first contact
+        @type start: int
+        @param count: Number of contacts
+        @type count: int
+        @param combine: Combine rule (MaterialCombineXyz)
+        @type combine: int
+        """
+        cdef dContact* c
+        cdef int i, n
+
+        count = self._validrange(start, count)
+        n = 0
+        for i from start <= i < start+count:
+            c = self.contacts+i
+            if c.geom.g1!=NULL and c.geom.g2!=NULL:
+                n = n+_material_surface(&c.surface, c.geom.g1, c.geom.g2, combine)
+        return n
+
+    # createJoints
+    def createJoints(self, World world not None, JointGroup jointgroup not None,
+                     int start=0, int count=-1):
+        """createJoints(world, jointgroup, start=0, count=-1) -> int
+
+        Create a contact joint for each of the contacts
+        start..start+count-1 (count=-1 means all contacts of the last
+        collide() call) and attach it to the bodies of the two geoms in
+        contact. The range must not exceed the contacts stored by the
+        last collide() call (IndexError). Contacts where both geoms
+        belong to the same body (or to no body at all) are skipped.
+        The joints are only accessible through the joint group, no
+        ContactJoint objects are created. The number of created joints
+        is returned.
+
+        @param world: The world in which the joints are created
+        @type world: World
+        @param jointgroup: The joint group that receives the joints
+        @type jointgroup: JointGroup
+        @param start: Index of the first contact
+        @type start: int
+        @param count: Number of contacts
+        @type count: int
+        """
+        cdef dJointID j
+        cdef dContact* c
+        cdef dBodyID b1, b2
+        cdef int i, n
+        cdef double t
+
+        count = self._validrange(start, count)
+        if _profiling:
+            t = pyode_timer()
+        n = 0
+        for i from start <= i < start+count:
+            c = self.contacts+i
+            b1 = NULL
+            b2 = NULL
+            if c.geom.g1!=NULL:
+                b1 = dGeomGetBody(c.geom.g1)
+            if c.geom.g2!=NULL:
+                b2 = dGeomGetBody(c.geom.g2)
+            # ODE doesn't allow a joint between a body and itself
+            if b1==b2:
+                continue
+            j = dJointCreateContact(world.wid, jointgroup.gid, c)
+            dJointAttach(j, b1, b2)
+            n = n+1
+        jointgroup._added(n)
+        if _profiling:
+            _profile.joints = _profile.joints+pyode_timer()-t
+            _profile.njoints = _profile.njoints+n
+        return n
@@ -22,11 +22,32 @@
 cdef extern from "stdlib.h":
 
     void* malloc(long)
+    void* realloc(void*, long) nogil
     void free(void*)
 
+cdef extern from "string.h":
+    void* memmove(void*, void*, long)
+    void* memset(void*, int, long)
+
 cdef extern from "stdio.h":
     int printf(char*)
 
+cdef extern from "Python.h":
+    int PyObject_AsReadBuffer(object obj, void** buffer, Py_ssize_t* buffer_len) except -1
+    int PyObject_AsWriteBuffer(object obj, void** buffer, Py_ssize_t* buffer_len) except -1
+
+    ctypedef struct Py_buffer:
+        void* buf
+        Py_ssize_t len
+        Py_ssize_t itemsize
+        char* format
+    int PyObject_CheckBuffer(object obj)
+    int PyObject_GetBuffer(object obj, Py_buffer* view, int flags) except -1
+    void PyBuffer_Release(Py_buffer* view)
+    cdef extern int PyBUF_WRITABLE
+    cdef extern int PyBUF_FORMAT
+    cdef extern int PyBUF_C_CONTIGUOUS
+
 # Include the basic floating point type -> dReal  (either float or double)
 #include "_precision.pyx"
     
@@ -71,6 +92,18 @@ cdef extern from "ode/ode.h":
     cdef extern dReal dInfinity
     cdef extern int dAMotorUser
     cdef extern int dAMotorEuler
+    cdef extern int dAllocateMaskAll
+    cdef extern int dJointTypeContact
+    cdef extern int dSphereClass
+    cdef extern int dBoxClass
+    cdef extern int dCapsuleClass
+    cdef extern int dPlaneClass
+    cdef extern int dSAP_AXES_XYZ
+    cdef extern int dSAP_AXES_XZY
+    cdef extern int dSAP_AXES_YXZ
+    cdef extern int dSAP_AXES_YZX
+    cdef extern int dSAP_AXES_ZXY
+    cdef extern int dSAP_AXES_ZYX
 
     ctypedef struct dMass:
         dReal    mass
@@ -116,6 +149,8 @@ cdef extern from "ode/ode.h":
 
     void dCloseODE()
     void dInitODE()
+    int dAllocateODEDataForThread(unsigned int uiAllocateFlags)
+    void dCleanupODEAllDataForThread()
 
     void dWorldSetGravity (dWorldID, dReal x, dReal y, dReal z)
     void dWorldGetGravity (dWorldID, dVector3 gravity)
@@ -123,8 +158,8 @@ cdef extern from "ode/ode.h":
     dReal dWorldGetERP (dWorldID)
     void dWorldSetCFM (dWorldID, dReal cfm)
     dReal dWorldGetCFM (dWorldID)
-    void dWorldStep (dWorldID, dReal stepsize)
-    void dWorldQuickStep (dWorldID, dReal stepsize)
+    void dWorldStep (dWorldID, dReal stepsize) nogil
+    void dWorldQuickStep (dWorldID, dReal stepsize) nogil
     void dWorldSetQuickStepNumIterations (dWorldID, int num)
     int dWorldGetQuickStepNumIterations (dWorldID)
     void dWorldSetContactMaxCorrectingVel (dWorldID, dReal vel)
@@ -151,9 +186,10 @@ cdef extern from "ode/ode.h":
     # Body
     dBodyID dBodyCreate (dWorldID)
     void dBodyDestroy (dBodyID)
+    dWorldID dBodyGetWorld (dBodyID)
 
     void  dBodySetData (dBodyID, void *data)
-    void *dBodyGetData (dBodyID)
+    void *dBodyGetData (dBodyID) nogil
 
     void dBodySetPosition   (dBodyID, dReal x, dReal y, dReal z)
     void dBodySetRotation   (dBodyID, dMatrix3 R)
@@ -206,11 +242,18 @@ cdef extern from "ode/ode.h":
 
     void dBodyEnable (dBodyID)
     void dBodyDisable (dBodyID)
-    int dBodyIsEnabled (dBodyID)
+    int dBodyIsEnabled (dBodyID) nogil
 
     void dBodySetGravityMode (dBodyID b, int mode)
     int dBodyGetGravityMode (dBodyID b)
 
+    void dBodySetAutoDisableFlag (dBodyID, int do_auto_disable)
+    int dBodyGetAutoDisableFlag (dBodyID)
+    void dBodySetAutoDisableSteps (dBodyID, int steps)
+    int dBodyGetAutoDisableSteps (dBodyID)
+    void dBodySetAutoDisableTime (dBodyID, dReal time)
+    dReal dBodyGetAutoDisableTime (dBodyID)
+
     void dBodySetDynamic (dBodyID)
     void dBodySetKinematic (dBodyID)
     int dBodyIsKinematic (dBodyID)
@@ -219,7 +262,7 @@ cdef extern from "ode/ode.h":
     dJointID dJointCreateBall (dWorldID, dJointGroupID)
     dJointID dJointCreateHinge (dWorldID, dJointGroupID)
     dJointID dJointCreateSlider (dWorldID, dJointGroupID)
-    dJointID dJointCreateContact (dWorldID, dJointGroupID, dContact *)
+    dJointID dJointCreateContact (dWorldID, dJointGroupID, dContact *) nogil
     dJointID dJointCreateUniversal (dWorldID, dJointGroupID)
     dJointID dJointCreatePR (dWorldID, dJointGroupID)
     dJointID dJointCreatePiston (dWorldID, dJointGroupID)
@@ -235,11 +278,11 @@ cdef extern from "ode/ode.h":
 
     dJointGroupID dJointGroupCreate (int max_size)
     void dJointGroupDestroy (dJointGroupID)
-    void dJointGroupEmpty (dJointGroupID)
+    void dJointGroupEmpty (dJointGroupID) nogil
 
-    void dJointAttach (dJointID, dBodyID body1, dBodyID body2)
+    void dJointAttach (dJointID, dBodyID body1, dBodyID body2) nogil
     void dJointEnable (dJointID)
-    void dJointDisable (dJointID)
+    void dJointDisable (dJointID) nogil
     int dJointIsEnabled (dJointID)
     void dJointSetData (dJointID, void *data)
     void *dJointGetData (dJointID)
@@ -365,9 +408,10 @@ cdef extern from "ode/ode.h":
     void dJointSetPlane2DAngleParam (dJointID, int parameter, dReal value)
 
     void dJointSetFeedback (dJointID, dJointFeedback *)
-    dJointFeedback *dJointGetFeedback (dJointID)
+    dJointFeedback *dJointGetFeedback (dJointID) nogil
 
     int dAreConnected (dBodyID, dBodyID)
+    int dAreConnectedExcluding (dBodyID, dBodyID, int joint_type) nogil
 
     # Mass
     void dMassSetZero (dMass *)
@@ -401,13 +445,14 @@ cdef extern from "ode/ode.h":
     dSpaceID dHashSpaceCreate(dSpaceID space)
     dSpaceID dQuadTreeSpaceCreate (dSpaceID space, dVector3 Center,
                                    dVector3 Extents, int Depth)
+    dSpaceID dSweepAndPruneSpaceCreate (dSpaceID space, int axisorder)
 
     void dSpaceDestroy (dSpaceID)
     void dSpaceAdd (dSpaceID, dGeomID)
     void dSpaceRemove (dSpaceID, dGeomID)
     int dSpaceQuery (dSpaceID, dGeomID)
-    void dSpaceCollide (dSpaceID space, void *data, dNearCallback *callback)
-    void dSpaceCollide2 (dGeomID o1, dGeomID o2, void *data, dNearCallback *callback)
+    void dSpaceCollide (dSpaceID space, void *data, dNearCallback *callback) nogil
+    void dSpaceCollide2 (dGeomID o1, dGeomID o2, void *data, dNearCallback *callback) nogil
 
     void dHashSpaceSetLevels (dSpaceID space, int minlevel, int maxlevel)
     void dHashSpaceGetLevels (dSpaceID space, int *minlevel, int *maxlevel)
@@ -415,8 +460,8 @@ cdef extern from "ode/ode.h":
     void dSpaceSetCleanup (dSpaceID space, int mode)
     int dSpaceGetCleanup (dSpaceID space)
 
-    int dSpaceGetNumGeoms (dSpaceID)
-    dGeomID dSpaceGetGeom (dSpaceID, int i)
+    int dSpaceGetNumGeoms (dSpaceID) nogil
+    dGeomID dSpaceGetGeom (dSpaceID, int i) nogil
 
     # Geom
     dGeomID dCreateSphere (dSpaceID space, dReal radius)
@@ -438,22 +483,22 @@ cdef extern from "ode/ode.h":
     void  dGeomCapsuleGetParams (dGeomID ccylinder, dReal *radius, dReal *length)
     void  dGeomCylinderGetParams (dGeomID ccylinder, dReal *radius, dReal *length)
 
-    dReal dGeomSpherePointDepth (dGeomID sphere, dReal x, dReal y, dReal z)
-    dReal dGeomBoxPointDepth (dGeomID box, dReal x, dReal y, dReal z)
-    dReal dGeomPlanePointDepth (dGeomID plane, dReal x, dReal y, dReal z)
-    dReal dGeomCapsulePointDepth (dGeomID ccylinder, dReal x, dReal y, dReal z)
+    dReal dGeomSpherePointDepth (dGeomID sphere, dReal x, dReal y, dReal z) nogil
+    dReal dGeomBoxPointDepth (dGeomID box, dReal x, dReal y, dReal z) nogil
+    dReal dGeomPlanePointDepth (dGeomID plane, dReal x, dReal y, dReal z) nogil
+    dReal dGeomCapsulePointDepth (dGeomID ccylinder, dReal x, dReal y, dReal z) nogil
 
     dGeomID dCreateRay (dSpaceID space, dReal length)
-    void dGeomRaySetLength (dGeomID ray, dReal length)
+    void dGeomRaySetLength (dGeomID ray, dReal length) nogil
     dReal dGeomRayGetLength (dGeomID ray)
     void dGeomRaySet (dGeomID ray, dReal px, dReal py, dReal pz,
-          dReal dx, dReal dy, dReal dz)
+          dReal dx, dReal dy, dReal dz) nogil
     void dGeomRayGet (dGeomID ray, dVector3 start, dVector3 dir)
 
     void dGeomSetData (dGeomID, void *)
-    void *dGeomGetData (dGeomID)
+    void *dGeomGetData (dGeomID) nogil
     void dGeomSetBody (dGeomID, dBodyID)
-    dBodyID dGeomGetBody (dGeomID)
+    dBodyID dGeomGetBody (dGeomID) nogil
     void dGeomSetPosition (dGeomID, dReal x, dReal y, dReal z)
     void dGeomSetRotation (dGeomID, dMatrix3 R)
     void dGeomSetQuaternion (dGeomID, dQuaternion)
@@ -461,20 +506,20 @@ cdef extern from "ode/ode.h":
     dReal * dGeomGetRotation (dGeomID)
     void dGeomGetQuaternion (dGeomID, dQuaternion result)
     void dGeomDestroy (dGeomID)
-    void dGeomGetAABB (dGeomID, dReal aabb[6])
+    void dGeomGetAABB (dGeomID, dReal aabb[6]) nogil
     dReal *dGeomGetSpaceAABB (dGeomID)
-    int dGeomIsSpace (dGeomID)
+    int dGeomIsSpace (dGeomID) nogil
     dSpaceID dGeomGetSpace (dGeomID)
-    int dGeomGetClass (dGeomID)
+    int dGeomGetClass (dGeomID) nogil
 
     void dGeomSetCategoryBits(dGeomID, unsigned long bits)
     void dGeomSetCollideBits(dGeomID, unsigned long bits)
-    unsigned long dGeomGetCategoryBits(dGeomID)
+    unsigned long dGeomGetCategoryBits(dGeomID) nogil
     unsigned long dGeomGetCollideBits(dGeomID)     
 
     void dGeomEnable (dGeomID)
     void dGeomDisable (dGeomID)
-    int dGeomIsEnabled (dGeomID)
+    int dGeomIsEnabled (dGeomID) nogil
 
     void dGeomGroupAdd (dGeomID group, dGeomID x)
     void dGeomGroupRemove (dGeomID group, dGeomID x)
@@ -489,7 +534,7 @@ cdef extern from "ode/ode.h":
     void dGeomTransformSetInfo (dGeomID g, int mode)
     int dGeomTransformGetInfo (dGeomID g)
 
-    int dCollide (dGeomID o1, dGeomID o2, int flags, dContactGeom *contact, int skip)
+    int dCollide (dGeomID o1, dGeomID o2, int flags, dContactGeom *contact, int skip) nogil
 
     # Trimesh
     dTriMeshDataID dGeomTriMeshDataCreate()
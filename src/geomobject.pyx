@@ -19,10 +19,10 @@
 # LICENSE and LICENSE-BSD for more details. 
 ######################################################################
 
-# Each geom object has to insert itself into the global dictionary
-# _geom_c2py_lut (key:address - value:Python object).
-# This lookup table is used in the near callback to translate the C
-# pointers into corresponding Python wrapper objects.
+# Each geom object has to store a pointer to its odata struct in the
+# user data slot of its ODE geom (dGeomSetData(gid, &self.odata)).
+# This struct is used (via _geom_c2py()) in the near callback to
+# translate the C pointers into corresponding Python wrapper objects.
 #
 # Additionally, each geom object must have a method _id() that returns
 # the ODE geom id. This is used during collision detection.
@@ -35,6 +35,10 @@
 # # C pointers into Python objects (this is used in the near callback).
 
 
+# Stamp used to number the geoms that appear in the result of an
+# array based query (see _index_geoms()). Incremented for every query.
+cdef long _geom_stamp
+
 # Geom base class
 cdef class GeomObject:
     """This is the abstract base class for all geom objects.
@@ -54,11 +58,25 @@ cdef class GeomObject:
 
     cdef object __weakref__
 
+    # Index of the geom in the geom list of the last array based query
+    # (only valid if _stamp is equal to _geom_stamp).
+    cdef long _stamp
+    cdef long _index
+
+    # The material of the geom (or None) and the user data of the ODE geom
+    cdef Material material
+    cdef _ObjectData odata
+
     def __cinit__(self, *a, **kw):
         self.gid = NULL
         self.space = None
         self.body = None
         self.attribs = {}
+        self._stamp = 0
+        self._index = 0
+        self.material = None
+        self.odata.wrapper = <void*>self
+        self.odata.material = NULL
 
     def __init__(self, *a, **kw):
         raise NotImplementedError, "The GeomObject base class can't be used directly."
@@ -252,6 +270,26 @@ cdef class GeomObject:
         or return None if it is not contained in any space."""        
         return self.space
 
+    def setMaterial(self, Material material):
+        """setMaterial(material)
+
+        Set the surface material of the geom (or remove it by passing
+        None). Without a material of its own the geom uses the material
+        of its body (see Material).
+
+        @param material: Material or None
+        @type material: Material
+        """
+        self.material = material
+        self.odata.material = _material_data(material)
+
+    def getMaterial(self):
+        """getMaterial() -> Material
+
+        Return the material of the geom or None.
+        """
+        return self.material
+
     def setCollideBits(self, bits):
         """setCollideBits(bits)
 
@@ -305,4 +343,69 @@ cdef class GeomObject:
         return dGeomIsEnabled(self.gid)
 
 
+# _index_geoms
+cdef object _index_geoms(dGeomID* gids, long n, long* idx):
+    """Translate geom ids into indices.
 
+    Each of the n geom ids in gids is replaced by an index into a list
+    of geom objects where each geom appears only once. The indices are
+    written into idx and the list is returned.
+    """
+    global _geom_stamp
+    cdef GeomObject g
+    cdef long i
+
+    _geom_stamp = _geom_stamp+1
+    geoms = []
+    for i from 0 <= i < n:
+        g = _geom_c2py(gids[i])
+        if g._stamp!=_geom_stamp:
+            g._stamp = _geom_stamp
+            g._index = len(geoms)
+            geoms.append(g)
+        idx[i] = g._index
+    return geoms
+
+# _has_point_depth
+cdef int _has_point_depth(dGeomID gid) nogil:
+    """Return True if the geom class has a point depth function."""
+    cdef int cls
+    cls = dGeomGetClass(gid)
+    return (cls==dSphereClass or cls==dBoxClass or cls==dCapsuleClass
+            or cls==dPlaneClass)
+
+# _point_depth
+cdef dReal _point_depth(dGeomID gid, dReal x, dReal y, dReal z) nogil:
+    """Return the depth of a point in a sphere, box, capsule or plane."""
+    cdef int cls
+    cls = dGeomGetClass(gid)
+    if cls==dSphereClass:
+        return dGeomSpherePointDepth(gid, x, y, z)
+    elif cls==dBoxClass:
+        return dGeomBoxPointDepth(gid, x, y, z)
+    elif cls==dCapsuleClass:
+        return dGeomCapsulePointDepth(gid, x, y, z)
+    else:
+        return dGeomPlanePointDepth(gid, x, y, z)
+
+# _point_depths
+cdef object _point_depths(dGeomID gid, object points, object out):
+    """Implementation of the pointDepths() methods of the geoms.
+    """
+    cdef double* p
+    cdef double* res
+    cdef long size, n, i
+
+    _getdoubles(points, 0, &p, &size)
+    if size%3!=0:
+        raise ValueError, "points must contain N*3 values (got %d)"%size
+    n = size/3
+    if out is None:
+        out = _newdoubles(n)
+    _getdoubles(out, 1, &res, &size)
+    _checkcount("out", size, n)
+
+    with nogil:
+        for i from 0 <= i < n:
+            res[i] = _point_depth(gid, p[3*i], p[3*i+1], p[3*i+2])
+    return out
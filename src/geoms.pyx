@@ -46,7 +46,7 @@ cdef class GeomSphere(GeomObject):
 #        if space!=None:
 #            space._addgeom(self)
 
-        _geom_c2py_lut[<long>self.gid]=self
+        dGeomSetData(self.gid, &self.odata)
 
 
     def __init__(self, space=None, radius=1.0):
@@ -91,6 +91,22 @@ cdef class GeomSphere(GeomObject):
         """
         return dGeomSpherePointDepth(self.gid, p[0], p[1], p[2])
 
+    def pointDepths(self, points, out=None):
+        """pointDepths(points, out=None) -> array
+
+        Return the depths of N points in the sphere (see pointDepth()).
+        points must be a buffer of N*3 doubles (e.g. a NumPy array of
+        shape (N,3)). If out is given it must be a writable buffer of N
+        doubles that receives the depths and is returned. Otherwise a
+        new array.array is returned.
+
+        @param points: Points
+        @type points: buffer of doubles
+        @param out: Output buffer
+        @type out: buffer of doubles
+        """
+        return _point_depths(self.gid, points, out)
+
                 
 # GeomBox
 cdef class GeomBox(GeomObject):
@@ -115,7 +131,7 @@ cdef class GeomBox(GeomObject):
 #        if space!=None:
 #            space._addgeom(self)
 
-        _geom_c2py_lut[<long>self.gid]=self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, space=None, lengths=(1.0, 1.0, 1.0)):
         self.space = space
@@ -150,6 +166,22 @@ cdef class GeomBox(GeomObject):
         """
         return dGeomBoxPointDepth(self.gid, p[0], p[1], p[2])
 
+    def pointDepths(self, points, out=None):
+        """pointDepths(points, out=None) -> array
+
+        Return the depths of N points in the box (see pointDepth()).
+        points must be a buffer of N*3 doubles (e.g. a NumPy array of
+        shape (N,3)). If out is given it must be a writable buffer of N
+        doubles that receives the depths and is returned. Otherwise a
+        new array.array is returned.
+
+        @param points: Points
+        @type points: buffer of doubles
+        @param out: Output buffer
+        @type out: buffer of doubles
+        """
+        return _point_depths(self.gid, points, out)
+
 
 # GeomPlane
 cdef class GeomPlane(GeomObject):
@@ -179,7 +211,7 @@ cdef class GeomPlane(GeomObject):
 #        if space!=None:
 #            space._addgeom(self)
 
-        _geom_c2py_lut[<long>self.gid]=self
+        dGeomSetData(self.gid, &self.odata)
 
 
     def __init__(self, space=None, normal=(0,0,1), dist=0):
@@ -212,6 +244,22 @@ cdef class GeomPlane(GeomObject):
         """
         return dGeomPlanePointDepth(self.gid, p[0], p[1], p[2])
 
+    def pointDepths(self, points, out=None):
+        """pointDepths(points, out=None) -> array
+
+        Return the depths of N points in the plane (see pointDepth()).
+        points must be a buffer of N*3 doubles (e.g. a NumPy array of
+        shape (N,3)). If out is given it must be a writable buffer of N
+        doubles that receives the depths and is returned. Otherwise a
+        new array.array is returned.
+
+        @param points: Points
+        @type points: buffer of doubles
+        @param out: Output buffer
+        @type out: buffer of doubles
+        """
+        return _point_depths(self.gid, points, out)
+
 
 # GeomCapsule
 cdef class GeomCapsule(GeomObject):
@@ -239,7 +287,7 @@ cdef class GeomCapsule(GeomObject):
 #        if space!=None:
 #            space._addgeom(self)
 
-        _geom_c2py_lut[<long>self.gid]=self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, space=None, radius=0.5, length=1.0):
         self.space = space
@@ -274,6 +322,22 @@ cdef class GeomCapsule(GeomObject):
         """
         return dGeomCapsulePointDepth(self.gid, p[0], p[1], p[2])
 
+    def pointDepths(self, points, out=None):
+        """pointDepths(points, out=None) -> array
+
+        Return the depths of N points in the cylinder (see pointDepth()).
+        points must be a buffer of N*3 doubles (e.g. a NumPy array of
+        shape (N,3)). If out is given it must be a writable buffer of N
+        doubles that receives the depths and is returned. Otherwise a
+        new array.array is returned.
+
+        @param points: Points
+        @type points: buffer of doubles
+        @param out: Output buffer
+        @type out: buffer of doubles
+        """
+        return _point_depths(self.gid, points, out)
+
 GeomCCylinder = GeomCapsule # backwards compatibility
 
 
@@ -301,7 +365,7 @@ cdef class GeomCylinder(GeomObject):
 #        if space!=None:
 #            space._addgeom(self)
 
-        _geom_c2py_lut[<long>self.gid]=self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, space=None, radius=0.5, length=1.0):
         self.space = space
@@ -353,7 +417,7 @@ cdef class GeomRay(GeomObject):
 #        if space!=None:
 #            space._addgeom(self)
 
-        _geom_c2py_lut[<long>self.gid]=self
+        dGeomSetData(self.gid, &self.odata)
 
 
     def __init__(self, space=None, rlen=1.0):
@@ -439,7 +503,7 @@ cdef class GeomTransform(GeomObject):
 #        if space!=None:
 #            space._addgeom(self)
 
-        _geom_c2py_lut[<long>self.gid]=self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, space=None):
         self.space = space
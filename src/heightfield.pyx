@@ -44,7 +44,7 @@ cdef class GeomHeightfield(GeomObject):
             sid = sp.sid
         self.gid = dCreateHeightfield(sid, data.hfdid, <int>placeable)
 
-        _geom_c2py_lut[<long>self.gid] = self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, HeightfieldData data not None, space=None):
         self.space = space
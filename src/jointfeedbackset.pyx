@@ -0,0 +1,179 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# JointFeedbackSet
+cdef class JointFeedbackSet:
+    """Feedback buffers for many joints in one contiguous block.
+
+    The set allocates the dJointFeedback structures of all its joints
+    in a single block of memory and installs them in the joints (this
+    replaces any buffer that was created with Joint.setFeedback()).
+    After each step ODE writes the forces and torques that the joints
+    apply directly into this block.
+
+    The block is exposed through the (read-only) buffer interface, so
+    it can be viewed without copying, e.g. with NumPy:
+
+     >>> fb = ode.JointFeedbackSet(joints)
+     >>> dtype = {4: numpy.float32, 8: numpy.float64}[fb.getItemSize()]
+     >>> a = numpy.frombuffer(fb, dtype=dtype).reshape(-1, 4, 4)
+     >>> forces = a[:, :, :3]   # (f1, t1, f2, t2) per joint
+
+    The values in the block are of ODE's dReal type, which is a
+    double or a float depending on how ODE was compiled, so the item
+    type of a view must be taken from getItemSize(). Each vector in
+    ODE's dJointFeedback is padded to 4 values, so the raw block has 16
+    values per joint and the view above (shape (N,4,3)) skips the
+    padding. getFeedback() copies the values into a dense N x 12 array
+    of doubles instead (independent of the ODE precision).
+
+    Constructor::
+
+      JointFeedbackSet(joints)
+
+    The set keeps a reference to every joint. When the set is
+    deallocated the joints get their previous feedback buffer back.
+    """
+
+    # The feedback block (count entries)
+    cdef dJointFeedback* feedback
+    cdef int count
+    # A tuple with the Joint objects
+    cdef object joints
+
+    def __cinit__(self, joints):
+        self.feedback = NULL
+        self.count = 0
+        self.joints = ()
+
+    def __init__(self, joints):
+        """Constructor.
+
+        @param joints: The joints in the set
+        @type joints: sequence of Joint objects
+        """
+        cdef Joint j
+        cdef int i, n
+
+        joints = tuple(joints)
+        n = len(joints)
+        for j in joints:
+            if j is None:
+                raise TypeError, "JointFeedbackSet items must be Joint objects, not None"
+            if j.jid==NULL:
+                raise ValueError, "joint has already been destroyed"
+
+        if n>0:
+            self.feedback = <dJointFeedback*>malloc(n*sizeof(dJointFeedback))
+            if self.feedback==NULL:
+                raise MemoryError("can't allocate feedback block")
+            memset(self.feedback, 0, n*sizeof(dJointFeedback))
+        for i from 0 <= i < n:
+            j = joints[i]
+            dJointSetFeedback(j.jid, &self.feedback[i])
+        self.count = n
+        self.joints = joints
+
+    def __dealloc__(self):
+        cdef Joint j
+        cdef int i
+
+        if self.feedback!=NULL:
+            # Give the joints their own buffer back (unless the feedback
+            # was changed in the meantime). Breakable joints need a
+            # buffer, so they get a new one if they didn't have one.
+            for i from 0 <= i < self.count:
+                j = self.joints[i]
+                if j.jid!=NULL and dJointGetFeedback(j.jid)==&self.feedback[i]:
+                    if j.feedback==NULL and j.breakthresholds is not None:
+                        j.setFeedback(True)
+                    else:
+                        dJointSetFeedback(j.jid, j.feedback)
+            free(self.feedback)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        return self.joints[idx]
+
+    def __iter__(self):
+        return iter(self.joints)
+
+    def __getsegcount__(self, Py_ssize_t* lenp):
+        if lenp!=NULL:
+            lenp[0] = self.count*sizeof(dJointFeedback)
+        return 1
+
+    def __getreadbuffer__(self, Py_ssize_t i, void** p):
+        if i!=0:
+            raise SystemError, "accessing non-existent buffer segment"
+        p[0] = <void*>self.feedback
+        return self.count*sizeof(dJointFeedback)
+
+    # getItemSize
+    def getItemSize(self):
+        """getItemSize() -> int
+
+        Return the size in bytes of one value in the feedback block
+        (8 if ODE uses double precision, 4 if it uses single precision).
+        """
+        return sizeof(dReal)
+
+    # getFeedback
+    def getFeedback(self, out=None):
+        """getFeedback(out=None) -> array
+
+        Return the forces and torques of all joints as an array of
+        floats with one row of 12 values per joint::
+
+          force1 (3), torque1 (3), force2 (3), torque2 (3)
+
+        force1/torque1 are applied to the first body of the joint and
+        force2/torque2 to the second body.
+
+        If out is given it must be a writable contiguous buffer of C
+        doubles with exactly N*12 elements (e.g. a NumPy float64 array
+        of shape (N, 12)). The values are written into this buffer and
+        out is returned. Otherwise a new array.array is returned.
+
+        @param out: Output buffer
+        @type out: buffer of doubles
+        """
+        cdef double* buf
+        cdef long size
+        cdef dJointFeedback* fb
+        cdef int i, k
+
+        if out is None:
+            out = _newdoubles(12*self.count)
+        _getdoubles(out, 1, &buf, &size)
+        _checkcount("out", size, 12*self.count)
+
+        for i from 0 <= i < self.count:
+            fb = &self.feedback[i]
+            for k from 0 <= k < 3:
+                buf[k] = fb.f1[k]
+                buf[3+k] = fb.t1[k]
+                buf[6+k] = fb.f2[k]
+                buf[9+k] = fb.t2[k]
+            buf = buf+12
+        return out
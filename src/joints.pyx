@@ -33,26 +33,43 @@
 
 ######################################################################
 
-
+# Forward declaration (JointGroup._addjoint() accesses the joint)
+cdef class Joint
 
 # JointGroup
 cdef class JointGroup:
     """Joint group.
 
+    capacity is the expected number of joints in the group. It is
+    passed on to dJointGroupCreate(), but ODE ignores this value, so
+    it doesn't reserve any memory and the group still grows on demand.
+    It is only reported back by stats(), which can be used to compare
+    the expected with the actual number of joints.
+
     Constructor::
 
-      JointGroup()
+      JointGroup(capacity=0)
     """
 
     # JointGroup ID
     cdef dJointGroupID gid
     # A list of Python joints that were added to the group
     cdef object jointlist
-
-    def __cinit__(self):
-        self.gid = dJointGroupCreate(0)
-
-    def __init__(self):
+    # The capacity that was passed to the constructor
+    cdef int capacity
+    # Current and largest number of joints in the group
+    cdef long njoints
+    cdef long peakjoints
+
+    def __cinit__(self, int capacity=0):
+        if capacity<0:
+            raise ValueError, "capacity must not be negative"
+        self.gid = dJointGroupCreate(capacity)
+        self.capacity = capacity
+        self.njoints = 0
+        self.peakjoints = 0
+
+    def __init__(self, int capacity=0):
         self.jointlist = []
 
     def __dealloc__(self):
@@ -67,13 +84,175 @@ cdef class JointGroup:
 
         Destroy all joints in the group.
         """
-        dJointGroupEmpty(self.gid)
-        for j in self.jointlist:
-            j._destroyed()
-        self.jointlist = []
-
+        cdef double t
 
-    def _addjoint(self, j):
+        if _profiling:
+            t = pyode_timer()
+        dJointGroupEmpty(self.gid)
+        self.njoints = 0
+        if self.jointlist:
+            for j in self.jointlist:
+                j._destroyed()
+            self.jointlist = []
+        if _profiling:
+            _profile.empty = _profile.empty+pyode_timer()-t
+
+    # addContacts
+    def addContacts(self, World world not None, contacts, pairs=None,
+                    BodySet bodies=None, Contact contact=None, int count=-1):
+        """addContacts(world, contacts, pairs=None, bodies=None, contact=None, count=-1) -> int
+
+        Create contact joints in the group without creating ContactJoint
+        objects. The joints only exist on the ODE side and are destroyed
+        when the group is emptied, so neither the creation nor empty()
+        costs any Python work per joint.
+
+        contacts is either a ContactBuffer or a tuple (positions,
+        normals, depths) of arrays.
+
+        With a ContactBuffer the first count contacts of the buffer
+        (count=-1 means all contacts stored by the last collide() call)
+        are used as they are and each joint is
+        attached to the bodies of the two geoms in contact (see
+        ContactBuffer.createJoints()).
+
+        With arrays, positions and normals are buffers of N*3 doubles
+        and depths is a buffer of N doubles. pairs must be a buffer of
+        N*2 longs with the indices of the two bodies of each contact in
+        the BodySet bodies (-1 means the static environment) and the
+        surface parameters are taken from the Contact object contact
+        (or the default parameters of a new Contact). count limits the
+        number of contacts that are used. The bodies must belong to
+        world and the two indices of a pair must be different (unless
+        they are both -1).
+
+        pairs, bodies and contact must not be passed together with a
+        ContactBuffer (TypeError).
+
+        @param world: The world in which the joints are created
+        @type world: World
+        @param contacts: The contacts
+        @type contacts: ContactBuffer or tuple of buffers
+        @param pairs: Body indices (only for arrays)
+        @type pairs: buffer of longs
+        @param bodies: The bodies that pairs refers to (only for arrays)
+        @type bodies: BodySet
+        @param contact: Template for the surface parameters (only for arrays)
+        @type contact: Contact
+        @param count: Number of contacts
+        @type count: int
+        @returns: The number of created joints
+        """
+        cdef double* pos
+        cdef double* nrm
+        cdef double* dep
+        cdef long* idx
+        cdef long size, n, i, k
+        cdef dContact c
+        cdef dBodyID b1, b2
+        cdef dJointID j
+        cdef double t
+
+        if isinstance(contacts, ContactBuffer):
+            if pairs is not None or bodies is not None or contact is not None:
+                raise TypeError, "pairs, bodies and contact can't be used with a ContactBuffer"
+            return contacts.createJoints(world, self, 0, count)
+
+        positions, normals, depths = contacts
+        _getdoubles(depths, 0, &dep, &n)
+        _getdoubles(positions, 0, &pos, &size)
+        _checkcount("positions", size, 3*n)
+        _getdoubles(normals, 0, &nrm, &size)
+        _checkcount("normals", size, 3*n)
+        if pairs is None or bodies is None:
+            raise ValueError, "pairs and bodies are required for contact arrays"
+        _getlongs(pairs, 0, &idx, &size)
+        _checkcount("pairs", size, 2*n)
+        if count>=0 and count<n:
+            n = count
+
+        # Check the body indices before creating any joints
+        for i from 0 <= i < 2*n:
+            k = idx[i]
+            if k<-1 or k>=bodies.count:
+                raise IndexError, "body index %d out of range"%k
+            if k>=0 and dBodyGetWorld(bodies.bids[k])!=world.wid:
+                raise ValueError, "body %d doesn't belong to the world"%k
+        for i from 0 <= i < n:
+            if idx[2*i]>=0 and idx[2*i]==idx[2*i+1]:
+                raise ValueError, "contact %d connects body %d with itself"%(i, idx[2*i])
+
+        if contact is None:
+            contact = Contact()
+        c = contact._contact
+        c.geom.g1 = NULL
+        c.geom.g2 = NULL
+
+        if _profiling:
+            t = pyode_timer()
+        for i from 0 <= i < n:
+            c.geom.pos[0] = pos[3*i]
+            c.geom.pos[1] = pos[3*i+1]
+            c.geom.pos[2] = pos[3*i+2]
+            c.geom.normal[0] = nrm[3*i]
+            c.geom.normal[1] = nrm[3*i+1]
+            c.geom.normal[2] = nrm[3*i+2]
+            c.geom.depth = dep[i]
+            b1 = NULL
+            b2 = NULL
+            if idx[2*i]>=0:
+                b1 = bodies.bids[idx[2*i]]
+            if idx[2*i+1]>=0:
+                b2 = bodies.bids[idx[2*i+1]]
+            j = dJointCreateContact(world.wid, self.gid, &c)
+            dJointAttach(j, b1, b2)
+        self._added(n)
+        if _profiling:
+            _profile.joints = _profile.joints+pyode_timer()-t
+            _profile.njoints = _profile.njoints+n
+        return n
+
+    # stats
+    def stats(self, reset=False):
+        """stats(reset=False) -> dict
+
+        Return usage statistics of the group as a dictionary with the
+        following items:
+
+         - capacity: The capacity passed to the constructor
+         - joints: The number of joints currently in the group
+         - peak_joints: The largest number of joints that were in the
+           group at the same time (since the creation of the group or
+           the last reset)
+
+        Joints created by World.collideStep() and WorldBatch.step() are
+        counted per step as the group is emptied after every step.
+        ODE doesn't report the memory used by a group, so no byte
+        counts are available.
+
+        @param reset: Reset the peak value to the current joint count
+        @type reset: bool
+        """
+        res = {"capacity" : self.capacity,
+               "joints" : self.njoints,
+               "peak_joints" : self.peakjoints}
+        if reset:
+            self.peakjoints = self.njoints
+        return res
+
+    cdef void _added(self, long n):
+        """Register n joints that were added to the group."""
+        self.njoints = self.njoints+n
+        if self.njoints>self.peakjoints:
+            self.peakjoints = self.njoints
+
+    cdef void _peak(self, long n):
+        """Register that the group temporarily contained n more joints."""
+        if self.njoints+n>self.peakjoints:
+            self.peakjoints = self.njoints+n
+
+
+    def _addjoint(self, Joint j not None):
         """_addjoint(j)
 
         Add a joint to the group.  This is an internal method that is
@@ -87,6 +266,8 @@ cdef class JointGroup:
         @type j: Joint
         """
         self.jointlist.append(j)
+        j.ingroup = 1
+        self._added(1)
 
 
 ######################################################################
@@ -171,10 +352,17 @@ cdef class Joint:
     # (set via __getattr__ and __setattr__)
     cdef object userattribs
 
+    # The break thresholds (maxforce, maxtorque) or None
+    cdef object breakthresholds
+    # Set when the joint was added to a JointGroup
+    cdef int ingroup
+
     def __cinit__(self, *a, **kw):
         self.jid = NULL
         self.world = None
         self.feedback = NULL
+        self.breakthresholds = None
+        self.ingroup = 0
         self.body1 = None
         self.body2 = None
         self.userattribs = {}
@@ -185,6 +373,7 @@ cdef class Joint:
         raise NotImplementedError, "The Joint base class can't be used directly."
 
     def __dealloc__(self):
+        self._unbreakable()
         self.setFeedback(False)
         if self.jid!=NULL and self.world:
             dJointDestroy(self.jid)
@@ -212,8 +401,20 @@ cdef class Joint:
         was destroyed by someone else (e.g. by a joint group). The Python
         wrapper will then refrain from destroying it again.
         """
+        self._unbreakable()
         self.jid = NULL
 
+    # _unbreakable
+    cdef void _unbreakable(self):
+        """Remove the joint from the breakable joints of its world."""
+        cdef World w
+
+        if self.breakthresholds is not None:
+            self.breakthresholds = None
+            if self.jid!=NULL and self.world is not None:
+                w = self.world
+                w._removeBreakable(self.jid)
+
     # attach
     def attach(self, Body body1, Body body2):
         """attach(body1, body2)
@@ -252,16 +453,22 @@ cdef class Joint:
         will be returned, corresponding to the body2 argument of the
         attach() method.
 
+        The body is looked up from the ODE joint via the back-pointer
+        in the body's user data, so it is always the body that the ODE
+        joint is actually attached to.
+
         @param index: Bodx index (0 or 1).
         @type index: int
         """
 
+        if index!=0 and index!=1:
+            raise IndexError()
+        if self.jid!=NULL:
+            return _body_c2py(dJointGetBody(self.jid, index))
         if (index == 0):
             return self.body1
-        elif (index == 1):
-            return self.body2
         else:
-            raise IndexError()
+            return self.body2
 
     def enable(self):
         dJointEnable(self.jid)
@@ -325,6 +532,69 @@ cdef class Joint:
         t2 = (fb.t2[0], fb.t2[1], fb.t2[2])
         return (f1,t1,f2,t2)
 
+    # setBreakThresholds
+    def setBreakThresholds(self, maxforce=None, maxtorque=None):
+        """setBreakThresholds(maxforce=None, maxtorque=None)
+
+        Set the thresholds at which the joint breaks. After each step
+        of the world the magnitudes of the forces and torques that the
+        joint applies to its bodies are compared with the thresholds.
+        If one of them is exceeded the joint is disabled and reported
+        by World.getBrokenJoints(). A broken joint isn't checked again
+        until setBreakThresholds() is called again. The check is done
+        in C and doesn't call back into Python.
+
+        None means there is no limit. If both values are None the
+        joint is unbreakable again. Feedback is turned on if it isn't
+        already (see setFeedback()).
+
+        Joints that belong to a JointGroup can't be breakable as the
+        group may destroy them while the world is still checking them
+        (ValueError).
+
+        @param maxforce: Maximum force magnitude
+        @param maxtorque: Maximum torque magnitude
+        @type maxforce: float
+        @type maxtorque: float
+        """
+        cdef World w
+        cdef dReal f, t
+
+        if maxforce is None and maxtorque is None:
+            self._unbreakable()
+            return
+        if self.jid==NULL or self.world is None:
+            raise RuntimeError, "the joint doesn't belong to a world"
+        if self.ingroup:
+            raise ValueError, "joints in a JointGroup can't have break thresholds"
+        if maxforce is None:
+            f = dInfinity
+        else:
+            f = maxforce
+            if f<0:
+                raise ValueError, "maxforce must not be negative"
+        if maxtorque is None:
+            t = dInfinity
+        else:
+            t = maxtorque
+            if t<0:
+                raise ValueError, "maxtorque must not be negative"
+
+        if dJointGetFeedback(self.jid)==NULL:
+            self.setFeedback(True)
+        w = self.world
+        w._setBreakable(self.jid, <void*>self, f, t)
+        self.breakthresholds = (maxforce, maxtorque)
+
+    # getBreakThresholds
+    def getBreakThresholds(self):
+        """getBreakThresholds() -> (maxforce, maxtorque)
+
+        Return the thresholds set by setBreakThresholds(). Returns None
+        if the joint is unbreakable.
+        """
+        return self.breakthresholds
+
 
     # setParam
     def setParam(self, param, value):
@@ -1020,9 +1290,14 @@ cdef class ContactJoint(Joint):
       ContactJoint(world, jointgroup, contact)
     """
 
+    # Start time of the construction (only used when profiling)
+    cdef double _t0
+
     def __cinit__(self, World world not None, jointgroup, Contact contact):
         cdef JointGroup jg
         cdef dJointGroupID jgid
+        if _profiling:
+            self._t0 = pyode_timer()
         jgid=NULL
         if jointgroup!=None:
             jg=jointgroup
@@ -1033,6 +1308,10 @@ cdef class ContactJoint(Joint):
         self.world = world
         if jointgroup!=None:
             jointgroup._addjoint(self)
+        if _profiling:
+            if self._t0>0:
+                _profile.contactjoints = _profile.contactjoints+pyode_timer()-self._t0
+            _profile.njoints = _profile.njoints+1
 
 # AMotor
 cdef class AMotor(Joint):
@@ -0,0 +1,180 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# A joint of a JointSet with its parameter functions
+cdef struct _ParamJoint:
+    dJointID jid
+    void (*setParam)(dJointID, int, dReal)
+    dReal (*getParam)(dJointID, int)
+
+# JointSet
+cdef class JointSet:
+    """A fixed collection of joints whose parameters are accessed in bulk.
+
+    setParam() and getParam() read or write one limit/motor parameter
+    of all joints in a single call. The joint ids and the parameter
+    functions of the joint types are stored in a C array when the set
+    is created, so the loop over the joints runs entirely in C and no
+    Python method call or float object is created per joint. This is
+    meant for controllers that update e.g. ParamVel and ParamFMax of
+    many motors every step:
+
+     >>> motors = ode.JointSet(joints)
+     >>> motors.setParam(ode.ParamVel, velocities)
+     >>> motors.setParam(ode.ParamFMax2, 50.0)
+
+    The joints may be of different types, but every joint must support
+    parameters (i.e. ContactJoint and Plane2DJoint can't be used).
+    Joints that belong to a JointGroup can't be used either, as the
+    group may destroy them while they are in the set.
+
+    Constructor::
+
+      JointSet(joints)
+
+    The set keeps a reference to every joint.
+    """
+
+    # The joint ids and parameter functions (count entries)
+    cdef _ParamJoint* items
+    cdef int count
+    # A tuple with the Joint objects
+    cdef object joints
+
+    def __cinit__(self, joints):
+        self.items = NULL
+        self.count = 0
+        self.joints = ()
+
+    def __init__(self, joints):
+        """Constructor.
+
+        @param joints: The joints in the set
+        @type joints: sequence of Joint objects
+        """
+        cdef Joint j
+        cdef int i, n
+
+        joints = tuple(joints)
+        n = len(joints)
+        for j in joints:
+            if j is None:
+                raise TypeError, "JointSet items must be Joint objects, not None"
+            if j.setJointParam==NULL or j.getJointParam==NULL:
+                raise TypeError, "%s objects don't have parameters"%j.__class__.__name__
+            if j.jid==NULL:
+                raise ValueError, "joint has already been destroyed"
+            if j.ingroup:
+                raise ValueError, "joints in a JointGroup can't be used in a JointSet"
+
+        if n>0:
+            self.items = <_ParamJoint*>malloc(n*sizeof(_ParamJoint))
+            if self.items==NULL:
+                raise MemoryError("can't allocate joint array")
+        for i from 0 <= i < n:
+            j = joints[i]
+            self.items[i].jid = j.jid
+            self.items[i].setParam = j.setJointParam
+            self.items[i].getParam = j.getJointParam
+        self.count = n
+        self.joints = joints
+
+    def __dealloc__(self):
+        if self.items!=NULL:
+            free(self.items)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        return self.joints[idx]
+
+    def __iter__(self):
+        return iter(self.joints)
+
+    # setParam
+    def setParam(self, int param, values):
+        """setParam(param, values)
+
+        Set a limit/motor parameter of all joints.
+
+        param is one of the ParamXyz constants, including the variants
+        for the second and third axis (e.g. ParamVel2 or
+        ParamFMax+2*ParamGroup).
+
+        values is either a single number that is used for all joints
+        or a contiguous buffer of C doubles with one value per joint
+        (e.g. a NumPy float64 array of shape (N,) or an array.array).
+
+        @param param: Selects the parameter to set
+        @param values: The parameter values
+        @type param: int
+        @type values: float or buffer of doubles
+        """
+        cdef _ParamJoint* p
+        cdef double* buf
+        cdef long size
+        cdef dReal v
+        cdef int i
+
+        if isinstance(values, (int, long, float)):
+            v = values
+            for i from 0 <= i < self.count:
+                p = self.items+i
+                p.setParam(p.jid, param, v)
+            return
+
+        _getdoubles(values, 0, &buf, &size)
+        _checkcount("values", size, self.count)
+        for i from 0 <= i < self.count:
+            p = self.items+i
+            p.setParam(p.jid, param, buf[i])
+
+    # getParam
+    def getParam(self, int param, out=None):
+        """getParam(param, out=None) -> array
+
+        Get a limit/motor parameter of all joints (see setParam()).
+
+        If out is given it must be a writable contiguous buffer of C
+        doubles with exactly N elements. The values are written into
+        this buffer and out is returned. Otherwise a new array.array
+        is returned.
+
+        @param param: Selects the parameter to get
+        @param out: Output buffer
+        @type param: int
+        @type out: buffer of doubles
+        """
+        cdef _ParamJoint* p
+        cdef double* buf
+        cdef long size
+        cdef int i
+
+        if out is None:
+            out = _newdoubles(self.count)
+        _getdoubles(out, 1, &buf, &size)
+        _checkcount("out", size, self.count)
+
+        for i from 0 <= i < self.count:
+            p = self.items+i
+            buf[i] = p.getParam(p.jid, param)
+        return out
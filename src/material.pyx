@@ -0,0 +1,273 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# Surface parameters of a material (see Material)
+cdef struct _MaterialData:
+    int mode
+    dReal mu
+    dReal bounce
+    dReal bounce_vel
+    dReal soft_erp
+    dReal soft_cfm
+
+# The user data of an ODE geom or body (dGeomSetData()/dBodySetData()).
+# Contains a borrowed pointer to the Python wrapper and a pointer to the
+# data of the material that is attached to the object (or NULL).
+cdef struct _ObjectData:
+    void* wrapper
+    _MaterialData* material
+
+# The values of the MaterialCombineXyz constants
+cdef enum:
+    _COMBINE_AVERAGE = 0
+    _COMBINE_MIN = 1
+    _COMBINE_MAX = 2
+    _COMBINE_MULTIPLY = 3
+
+# Material
+cdef class Material:
+    """Surface material of geoms and bodies.
+
+    A material stores the surface parameters that a geom (or all geoms
+    of a body) contributes to its contacts. When contacts are created by
+    the native collision methods (SpaceBase.collideIntoJointGroup(),
+    World.collideStep(), WorldBatch.step() and
+    ContactBuffer.applyMaterials()) the materials of the two geoms are
+    combined in C according to the combine rule of the space
+    (see SpaceBase.setMaterialCombine()):
+
+     - MaterialCombineAverage: (a+b)/2
+     - MaterialCombineMin: min(a, b)
+     - MaterialCombineMax: max(a, b)
+     - MaterialCombineMultiply: a*b
+
+    Infinity (the default friction) is handled like a very large
+    number: with MaterialCombineMultiply 0*Infinity is 0 and
+    x*Infinity is Infinity for x>0 (instead of NaN).
+
+    The contact flags of the two materials are or'ed. If only one geom
+    has a material its parameters are used unchanged, if no geom has a
+    material the contact template is used. A material that is set on a
+    geom takes precedence over the material of its body.
+
+    Constructor::
+
+      Material(mu=Infinity, bounce=0.0, bounce_vel=0.0, soft_erp=0.0, soft_cfm=0.0, mode=0)
+    """
+
+    cdef _MaterialData data
+
+    def __cinit__(self, mu=dInfinity, bounce=0.0, bounce_vel=0.0,
+                  soft_erp=0.0, soft_cfm=0.0, mode=0):
+        self.data.mode = mode
+        self.data.mu = mu
+        self.data.bounce = bounce
+        self.data.bounce_vel = bounce_vel
+        self.data.soft_erp = soft_erp
+        self.data.soft_cfm = soft_cfm
+
+    def __init__(self, mu=dInfinity, bounce=0.0, bounce_vel=0.0,
+                 soft_erp=0.0, soft_cfm=0.0, mode=0):
+        pass
+
+    # getMode
+    def getMode(self):
+        """getMode() -> flags
+
+        Return the contact flags.
+        """
+        return self.data.mode
+
+    # setMode
+    def setMode(self, flags):
+        """setMode(flags)
+
+        Set the contact flags (a combination of the ContactXyz flags).
+
+        @param flags: Contact flags
+        @type flags: int
+        """
+        self.data.mode = flags
+
+    # getMu
+    def getMu(self):
+        """getMu() -> float
+
+        Return the Coulomb friction coefficient.
+        """
+        return self.data.mu
+
+    # setMu
+    def setMu(self, mu):
+        """setMu(mu)
+
+        Set the Coulomb friction coefficient.
+
+        @param mu: Coulomb friction coefficient (0..Infinity)
+        @type mu: float
+        """
+        self.data.mu = mu
+
+    # getBounce
+    def getBounce(self):
+        """getBounce() -> float
+
+        Return the restitution parameter.
+        """
+        return self.data.bounce
+
+    # setBounce
+    def setBounce(self, b):
+        """setBounce(b)
+
+        @param b: Restitution parameter (0..1)
+        @type b: float
+        """
+        self.data.bounce = b
+
+    # getBounceVel
+    def getBounceVel(self):
+        """getBounceVel() -> float
+
+        Return the minimum incoming velocity necessary for bounce.
+        """
+        return self.data.bounce_vel
+
+    # setBounceVel
+    def setBounceVel(self, bv):
+        """setBounceVel(bv)
+
+        Set the minimum incoming velocity necessary for bounce. Incoming
+        velocities below this will effectively have a bounce parameter
+        of 0.
+
+        @param bv: Velocity
+        @type bv: float
+        """
+        self.data.bounce_vel = bv
+
+    # getSoftERP
+    def getSoftERP(self):
+        """getSoftERP() -> float
+
+        Return the contact normal "softness" parameter.
+        """
+        return self.data.soft_erp
+
+    # setSoftERP
+    def setSoftERP(self, erp):
+        """setSoftERP(erp)
+
+        Set the contact normal "softness" parameter.
+
+        @param erp: Softness parameter
+        @type erp: float
+        """
+        self.data.soft_erp = erp
+
+    # getSoftCFM
+    def getSoftCFM(self):
+        """getSoftCFM() -> float
+
+        Return the contact normal "softness" parameter.
+        """
+        return self.data.soft_cfm
+
+    # setSoftCFM
+    def setSoftCFM(self, cfm):
+        """setSoftCFM(cfm)
+
+        Set the contact normal "softness" parameter.
+
+        @param cfm: Softness parameter
+        @type cfm: float
+        """
+        self.data.soft_cfm = cfm
+
+# _material_data
+cdef _MaterialData* _material_data(Material material):
+    """Return a pointer to the data of a material (NULL for None)."""
+    if material is None:
+        return NULL
+    return &material.data
+
+# _combine
+cdef dReal _combine(int rule, dReal a, dReal b) nogil:
+    if rule==_COMBINE_MIN:
+        if a<b:
+            return a
+        return b
+    elif rule==_COMBINE_MAX:
+        if a>b:
+            return a
+        return b
+    elif rule==_COMBINE_MULTIPLY:
+        # Avoid NaN for 0*dInfinity (e.g. a frictionless material
+        # against one with the default mu)
+        if a==0 or b==0:
+            return 0
+        return a*b
+    else:
+        return 0.5*(a+b)
+
+# _geom_material
+cdef _MaterialData* _geom_material(dGeomID g) nogil:
+    """Return the material of a geom (or of its body) or NULL."""
+    cdef _ObjectData* od
+    cdef dBodyID b
+
+    od = <_ObjectData*>dGeomGetData(g)
+    if od!=NULL and od.material!=NULL:
+        return od.material
+    b = dGeomGetBody(g)
+    if b!=NULL:
+        od = <_ObjectData*>dBodyGetData(b)
+        if od!=NULL:
+            return od.material
+    return NULL
+
+# _material_surface
+cdef int _material_surface(dSurfaceParameters* s, dGeomID o1, dGeomID o2,
+                           int rule) nogil:
+    """Set the surface parameters of a contact from the geom materials.
+
+    Returns 0 (and leaves s unchanged) if none of the geoms has a
+    material.
+    """
+    cdef _MaterialData* m1
+    cdef _MaterialData* m2
+
+    m1 = _geom_material(o1)
+    m2 = _geom_material(o2)
+    if m1==NULL:
+        if m2==NULL:
+            return 0
+        m1 = m2
+    elif m2==NULL:
+        m2 = m1
+
+    s.mode = m1.mode | m2.mode
+    s.mu = _combine(rule, m1.mu, m2.mu)
+    s.bounce = _combine(rule, m1.bounce, m2.bounce)
+    s.bounce_vel = _combine(rule, m1.bounce_vel, m2.bounce_vel)
+    s.soft_erp = _combine(rule, m1.soft_erp, m2.soft_erp)
+    s.soft_cfm = _combine(rule, m1.soft_cfm, m2.soft_cfm)
+    return 1
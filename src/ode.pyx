@@ -39,11 +39,18 @@ http://opende.sourceforge.net.
 There are the following classes and functions:
 
  - World
+ - WorldBatch
  - Body
+ - BodySet
+ - JointFeedbackSet
+ - JointSet
  - JointGroup
  - Contact
+ - ContactBuffer
  - Space
+ - CollisionMatrix
  - Mass
+ - Material
 
 Joint classes:
 
@@ -73,7 +80,25 @@ Functions:
 
  - CloseODE()
  - collide()
-
+ - setBodyStates()
+ - AllocateODEDataForThread()
+ - setProfiling() / isProfiling() / getProfile() / resetProfile()
+
+Threads:
+
+World.step(), World.quickStep(), World.collideStep(),
+SpaceBase.collideIntoJointGroup() and collide() release the global
+interpreter lock while ODE is doing the actual work. Separate worlds
+(together with their own spaces, joint groups, bodies, geoms and joints)
+may therefore be stepped concurrently from different threads. Objects
+must never be shared between worlds that are in use at the same time,
+and a world and its objects must not be modified by one thread while
+another thread steps it. Collision detection in several threads at
+the same time requires an ODE library that was built with thread
+support (e.g. --enable-ou), and every thread has to call
+AllocateODEDataForThread() once before it does collision detection.
+SpaceBase.collide() calls back into Python and therefore keeps the
+interpreter lock.
 """
 
 ############################# Constants ###############################
@@ -143,18 +168,75 @@ ContactApprox1_1	= 0x1000
 ContactApprox1_2	= 0x2000
 ContactApprox1	= 0x3000
 
+MaterialCombineAverage  = 0
+MaterialCombineMin      = 1
+MaterialCombineMax      = 2
+MaterialCombineMultiply = 3
+
+FilterSameBody     = 0x01
+FilterConnected    = 0x02
+FilterDisabled     = 0x04
+FilterStatic       = 0x08
+
+StatePosition      = 0x01
+StateQuaternion    = 0x02
+StateLinearVel     = 0x04
+StateAngularVel    = 0x08
+StateAll           = 0x0f
+
 AMotorUser = dAMotorUser
 AMotorEuler = dAMotorEuler
 
+SAPAxesXYZ = dSAP_AXES_XYZ
+SAPAxesXZY = dSAP_AXES_XZY
+SAPAxesYXZ = dSAP_AXES_YXZ
+SAPAxesYZX = dSAP_AXES_YZX
+SAPAxesZXY = dSAP_AXES_ZXY
+SAPAxesZYX = dSAP_AXES_ZYX
+
 Infinity = dInfinity
 
 ######################################################################
 
-# Lookup table for geom objects: C ptr -> Python object
+# Materials
+include "material.pyx"
 
-## This causes some kind of weird bug! Need to fix this.
-import weakref
-_geom_c2py_lut = weakref.WeakValueDictionary()
+# Translation of ODE ids into Python wrapper objects.
+#
+# Every geom (and space) and every body stores a pointer to an
+# _ObjectData struct in the ODE user data slot (dGeomSetData() and
+# dBodySetData()). The struct is part of the Python wrapper and
+# contains a borrowed pointer to the wrapper itself. As the wrapper
+# destroys the ODE object when it is deallocated the pointer is valid
+# for as long as the ODE object exists.
+
+# _geom_c2py
+cdef object _geom_c2py(dGeomID gid):
+    """Return the Python wrapper of a geom or None if gid is NULL."""
+    cdef _ObjectData* data
+    if gid==NULL:
+        return None
+    data = <_ObjectData*>dGeomGetData(gid)
+    if data==NULL:
+        raise RuntimeError, "geom id cannot be translated to a Python object"
+    return <object>data.wrapper
+
+# _body_c2py
+cdef object _body_c2py(dBodyID bid):
+    """Return the Python wrapper of a body or None if bid is NULL."""
+    cdef _ObjectData* data
+    if bid==NULL:
+        return None
+    data = <_ObjectData*>dBodyGetData(bid)
+    if data==NULL:
+        raise RuntimeError, "body id cannot be translated to a Python object"
+    return <object>data.wrapper
+
+# Helpers for the array based methods
+include "buffers.pyx"
+
+# Profiling
+include "profile.pyx"
 
 # Mass 
 include "mass.pyx"
@@ -168,9 +250,24 @@ include "world.pyx"
 # Body
 include "body.pyx"
 
+# Body collections
+include "bodyset.pyx"
+
 # Joint classes
 include "joints.pyx"
 
+# Bulk joint feedback
+include "jointfeedbackset.pyx"
+
+# Bulk joint parameters
+include "jointset.pyx"
+
+# Contact buffer
+include "contactbuffer.pyx"
+
+# Collision matrix
+include "collisionmatrix.pyx"
+
 # Geom base
 include "geomobject.pyx"
 
@@ -187,9 +284,12 @@ include "_trimesh_switch.pyx"
 
 include "heightfielddata.pyx"
 include "heightfield.pyx"
+
+# Batches of worlds
+include "worldbatch.pyx"
     
-def collide(geom1, geom2):
-    """collide(geom1, geom2) -> contacts
+def collide(geom1, geom2, buffer=None):
+    """collide(geom1, geom2, buffer=None) -> contacts
 
     Generate contact information for two objects.
 
@@ -208,11 +308,19 @@ def collide(geom1, geom2):
     If the objects touch, this returns a list of Contact objects,
     otherwise it returns an empty list.
 
+    If a ContactBuffer is passed as third argument, the contacts are
+    written into the buffer (starting at index 0, at most as many
+    contacts as the buffer can hold) and the number of contacts is
+    returned instead. No Contact objects are created in this case.
+
     @param geom1: First Geom
     @type geom1: GeomObject
     @param geom2: Second Geom
     @type geom2: GeomObject
-    @returns: Returns a list of Contact objects.
+    @param buffer: Optional buffer that receives the contacts
+    @type buffer: ContactBuffer
+    @returns: Returns a list of Contact objects (or the number of
+      contacts if a buffer was passed).
     """
     
     cdef dContactGeom c[150]
@@ -220,11 +328,35 @@ def collide(geom1, geom2):
     cdef long id2
     cdef int i, n
     cdef Contact cont
+    cdef ContactBuffer cb
+    cdef dContact* contacts
+    cdef double t
 
     id1 = geom1._id()
     id2 = geom2._id()
 
-    n = dCollide(<dGeomID>id1, <dGeomID>id2, 150, c, sizeof(dContactGeom))
+    if buffer is not None:
+        cb = buffer
+        contacts = cb.contacts
+        i = cb.capacity
+        if _profiling:
+            t = pyode_timer()
+        with nogil:
+            n = dCollide(<dGeomID>id1, <dGeomID>id2, i, &contacts[0].geom, sizeof(dContact))
+        cb.ncontacts = n
+        if _profiling:
+            _profile.narrowphase = _profile.narrowphase+pyode_timer()-t
+            _profile.ncontacts = _profile.ncontacts+n
+        return n
+
+    if _profiling:
+        t = pyode_timer()
+    with nogil:
+        n = dCollide(<dGeomID>id1, <dGeomID>id2, 150, c, sizeof(dContactGeom))
+    if _profiling:
+        _profile.narrowphase = _profile.narrowphase+pyode_timer()-t
+        _profile.ncontacts = _profile.ncontacts+n
+        t = pyode_timer()
     res = []
     i=0
     while i<n:
@@ -232,15 +364,20 @@ def collide(geom1, geom2):
         cont._contact.geom = c[i]
         res.append(cont)
         i=i+1
+    if _profiling:
+        _profile.wrappers = _profile.wrappers+pyode_timer()-t
 
     return res
 
-def collide2(geom1, geom2, arg, callback):
-    """collide2(geom1, geom2, arg, callback)
+def collide2(geom1, geom2, arg, callback, int filter=0):
+    """collide2(geom1, geom2, arg, callback, filter=0)
     
     Calls the callback for all potentially intersecting pairs that contain
     one geom from geom1 and one geom from geom2.
 
+    filter can be used to drop pairs before the callback is called
+    (see SpaceBase.collide()).
+
     @param geom1: First Geom
     @type geom1: GeomObject
     @param geom2: Second Geom
@@ -248,19 +385,29 @@ def collide2(geom1, geom2, arg, callback):
     @param arg: A user argument that is passed to the callback function
     @param callback: Callback function
     @type callback: callable    
+    @param filter: Combination of the FilterXyz flags
+    @type filter: int
     """
-    cdef void* data
+    cdef _CollideData cd
     cdef object tup
     cdef long id1
     cdef long id2
+    cdef double t, cbtime
 
     id1 = geom1._id()
     id2 = geom2._id()
     
     tup = (callback, arg)
-    data = <void*>tup
+    cd.tup = <void*>tup
+    cd.filter = filter
+    cd.matrix = NULL
+    if _profiling:
+        t = pyode_timer()
+        cbtime = _profile.nearcallback
     # collide_callback is defined in space.pyx
-    dSpaceCollide2(<dGeomID>id1, <dGeomID>id2, data, collide_callback)
+    dSpaceCollide2(<dGeomID>id1, <dGeomID>id2, &cd, collide_callback)
+    if _profiling:
+        _profile_collide(t, cbtime)
 
 
 def areConnected(Body body1, Body body2):
@@ -291,6 +438,16 @@ def CloseODE():
     """
     dCloseODE()
 
+def AllocateODEDataForThread():
+    '''AllocateODEDataForThread() -> bool
+
+    Allocate the per-thread data that ODE needs for collision detection
+    in the calling thread. This has to be called once in every thread
+    (other than the one that imported the module) that does collision
+    detection while other threads do the same. Returns True if the data
+    could be allocated.'''
+    return bool(dAllocateODEDataForThread(dAllocateMaskAll))
+
 def InitODE():
     '''InitODE()
 
@@ -0,0 +1,34 @@
+/*
+ * High resolution wall clock timer used by the profiling code of the
+ * Python ODE wrapper (see profile.pyx). Returns seconds.
+ */
+
+#ifndef PYODE_ODETIMER_H
+#define PYODE_ODETIMER_H
+
+#ifdef _WIN32
+
+#include <windows.h>
+
+static double pyode_timer(void)
+{
+    LARGE_INTEGER freq, count;
+    QueryPerformanceFrequency(&freq);
+    QueryPerformanceCounter(&count);
+    return (double)count.QuadPart/(double)freq.QuadPart;
+}
+
+#else
+
+#include <time.h>
+
+static double pyode_timer(void)
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (double)ts.tv_sec + 1e-9*(double)ts.tv_nsec;
+}
+
+#endif
+
+#endif
@@ -0,0 +1,168 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+# Optional profiling of the collision detection and simulation steps.
+#
+# When profiling is enabled (setProfiling(True)) the wrapper measures
+# the time spent in the individual phases of a frame and counts pairs,
+# contacts, etc. The measurements go into the global _profile struct.
+# When profiling is disabled, every instrumented place only costs a
+# test of the _profiling flag.
+#
+# The profile is not protected against concurrent updates, so it is
+# only accurate when a single thread does collision detection and
+# stepping.
+
+cdef extern from "odetimer.h":
+    double pyode_timer() nogil
+
+cdef struct _Profile:
+    # Accumulated times (in seconds)
+    double broadphase
+    double callback
+    double narrowphase
+    double wrappers
+    double joints
+    double contactjoints
+    double step
+    double empty
+    # Time spent inside near callbacks (Python or native) while
+    # dSpaceCollide() is running. Used to compute the broadphase time.
+    double nearcallback
+    # Counters
+    long npairs
+    long ncontacts
+    long njoints
+    long nsteps
+    long nenabled
+
+cdef int _profiling
+cdef _Profile _profile
+
+# _count_enabled
+cdef long _count_enabled(dBodyID* bodies, int n) nogil:
+    """Return the number of enabled bodies."""
+    cdef int i
+    cdef long res
+
+    res = 0
+    i = 0
+    while i<n:
+        if dBodyIsEnabled(bodies[i]):
+            res = res+1
+        i = i+1
+    return res
+
+# _profile_collide
+cdef void _profile_collide(double t0, double nearcallback0) nogil:
+    """Add the broadphase time of a dSpaceCollide() call.
+
+    t0 is the time when the call started and nearcallback0 the value of
+    _profile.nearcallback at that time.
+    """
+    _profile.broadphase = (_profile.broadphase+pyode_timer()-t0
+                           -(_profile.nearcallback-nearcallback0))
+
+# _profile_step
+cdef void _profile_step(double t0, dBodyID* bodies, int nbodies) nogil:
+    """Add the time of a world step that started at t0."""
+    _profile.step = _profile.step+pyode_timer()-t0
+    _profile.nsteps = _profile.nsteps+1
+    _profile.nenabled = _profile.nenabled+_count_enabled(bodies, nbodies)
+
+def setProfiling(flag):
+    """setProfiling(flag)
+
+    Enable or disable the profiling of collision detection and
+    simulation steps. The collected values can be retrieved with
+    getProfile().
+
+    @param flag: True = collect profiling information
+    @type flag: bool
+    """
+    global _profiling
+    if flag:
+        _profiling = 1
+    else:
+        _profiling = 0
+
+def isProfiling():
+    """isProfiling() -> bool
+
+    Return True if profiling is enabled.
+    """
+    return bool(_profiling)
+
+def resetProfile():
+    """resetProfile()
+
+    Reset all profiling times and counters to zero.
+    """
+    memset(&_profile, 0, sizeof(_Profile))
+
+def getProfile(reset=False):
+    """getProfile(reset=False) -> dict
+
+    Return the profiling information collected since the last reset.
+    The dictionary contains the following times (in seconds):
+
+     - broadphase_time: Time spent in dSpaceCollide() (Space.collide(),
+       collide2() and the native collision methods) excluding the time
+       spent in the near callbacks
+     - callback_time: Time spent in Python near callbacks (including
+       the collide() calls and joint creation done by the callback)
+     - narrowphase_time: Time spent in dCollide()
+     - wrapper_time: Time spent creating Contact objects in collide()
+     - joint_time: Time spent creating contact joints in the native
+       collision methods
+     - contactjoint_time: Time spent creating ContactJoint objects
+       (the ODE joint and its Python wrapper)
+     - step_time: Time spent in dWorldStep() and dWorldQuickStep()
+     - empty_time: Time spent emptying joint groups
+
+    and the following counters:
+
+     - pairs: Number of geom pairs passed to near callbacks
+     - contacts: Number of contact points generated by dCollide()
+     - joints: Number of contact joints created
+     - steps: Number of world steps
+     - bodies_enabled: Sum over all steps of the number of enabled
+       bodies after the step
+
+    @param reset: Reset the profile after reading it
+    @type reset: bool
+    """
+    res = {"broadphase_time" : _profile.broadphase,
+           "callback_time" : _profile.callback,
+           "narrowphase_time" : _profile.narrowphase,
+           "wrapper_time" : _profile.wrappers,
+           "joint_time" : _profile.joints,
+           "contactjoint_time" : _profile.contactjoints,
+           "step_time" : _profile.step,
+           "empty_time" : _profile.empty,
+           "pairs" : _profile.npairs,
+           "contacts" : _profile.ncontacts,
+           "joints" : _profile.njoints,
+           "steps" : _profile.nsteps,
+           "bodies_enabled" : _profile.nenabled}
+    if reset:
+        resetProfile()
+    return res
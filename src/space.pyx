@@ -19,25 +19,397 @@
 # LICENSE and LICENSE-BSD for more details. 
 ######################################################################
 
+# Data for the native near callback. A pointer to this struct is passed
+# as data parameter to dSpaceCollide() by the methods that generate
+# contact joints without calling back into Python (World.collideStep(),
+# SpaceBase.collideIntoJointGroup()).
+cdef struct _NativeCollideData:
+    dWorldID wid
+    dJointGroupID gid
+    # Template for the contact joints (surface parameters and fdir1)
+    dContact contact
+    # Scratch buffer for dCollide() (maxcontacts entries)
+    dContactGeom* contacts
+    int maxcontacts
+    # Number of contact joints created so far
+    long ncontacts
+    # Largest number of contact joints created in one step
+    # (only used by _native_collide_step())
+    long peak
+    # The bodies of the world (only used for profiling)
+    dBodyID* bodies
+    int nbodies
+    # The collision matrix of the space (or NULL)
+    _CollisionMatrixData* matrix
+    # Combine rule for the materials of the geoms (MaterialCombineXyz)
+    int combine
+    # The joints with break thresholds (see World.getBrokenJoints())
+    _Breakable* breakables
+    int nbreakables
+
+# The values of the FilterXyz flags (see SpaceBase.collide())
+cdef enum:
+    _FILTER_SAME_BODY = 0x01
+    _FILTER_CONNECTED = 0x02
+    _FILTER_DISABLED = 0x04
+    _FILTER_STATIC = 0x08
+
+# Data for collide_callback() (see SpaceBase.collide() and collide2()).
+cdef struct _CollideData:
+    # Tuple (Python-Callback, Arguments)
+    void* tup
+    # Combination of the FilterXyz flags
+    int filter
+    # The collision matrix of the space (or NULL)
+    _CollisionMatrixData* matrix
+
+# Run the broadphase on a space and on all (enabled) spaces nested in it.
+# dSpaceCollide() only reports pairs of direct children of a space and the
+# callbacks only call dSpaceCollide2() for space/geom pairs, so pairs of
+# geoms inside the same sub-space have to be collected separately. Every
+# sub-space is visited exactly once.
+cdef void _space_collide_nested(dSpaceID sid, void* data,
+                                dNearCallback* callback) nogil:
+    cdef dGeomID g
+    cdef int i, n
+
+    dSpaceCollide(sid, data, callback)
+    n = dSpaceGetNumGeoms(sid)
+    for i from 0 <= i < n:
+        g = dSpaceGetGeom(sid, i)
+        if dGeomIsSpace(g) and dGeomIsEnabled(g):
+            _space_collide_nested(<dSpaceID>g, data, callback)
+
+# Native near callback.
+# Generates the contacts for a pair of geoms and creates the contact
+# joints right away. Pairs where both geoms belong to the same body (or
+# where both geoms are not attached to a body) are ignored, as well as
+# pairs that are disabled in the collision matrix. The surface parameters
+# are taken from the collision matrix, the materials of the geoms or
+# the contact template (in this order).
+cdef void native_collide_callback(void* data, dGeomID o1, dGeomID o2) nogil:
+    cdef _NativeCollideData* cd
+    cdef dBodyID b1, b2
+    cdef dJointID j
+    cdef dContact contact
+    cdef int i, n, k
+    cdef double t0, t1, t2
+
+    cd = <_NativeCollideData*>data
+
+    if dGeomIsSpace(o1) or dGeomIsSpace(o2):
+        dSpaceCollide2(o1, o2, data, native_collide_callback)
+        return
+
+    if _profiling:
+        _profile.npairs = _profile.npairs+1
+        t0 = pyode_timer()
+
+    b1 = dGeomGetBody(o1)
+    b2 = dGeomGetBody(o2)
+    if b1==b2:
+        return
+
+    contact = cd.contact
+    k = -1
+    if cd.matrix!=NULL:
+        k = _matrix_cell(cd.matrix, o1, o2)
+        if k>=0 and not cd.matrix.enabled[k]:
+            return
+    if k>=0 and cd.matrix.custom[k]:
+        contact.surface = cd.matrix.surfaces[k]
+    else:
+        _material_surface(&contact.surface, o1, o2, cd.combine)
+
+    n = dCollide(o1, o2, cd.maxcontacts, cd.contacts, sizeof(dContactGeom))
+    if _profiling:
+        t1 = pyode_timer()
+    i = 0
+    while i<n:
+        contact.geom = cd.contacts[i]
+        j = dJointCreateContact(cd.wid, cd.gid, &contact)
+        dJointAttach(j, b1, b2)
+        i = i+1
+    cd.ncontacts = cd.ncontacts+n
+
+    if _profiling:
+        t2 = pyode_timer()
+        _profile.narrowphase = _profile.narrowphase+t1-t0
+        _profile.joints = _profile.joints+t2-t1
+        _profile.nearcallback = _profile.nearcallback+t2-t0
+        _profile.ncontacts = _profile.ncontacts+n
+        _profile.njoints = _profile.njoints+n
+
+# Initialize the data for native_collide_callback(). The scratch buffer
+# has to be released with _free_native_collide().
+cdef int _init_native_collide(_NativeCollideData* cd, World world,
+                              JointGroup jointgroup, Contact contact,
+                              int maxcontacts, CollisionMatrix matrix,
+                              int combine) except -1:
+    if maxcontacts<1 or maxcontacts>0xffff:
+        raise ValueError, "maxcontacts must be in the range 1..65535 (got %d)"%maxcontacts
+    cd.wid = world.wid
+    cd.gid = jointgroup.gid
+    if contact is None:
+        contact = Contact()
+    cd.contact = contact._contact
+    cd.maxcontacts = maxcontacts
+    cd.ncontacts = 0
+    cd.peak = 0
+    cd.bodies = world.bodies
+    cd.nbodies = world.nbodies
+    cd.matrix = _matrix_data(matrix)
+    cd.combine = combine
+    cd.breakables = world.breakables
+    cd.nbreakables = world.nbreakables
+    cd.contacts = <dContactGeom*>malloc(maxcontacts*sizeof(dContactGeom))
+    if cd.contacts==NULL:
+        raise MemoryError("can't allocate contact buffer")
+    return 0
+
+cdef void _free_native_collide(_NativeCollideData* cd):
+    free(cd.contacts)
+    cd.contacts = NULL
+
+# Take several collide/step/empty steps (see World.collideStep()).
+# cd must have been initialized with _init_native_collide().
+cdef void _native_collide_step(dSpaceID sid, _NativeCollideData* cd,
+                               dReal stepsize, int steps,
+                               int quickstep) nogil:
+    cdef int i
+    cdef long n
+    cdef double t, cbtime
+
+    i = 0
+    while i<steps:
+        if _profiling:
+            t = pyode_timer()
+            cbtime = _profile.nearcallback
+        n = cd.ncontacts
+        _space_collide_nested(sid, cd, native_collide_callback)
+        if cd.ncontacts-n>cd.peak:
+            cd.peak = cd.ncontacts-n
+        if _profiling:
+            _profile_collide(t, cbtime)
+            t = pyode_timer()
+        if quickstep:
+            dWorldQuickStep(cd.wid, stepsize)
+        else:
+            dWorldStep(cd.wid, stepsize)
+        if _profiling:
+            _profile_step(t, cd.bodies, cd.nbodies)
+            t = pyode_timer()
+        if cd.nbreakables>0:
+            _check_breakables(cd.breakables, cd.nbreakables)
+        dJointGroupEmpty(cd.gid)
+        if _profiling:
+            _profile.empty = _profile.empty+pyode_timer()-t
+        i = i+1
+
+# Buffer for the candidate pairs collected by _pair_callback().
+cdef struct _PairBuffer:
+    # Geom ids (2 per pair)
+    dGeomID* gids
+    long npairs
+    long maxpairs
+    # Set when the buffer couldn't be enlarged
+    int nomem
+
+# Near callback that only records the pair (see getCandidatePairs()).
+cdef void _pair_callback(void* data, dGeomID o1, dGeomID o2) nogil:
+    cdef _PairBuffer* pb
+    cdef dGeomID* gids
+
+    pb = <_PairBuffer*>data
+
+    if dGeomIsSpace(o1) or dGeomIsSpace(o2):
+        dSpaceCollide2(o1, o2, data, _pair_callback)
+        return
+
+    if pb.nomem:
+        return
+
+    if _profiling:
+        _profile.npairs = _profile.npairs+1
+
+    if pb.npairs==pb.maxpairs:
+        gids = <dGeomID*>realloc(pb.gids, 4*pb.maxpairs*sizeof(dGeomID))
+        if gids==NULL:
+            pb.nomem = 1
+            return
+        pb.gids = gids
+        pb.maxpairs = 2*pb.maxpairs
+
+    pb.gids[2*pb.npairs] = o1
+    pb.gids[2*pb.npairs+1] = o2
+    pb.npairs = pb.npairs+1
+
+# Buffer for the contacts collected by _contact_callback().
+cdef struct _ContactBuffer:
+    dContactGeom* contacts
+    long ncontacts
+    long maxcontacts
+    # Maximum number of contacts per geom pair
+    int maxpercollide
+    # Set when the buffer couldn't be enlarged
+    int nomem
+
+# Near callback that generates the contacts of a pair and appends them
+# to a _ContactBuffer (see collideContacts()). Like the native near
+# callback it ignores pairs where both geoms belong to the same body.
+cdef void _contact_callback(void* data, dGeomID o1, dGeomID o2) nogil:
+    cdef _ContactBuffer* cb
+    cdef dContactGeom* contacts
+    cdef long size
+    cdef int n
+    cdef double t
+
+    cb = <_ContactBuffer*>data
+
+    if dGeomIsSpace(o1) or dGeomIsSpace(o2):
+        dSpaceCollide2(o1, o2, data, _contact_callback)
+        return
+
+    if cb.nomem:
+        return
+
+    if _profiling:
+        _profile.npairs = _profile.npairs+1
+
+    if dGeomGetBody(o1)==dGeomGetBody(o2):
+        return
+
+    if cb.ncontacts+cb.maxpercollide>cb.maxcontacts:
+        size = 2*cb.maxcontacts+cb.maxpercollide
+        contacts = <dContactGeom*>realloc(cb.contacts, size*sizeof(dContactGeom))
+        if contacts==NULL:
+            cb.nomem = 1
+            return
+        cb.contacts = contacts
+        cb.maxcontacts = size
+
+    if _profiling:
+        t = pyode_timer()
+    n = dCollide(o1, o2, cb.maxpercollide, cb.contacts+cb.ncontacts, sizeof(dContactGeom))
+    cb.ncontacts = cb.ncontacts+n
+    if _profiling:
+        t = pyode_timer()-t
+        _profile.narrowphase = _profile.narrowphase+t
+        _profile.nearcallback = _profile.nearcallback+t
+        _profile.ncontacts = _profile.ncontacts+n
+
+# Data for _ray_callback() (see raycast()).
+cdef struct _RayData:
+    # The ray geom that is moved from ray to ray
+    dGeomID ray
+    # Scratch buffer for dCollide() (maxhits entries)
+    dContactGeom* contacts
+    int maxhits
+    # The hits of the current ray sorted by distance (maxhits entries)
+    dContactGeom* hits
+    dGeomID* hitgeoms
+    int nhits
+
+# Near callback that collides the ray with a geom and keeps the
+# maxhits closest hits.
+cdef void _ray_callback(void* data, dGeomID o1, dGeomID o2) nogil:
+    cdef _RayData* rd
+    cdef dGeomID g
+    cdef int i, j, k, n
+    cdef double t
+
+    rd = <_RayData*>data
+
+    if o1==rd.ray:
+        g = o2
+    else:
+        g = o1
+    if dGeomIsSpace(g):
+        dSpaceCollide2(rd.ray, g, data, _ray_callback)
+        return
+
+    if _profiling:
+        _profile.npairs = _profile.npairs+1
+        t = pyode_timer()
+    n = dCollide(rd.ray, g, rd.maxhits, rd.contacts, sizeof(dContactGeom))
+    # Insert the hits (the depth is the distance from the ray origin)
+    for i from 0 <= i < n:
+        j = rd.nhits
+        while j>0 and rd.hits[j-1].depth>rd.contacts[i].depth:
+            j = j-1
+        if j==rd.maxhits:
+            continue
+        k = rd.nhits
+        if k==rd.maxhits:
+            k = k-1
+        while k>j:
+            rd.hits[k] = rd.hits[k-1]
+            rd.hitgeoms[k] = rd.hitgeoms[k-1]
+            k = k-1
+        rd.hits[j] = rd.contacts[i]
+        rd.hitgeoms[j] = g
+        if rd.nhits<rd.maxhits:
+            rd.nhits = rd.nhits+1
+    if _profiling:
+        t = pyode_timer()-t
+        _profile.narrowphase = _profile.narrowphase+t
+        _profile.nearcallback = _profile.nearcallback+t
+        _profile.ncontacts = _profile.ncontacts+n
+
+# Append the ids of all enabled geoms that have a point depth function
+# (including those in nested spaces) to the array gids[0] which
+# currently contains ngeoms[0] entries and has room for size entries.
+# The array is enlarged with realloc(). Returns the new room size.
+cdef int _collect_depth_geoms(dSpaceID sid, dGeomID** gids, int* ngeoms,
+                              int size) except -1:
+    cdef dGeomID g
+    cdef dGeomID* newgids
+    cdef int i, n
+
+    n = dSpaceGetNumGeoms(sid)
+    for i from 0 <= i < n:
+        g = dSpaceGetGeom(sid, i)
+        if not dGeomIsEnabled(g):
+            continue
+        if dGeomIsSpace(g):
+            size = _collect_depth_geoms(<dSpaceID>g, gids, ngeoms, size)
+        elif _has_point_depth(g):
+            if ngeoms[0]==size:
+                size = 2*size+16
+                newgids = <dGeomID*>realloc(gids[0], size*sizeof(dGeomID))
+                if newgids==NULL:
+                    raise MemoryError("can't allocate geom buffer")
+                gids[0] = newgids
+            gids[0][ngeoms[0]] = g
+            ngeoms[0] = ngeoms[0]+1
+    return size
+
 # _SpaceIterator
-class _SpaceIterator:
+cdef class _SpaceIterator:
     """Iterates over the geoms inside a Space.
     """
 
-    def __init__(self, space):
-        self.space = space
+    # The space (this reference keeps the space alive)
+    cdef object space
+    cdef dSpaceID sid
+    cdef int idx
+
+    def __cinit__(self):
+        self.space = None
+        self.sid = NULL
         self.idx = 0
         
     def __iter__(self):
         return self
 
-    def next(self):
-        if self.idx>=self.space.getNumGeoms():
+    def __next__(self):
+        cdef dGeomID gid
+
+        if self.sid==NULL or self.idx>=dSpaceGetNumGeoms(self.sid):
             raise StopIteration
-        else:
-            res = self.space.getGeom(self.idx)
-            self.idx = self.idx+1
-            return res
+        gid = dSpaceGetGeom(self.sid, self.idx)
+        self.idx = self.idx+1
+        return _geom_c2py(gid)
 
 
 # SpaceBase
@@ -61,13 +433,19 @@ cdef class SpaceBase(GeomObject):
     # (as the Space is derived from GeomObject) which can be used without
     # casting whenever a *space* id is required.
     cdef dSpaceID sid
+
+    # The collision matrix (or None)
+    cdef CollisionMatrix matrix
+    # The combine rule for materials (MaterialCombineXyz)
+    cdef int combine
     
     # Dictionary with Geomobjects. Key is the ID (geom._id()) and the value
     # is the geom object (Python wrapper). This is used in collide_callback()
 #    cdef object geom_dict
 
     def __cinit__(self, *a, **kw):
-        pass
+        self.matrix = None
+        self.combine = _COMBINE_AVERAGE
 
     def __init__(self, *a, **kw):
         raise NotImplementedError, "The SpaceBase class can't be used directly."
@@ -106,7 +484,12 @@ cdef class SpaceBase(GeomObject):
         return self.getNumGeoms()
 
     def __iter__(self):
-        return _SpaceIterator(self)
+        cdef _SpaceIterator it
+
+        it = _SpaceIterator()
+        it.space = self
+        it.sid = self.sid
+        return it
 
     def add(self, GeomObject geom):
         """add(geom)
@@ -147,6 +530,71 @@ cdef class SpaceBase(GeomObject):
         """
         return dSpaceGetNumGeoms(self.sid)
 
+    def setCollisionMatrix(self, CollisionMatrix matrix):
+        """setCollisionMatrix(matrix)
+
+        Attach a collision matrix to the space (or remove it by passing
+        None). The matrix decides which geom categories collide and
+        which surface parameters their contacts get (see
+        CollisionMatrix).
+
+        collide() and collide2() only use the enable flags of the
+        matrix: pairs of disabled categories never reach the Python
+        callback, but the surface parameters of the matrix are not
+        applied as the callback creates the contact joints itself (it
+        can read them with CollisionMatrix.getSurface()). The surface
+        parameters are only used by the native methods
+        (collideIntoJointGroup(), World.collideStep() and
+        WorldBatch.step()).
+
+        @param matrix: Collision matrix or None
+        @type matrix: CollisionMatrix
+        """
+        self.matrix = matrix
+
+    def getCollisionMatrix(self):
+        """getCollisionMatrix() -> CollisionMatrix
+
+        Return the collision matrix of the space or None.
+        """
+        return self.matrix
+
+    def setMaterialCombine(self, int rule):
+        """setMaterialCombine(rule)
+
+        Set how the materials of two geoms are combined into the surface
+        parameters of their contacts. rule is one of
+        MaterialCombineAverage (the default), MaterialCombineMin,
+        MaterialCombineMax and MaterialCombineMultiply (see Material).
+
+        @param rule: Combine rule
+        @type rule: int
+        """
+        if rule<_COMBINE_AVERAGE or rule>_COMBINE_MULTIPLY:
+            raise ValueError, "Invalid combine rule (%d)"%rule
+        self.combine = rule
+
+    def getMaterialCombine(self):
+        """getMaterialCombine() -> int
+
+        Return the combine rule for materials.
+        """
+        return self.combine
+
+    def geoms(self):
+        """geoms() -> list
+
+        Return a list of all geoms contained within the space (in the
+        same order as getGeom()).
+        """
+        cdef int i, n
+
+        n = dSpaceGetNumGeoms(self.sid)
+        res = []
+        for i from 0 <= i < n:
+            res.append(_geom_c2py(dSpaceGetGeom(self.sid, i)))
+        return res
+
     def getGeom(self, int idx):
         """getGeom(idx) -> GeomObject
 
@@ -162,13 +610,51 @@ cdef class SpaceBase(GeomObject):
             raise IndexError, "geom index out of range"
 
         gid = dSpaceGetGeom(self.sid, idx)
-        if <long>gid not in _geom_c2py_lut:
-            raise RuntimeError, "geom id cannot be translated to a Python object"
+        return _geom_c2py(gid)
 
-        return _geom_c2py_lut[<long>gid]
+    def getAABBs(self, out=None, geoms=False):
+        """getAABBs(out=None, geoms=False) -> array or (array, geoms)
 
-    def collide(self, arg, callback):
-        """collide(arg, callback)
+        Return the axis aligned bounding boxes of all geoms in the space
+        (in the same order as getGeom()) as an array of N*6 floats. Each
+        row has the same layout as the result of GeomObject.getAABB():
+        (minx, maxx, miny, maxy, minz, maxz).
+
+        If out is given it must be a writable buffer of N*6 doubles that
+        receives the boxes and is returned. Otherwise a new array.array
+        is returned. If geoms is True the list of the geom objects
+        (row i belongs to geoms[i]) is returned as well.
+
+        @param out: Output buffer
+        @type out: buffer of doubles
+        @param geoms: Also return the geoms
+        @type geoms: bool
+        """
+        cdef double* res
+        cdef long size
+        cdef int n, i, j
+        cdef dReal aabb[6]
+        cdef dSpaceID sid
+
+        sid = self.sid
+        n = dSpaceGetNumGeoms(sid)
+        if out is None:
+            out = _newdoubles(6*n)
+        _getdoubles(out, 1, &res, &size)
+        _checkcount("out", size, 6*n)
+
+        with nogil:
+            for i from 0 <= i < n:
+                dGeomGetAABB(dSpaceGetGeom(sid, i), aabb)
+                for j from 0 <= j < 6:
+                    res[6*i+j] = aabb[j]
+
+        if geoms:
+            return out, self.geoms()
+        return out
+
+    def collide(self, arg, callback, int filter=0):
+        """collide(arg, callback, filter=0)
 
         Call a callback function one or more times, for all
         potentially intersecting objects in the space. The callback
@@ -183,38 +669,571 @@ cdef class SpaceBase(GeomObject):
         method) on geom1 and geom2, perhaps first determining
         whether to collide them at all based on other information.
 
+        As the callback is a Python function, the global interpreter
+        lock is held during the whole collision detection (see
+        collideIntoJointGroup() for a version that releases it).
+
+        filter is a combination of the following flags. Pairs that
+        match one of the flags are dropped in C and never reach the
+        callback:
+
+         - FilterSameBody: Both geoms are attached to the same body
+         - FilterConnected: The bodies of the geoms are connected by a
+           joint (other than a contact joint)
+         - FilterDisabled: None of the geoms is attached to an enabled
+           body (i.e. the pair can't move)
+         - FilterStatic: None of the geoms is attached to a body
+
+        Pairs that contain a space are always passed to the callback.
+        Pairs of categories that are disabled in the collision matrix
+        of the space (see setCollisionMatrix()) are dropped as well.
+
         @param arg: A user argument that is passed to the callback function
         @param callback: Callback function
         @type callback: callable
+        @param filter: Combination of the FilterXyz flags
+        @type filter: int
         """
         
-        cdef void* data
+        cdef _CollideData cd
         cdef object tup
+        cdef double t, cbtime
         tup = (callback, arg)
-        data = <void*>tup
-        dSpaceCollide(self.sid, data, collide_callback)
-
+        cd.tup = <void*>tup
+        cd.filter = filter
+        cd.matrix = _matrix_data(self.matrix)
+        if _profiling:
+            t = pyode_timer()
+            cbtime = _profile.nearcallback
+        dSpaceCollide(self.sid, &cd, collide_callback)
+        if _profiling:
+            _profile_collide(t, cbtime)
+
+    def getCandidatePairs(self):
+        """getCandidatePairs() -> (pairs, geoms)
+
+        Return all pairs of potentially intersecting geoms in the space.
+        This runs the same broadphase as collide() but instead of
+        calling a Python function for every pair the pairs are collected
+        in C. Geoms inside nested spaces are tested against each other
+        as well, so the result only contains pairs of (non-space) geoms.
+
+        geoms is a list of the geoms that appear in at least one pair
+        and pairs is an array.array of 2*M integers that contains the
+        indices into geoms of the M pairs. With NumPy the pairs can be
+        viewed as an M x 2 array:
+
+         >>> pairs, geoms = space.getCandidatePairs()
+         >>> pairs = numpy.frombuffer(pairs, dtype=numpy.int_).reshape(-1, 2)
+        """
+        cdef _PairBuffer pb
+        cdef dSpaceID sid
+        cdef long* idx
+        cdef long size
+        cdef double t, cbtime
+
+        pb.npairs = 0
+        pb.maxpairs = 64
+        pb.nomem = 0
+        pb.gids = <dGeomID*>malloc(2*pb.maxpairs*sizeof(dGeomID))
+        if pb.gids==NULL:
+            raise MemoryError("can't allocate pair buffer")
+
+        sid = self.sid
+        with nogil:
+            if _profiling:
+                t = pyode_timer()
+                cbtime = _profile.nearcallback
+            _space_collide_nested(sid, &pb, _pair_callback)
+            if _profiling:
+                _profile_collide(t, cbtime)
+
+        try:
+            if pb.nomem:
+                raise MemoryError("can't enlarge pair buffer")
+            pairs = _newlongs(2*pb.npairs)
+            _getlongs(pairs, 1, &idx, &size)
+            geoms = _index_geoms(pb.gids, 2*pb.npairs, idx)
+        finally:
+            free(pb.gids)
+        return pairs, geoms
+
+    def collideContacts(self, positions, normals, depths, pairs,
+                        int maxcontacts=4):
+        """collideContacts(positions, normals, depths, pairs, maxcontacts=4) -> (n, geoms)
+
+        Generate the contacts for all potentially intersecting pairs of
+        geoms in the space and write them into the given arrays. For
+        every contact i the arrays receive:
+
+         - positions[i]: The contact position (3 floats)
+         - normals[i]: The contact normal (3 floats)
+         - depths[i]: The penetration depth (1 float)
+         - pairs[i]: The indices of the two geoms into the returned
+           list geoms (2 integers)
+
+        The arrays must be writable contiguous buffers of C doubles
+        (positions, normals, depths) and C longs (pairs), e.g. NumPy
+        arrays of shape (N,3), (N,3), (N,) and (N,2). Any of them may
+        be None if that value isn't needed. They can be reused from
+        frame to frame, so no Python objects are created per contact.
+
+        The return value is the number of generated contacts n and the
+        list of geoms referenced by pairs. If n is larger than the
+        capacity N of the arrays only the first N contacts were stored.
+        Pairs of geoms attached to the same body (or to no body at
+        all) are ignored. Geoms inside nested spaces are collided with
+        each other as well.
+
+        @param positions: Output buffer for the contact positions
+        @type positions: buffer of doubles
+        @param normals: Output buffer for the contact normals
+        @type normals: buffer of doubles
+        @param depths: Output buffer for the penetration depths
+        @type depths: buffer of doubles
+        @param pairs: Output buffer for the geom indices
+        @type pairs: buffer of longs
+        @param maxcontacts: Maximum number of contacts per geom pair
+        @type maxcontacts: int
+        """
+        cdef _ContactBuffer cb
+        cdef dSpaceID sid
+        cdef double* pos
+        cdef double* nrm
+        cdef double* dep
+        cdef long* idx
+        cdef dGeomID* gids
+        cdef long size, capacity, n, i
+        cdef dContactGeom* c
+        cdef double t, cbtime
+
+        if maxcontacts<1 or maxcontacts>0xffff:
+            raise ValueError, "maxcontacts must be between 1 and 65535"
+
+        # Determine the capacity of the output arrays
+        pos = NULL
+        nrm = NULL
+        dep = NULL
+        idx = NULL
+        capacity = -1
+        if positions is not None:
+            _getdoubles(positions, 1, &pos, &size)
+            capacity = size/3
+        if normals is not None:
+            _getdoubles(normals, 1, &nrm, &size)
+            if capacity<0 or size/3<capacity:
+                capacity = size/3
+        if depths is not None:
+            _getdoubles(depths, 1, &dep, &size)
+            if capacity<0 or size<capacity:
+                capacity = size
+        if pairs is not None:
+            _getlongs(pairs, 1, &idx, &size)
+            if capacity<0 or size/2<capacity:
+                capacity = size/2
+        if capacity<0:
+            capacity = 0
+
+        cb.ncontacts = 0
+        cb.maxcontacts = 64
+        if cb.maxcontacts<maxcontacts:
+            cb.maxcontacts = maxcontacts
+        cb.maxpercollide = maxcontacts
+        cb.nomem = 0
+        cb.contacts = <dContactGeom*>malloc(cb.maxcontacts*sizeof(dContactGeom))
+        if cb.contacts==NULL:
+            raise MemoryError("can't allocate contact buffer")
+
+        sid = self.sid
+        with nogil:
+            if _profiling:
+                t = pyode_timer()
+                cbtime = _profile.nearcallback
+            _space_collide_nested(sid, &cb, _contact_callback)
+            if _profiling:
+                _profile_collide(t, cbtime)
+
+        gids = NULL
+        try:
+            if cb.nomem:
+                raise MemoryError("can't enlarge contact buffer")
+            n = cb.ncontacts
+            if n>capacity:
+                n = capacity
+            for i from 0 <= i < n:
+                c = cb.contacts+i
+                if pos!=NULL:
+                    pos[3*i] = c.pos[0]
+                    pos[3*i+1] = c.pos[1]
+                    pos[3*i+2] = c.pos[2]
+                if nrm!=NULL:
+                    nrm[3*i] = c.normal[0]
+                    nrm[3*i+1] = c.normal[1]
+                    nrm[3*i+2] = c.normal[2]
+                if dep!=NULL:
+                    dep[i] = c.depth
+            geoms = []
+            if idx!=NULL and n>0:
+                gids = <dGeomID*>malloc(2*n*sizeof(dGeomID))
+                if gids==NULL:
+                    raise MemoryError("can't allocate geom buffer")
+                for i from 0 <= i < n:
+                    gids[2*i] = cb.contacts[i].g1
+                    gids[2*i+1] = cb.contacts[i].g2
+                geoms = _index_geoms(gids, 2*n, idx)
+            n = cb.ncontacts
+        finally:
+            free(gids)
+            free(cb.contacts)
+        return n, geoms
+
+    def raycast(self, origins, directions, lengths, int max_hits=1):
+        """raycast(origins, directions, lengths, max_hits=1) -> (distances, points, normals, indices, geoms)
+
+        Cast N rays into the space and return the closest max_hits hits
+        of every ray. The rays are tested with a single internal ray
+        geom that is collided against the space via dSpaceCollide2(),
+        so the space's broadphase is used and the global interpreter
+        lock is released while the rays are cast.
+
+        origins and directions are buffers of N*3 doubles (e.g. NumPy
+        arrays of shape (N,3)), lengths is either a buffer of N doubles
+        or a single float that is used for all rays. The directions
+        don't have to be normalized.
+
+        The result arrays are array.array objects with N*max_hits rows:
+        distances (1 float), points (3 floats), normals (3 floats) and
+        indices (1 integer). The hits of each ray are sorted by distance.
+        indices refers to the returned list geoms. Rows without a hit
+        have a distance of -1 and an index of -1.
+
+        @param origins: Ray origins
+        @type origins: buffer of doubles
+        @param directions: Ray directions
+        @type directions: buffer of doubles
+        @param lengths: Ray lengths
+        @type lengths: buffer of doubles or float
+        @param max_hits: Maximum number of hits per ray
+        @type max_hits: int
+        """
+        cdef _RayData rd
+        cdef double* org
+        cdef double* dirs
+        cdef double* lens
+        cdef double length
+        cdef long n, size, i, j, row, nhits
+        cdef int* nrayhits
+        cdef dContactGeom* hits
+        cdef dGeomID* hitgeoms
+        cdef dSpaceID sid
+        cdef double* dist
+        cdef double* pts
+        cdef double* nrm
+        cdef long* idx
+        cdef long* hitidx
+        cdef double t, cbtime
+
+        if max_hits<1 or max_hits>0xffff:
+            raise ValueError, "max_hits must be between 1 and 65535"
+
+        _getdoubles(origins, 0, &org, &size)
+        if size%3!=0:
+            raise ValueError, "origins must contain N*3 values (got %d)"%size
+        n = size/3
+        _getdoubles(directions, 0, &dirs, &size)
+        _checkcount("directions", size, 3*n)
+        lens = NULL
+        length = 0.0
+        if isinstance(lengths, (int, long, float)):
+            length = lengths
+        else:
+            _getdoubles(lengths, 0, &lens, &size)
+            _checkcount("lengths", size, n)
+
+        distances = _newdoubles(n*max_hits)
+        points = _newdoubles(3*n*max_hits)
+        normals = _newdoubles(3*n*max_hits)
+        indices = _newlongs(n*max_hits)
+        _getdoubles(distances, 1, &dist, &size)
+        _getdoubles(points, 1, &pts, &size)
+        _getdoubles(normals, 1, &nrm, &size)
+        _getlongs(indices, 1, &idx, &size)
+        if n==0:
+            return distances, points, normals, indices, []
+
+        rd.ray = NULL
+        rd.maxhits = max_hits
+        rd.contacts = <dContactGeom*>malloc(max_hits*sizeof(dContactGeom))
+        hits = <dContactGeom*>malloc(n*max_hits*sizeof(dContactGeom))
+        hitgeoms = <dGeomID*>malloc(n*max_hits*sizeof(dGeomID))
+        nrayhits = <int*>malloc(n*sizeof(int))
+        hitidx = NULL
+        try:
+            if rd.contacts==NULL or hits==NULL or hitgeoms==NULL or nrayhits==NULL:
+                raise MemoryError("can't allocate ray buffers")
+            rd.ray = dCreateRay(NULL, 1.0)
+
+            sid = self.sid
+            with nogil:
+                if _profiling:
+                    t = pyode_timer()
+                    cbtime = _profile.nearcallback
+                for i from 0 <= i < n:
+                    dGeomRaySet(rd.ray, org[3*i], org[3*i+1], org[3*i+2],
+                                dirs[3*i], dirs[3*i+1], dirs[3*i+2])
+                    if lens!=NULL:
+                        length = lens[i]
+                    dGeomRaySetLength(rd.ray, length)
+                    rd.hits = hits+i*max_hits
+                    rd.hitgeoms = hitgeoms+i*max_hits
+                    rd.nhits = 0
+                    dSpaceCollide2(rd.ray, <dGeomID>sid, &rd, _ray_callback)
+                    nrayhits[i] = rd.nhits
+                if _profiling:
+                    _profile_collide(t, cbtime)
+
+            # Copy the hits into the result arrays and collect the geoms
+            # of all hits in a contiguous array
+            nhits = 0
+            for i from 0 <= i < n:
+                for j from 0 <= j < max_hits:
+                    row = i*max_hits+j
+                    if j<nrayhits[i]:
+                        dist[row] = hits[row].depth
+                        pts[3*row] = hits[row].pos[0]
+                        pts[3*row+1] = hits[row].pos[1]
+                        pts[3*row+2] = hits[row].pos[2]
+                        nrm[3*row] = hits[row].normal[0]
+                        nrm[3*row+1] = hits[row].normal[1]
+                        nrm[3*row+2] = hits[row].normal[2]
+                        hitgeoms[nhits] = hitgeoms[row]
+                        nhits = nhits+1
+                    else:
+                        dist[row] = -1.0
+                        idx[row] = -1
+
+            hitidx = <long*>malloc((nhits+1)*sizeof(long))
+            if hitidx==NULL:
+                raise MemoryError("can't allocate ray buffers")
+            geoms = _index_geoms(hitgeoms, nhits, hitidx)
+            nhits = 0
+            for i from 0 <= i < n:
+                for j from 0 <= j < nrayhits[i]:
+                    idx[i*max_hits+j] = hitidx[nhits]
+                    nhits = nhits+1
+        finally:
+            if rd.ray!=NULL:
+                dGeomDestroy(rd.ray)
+            free(rd.contacts)
+            free(hits)
+            free(hitgeoms)
+            free(nrayhits)
+            free(hitidx)
+
+        return distances, points, normals, indices, geoms
+
+    def pointDepths(self, points, out=None):
+        """pointDepths(points, out=None) -> array
+
+        Return the depth of N points with respect to all spheres, boxes,
+        capsules and planes in the space (including nested spaces).
+        Disabled geoms and geoms of other classes are ignored.
+
+        The result for a point is the largest depth over all geoms,
+        i.e. the depth in the geom that the point penetrates the most
+        (or, for points outside of all geoms, the negated distance to
+        the closest geom surface). Points inside any geom therefore
+        have a positive value. If the space contains no suitable geoms
+        the result is -Infinity.
+
+        points must be a buffer of N*3 doubles (e.g. a NumPy array of
+        shape (N,3)). If out is given it must be a writable buffer of N
+        doubles that receives the depths and is returned. Otherwise a
+        new array.array is returned.
+
+        @param points: Points
+        @type points: buffer of doubles
+        @param out: Output buffer
+        @type out: buffer of doubles
+        """
+        cdef double* p
+        cdef double* res
+        cdef long size, n, i
+        cdef dGeomID* gids
+        cdef int ngeoms, j
+        cdef dReal d, depth
+
+        _getdoubles(points, 0, &p, &size)
+        if size%3!=0:
+            raise ValueError, "points must contain N*3 values (got %d)"%size
+        n = size/3
+        if out is None:
+            out = _newdoubles(n)
+        _getdoubles(out, 1, &res, &size)
+        _checkcount("out", size, n)
+
+        # Collect the geoms
+        gids = NULL
+        ngeoms = 0
+        try:
+            _collect_depth_geoms(self.sid, &gids, &ngeoms, 0)
+            with nogil:
+                for i from 0 <= i < n:
+                    depth = -dInfinity
+                    for j from 0 <= j < ngeoms:
+                        d = _point_depth(gids[j], p[3*i], p[3*i+1], p[3*i+2])
+                        if d>depth:
+                            depth = d
+                    res[i] = depth
+        finally:
+            free(gids)
+        return out
+
+    def collideIntoJointGroup(self, World world not None,
+                              JointGroup jointgroup not None,
+                              int maxcontacts=4, mu=Infinity, bounce=0.1,
+                              soft_cfm=0.0, mode=ContactBounce):
+        """collideIntoJointGroup(world, jointgroup, maxcontacts=4, mu=Infinity, bounce=0.1, soft_cfm=0.0, mode=ContactBounce) -> int
+
+        Generate the contacts for all potentially intersecting pairs
+        of geoms in the space and create a contact joint for every
+        contact point. This does the same as a call to collide() with
+        a near callback that calls ode.collide() and creates a
+        ContactJoint for every returned Contact, but no Python objects
+        are created for the geom pairs, contacts or contact joints.
+
+        All contact joints use the same surface parameters. Pairs of
+        geoms that are both attached to the same body (or that are
+        both not attached to any body) are skipped. Sub-spaces are
+        tested against the other geoms using collide2() and the geoms
+        inside a sub-space are tested against each other.
+
+        Note that the Python JointGroup object does not know about
+        the created joints, so they can only be destroyed by emptying
+        the group. The Python global interpreter lock is released
+        during the collision detection.
+
+        @param world: The world in which the contact joints are created
+        @type world: World
+        @param jointgroup: The joint group that receives the contact joints
+        @type jointgroup: JointGroup
+        @param maxcontacts: Maximum number of contacts per geom pair
+        @type maxcontacts: int
+        @param mu: Coulomb friction coefficient
+        @type mu: float
+        @param bounce: Restitution parameter
+        @type bounce: float
+        @param soft_cfm: Contact normal "softness" parameter
+        @type soft_cfm: float
+        @param mode: Contact flags (ContactBounce, ContactSoftCFM, ...)
+        @type mode: int
+        @returns: The number of contact joints that were created.
+        """
+        cdef _NativeCollideData cd
+        cdef Contact contact
+        cdef dSpaceID sid
+        cdef double t, cbtime
+
+        contact = Contact()
+        contact._contact.surface.mode = mode
+        contact._contact.surface.mu = mu
+        contact._contact.surface.bounce = bounce
+        contact._contact.surface.soft_cfm = soft_cfm
+
+        _init_native_collide(&cd, world, jointgroup, contact, maxcontacts,
+                             self.matrix, self.combine)
+        sid = self.sid
+        with nogil:
+            if _profiling:
+                t = pyode_timer()
+                cbtime = _profile.nearcallback
+            _space_collide_nested(sid, &cd, native_collide_callback)
+            if _profiling:
+                _profile_collide(t, cbtime)
+        _free_native_collide(&cd)
+        jointgroup._added(cd.ncontacts)
+        return cd.ncontacts
+
+
+# Return True if a pair of geoms is rejected by the FilterXyz flags
+# (see SpaceBase.collide()).
+cdef int _filter_pair(int filter, dGeomID o1, dGeomID o2) nogil:
+    cdef dBodyID b1, b2
+
+    if dGeomIsSpace(o1) or dGeomIsSpace(o2):
+        return 0
+
+    b1 = dGeomGetBody(o1)
+    b2 = dGeomGetBody(o2)
+    if b1==NULL and b2==NULL:
+        return filter & (_FILTER_STATIC | _FILTER_DISABLED)
+    if (filter & _FILTER_SAME_BODY) and b1==b2:
+        return 1
+    if (filter & _FILTER_DISABLED):
+        if (b1==NULL or not dBodyIsEnabled(b1)) and (b2==NULL or not dBodyIsEnabled(b2)):
+            return 1
+    if (filter & _FILTER_CONNECTED) and b1!=NULL and b2!=NULL:
+        if dAreConnectedExcluding(b1, b2, dJointTypeContact):
+            return 1
+    return 0
 
 # Callback function for the dSpaceCollide() call in the Space.collide() method
-# The data parameter is a tuple (Python-Callback, Arguments).
+# The data parameter is a pointer to a _CollideData struct that contains
+# the tuple (Python-Callback, Arguments) and the filter flags.
 # The function calls a Python callback function with 3 arguments:
 # def callback(UserArg, Geom1, Geom2)
 # Geom1 and Geom2 are instances of GeomXyz classes.
 cdef void collide_callback(void* data, dGeomID o1, dGeomID o2):
+    cdef _CollideData* cd
     cdef object tup
 #    cdef Space space
-    cdef long id1, id2
-
-#    if (dGeomGetBody(o1)==dGeomGetBody(o2)):
-#        return
+    cdef double t
+    cdef int k
+
+    cd = <_CollideData*>data
+    if cd.filter and _filter_pair(cd.filter, o1, o2):
+        return
+    if cd.matrix!=NULL and not dGeomIsSpace(o1) and not dGeomIsSpace(o2):
+        k = _matrix_cell(cd.matrix, o1, o2)
+        if k>=0 and not cd.matrix.enabled[k]:
+            return
     
-    tup = <object>data
+    tup = <object>cd.tup
     callback, arg = tup
-    id1 = <long>o1
-    id2 = <long>o2
-    g1=_geom_c2py_lut[id1]
-    g2=_geom_c2py_lut[id2]
-    callback(arg,g1,g2)
+    g1=_geom_c2py(o1)
+    g2=_geom_c2py(o2)
+    if _profiling:
+        _profile.npairs = _profile.npairs+1
+        t = pyode_timer()
+        callback(arg,g1,g2)
+        t = pyode_timer()-t
+        _profile.callback = _profile.callback+t
+        _profile.nearcallback = _profile.nearcallback+t
+    else:
+        callback(arg,g1,g2)
+
+
+# Implementation of World.collideStep()
+cdef long _collide_step(World world, SpaceBase space not None,
+                        JointGroup jointgroup not None, dReal stepsize,
+                        int steps, Contact contact, int maxcontacts,
+                        int quickstep) except -1:
+    cdef _NativeCollideData cd
+    cdef dSpaceID sid
+
+    _init_native_collide(&cd, world, jointgroup, contact, maxcontacts,
+                         space.matrix, space.combine)
+    sid = space.sid
+    with nogil:
+        _native_collide_step(sid, &cd, stepsize, steps, quickstep)
+    _free_native_collide(&cd)
+
+    world._collectBroken()
+
+    # Notify the Python wrappers of joints that were in the group before
+    jointgroup._peak(cd.peak)
+    jointgroup.empty()
+    return cd.ncontacts
 
 
 # SimpleSpace
@@ -245,7 +1264,7 @@ cdef class SimpleSpace(SpaceBase):
         self.gid = <dGeomID>self.sid
 
         dSpaceSetCleanup(self.sid, 0)
-        _geom_c2py_lut[<long>self.sid]=self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, space=None):
         pass
@@ -278,7 +1297,7 @@ cdef class HashSpace(SpaceBase):
         self.gid = <dGeomID>self.sid
 
         dSpaceSetCleanup(self.sid, 0)
-        _geom_c2py_lut[<long>self.sid]=self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, space=None):
         pass
@@ -345,28 +1364,76 @@ cdef class QuadTreeSpace(SpaceBase):
         self.gid = <dGeomID>self.sid
 
         dSpaceSetCleanup(self.sid, 0)
-        _geom_c2py_lut[<long>self.sid]=self
+        dGeomSetData(self.gid, &self.odata)
 
     def __init__(self, center, extents, depth, space=None):
         pass
 
 
+# SweepAndPruneSpace
+cdef class SweepAndPruneSpace(SpaceBase):
+    """Sweep and prune space.
+
+    This space sorts the AABBs of the geoms along the axes and only
+    tests the geoms whose intervals overlap. It works best if the geoms
+    are spread out along the first axis of the axis order (e.g. long
+    corridors or other scenes that extend mainly in one direction) and
+    don't move much between steps.
+
+    The axis order is one of the SAPAxesXYZ, SAPAxesXZY, SAPAxesYXZ,
+    SAPAxesYZX, SAPAxesZXY and SAPAxesZYX constants (the default is
+    SAPAxesXZY, the ODE default).
+
+    Constructor::
+
+      SweepAndPruneSpace(axisorder=SAPAxesXZY, space=None)
+    """
+
+    def __cinit__(self, axisorder=dSAP_AXES_XZY, space=None):
+        cdef SpaceBase sp
+        cdef dSpaceID parentid
+
+        if axisorder not in (dSAP_AXES_XYZ, dSAP_AXES_XZY, dSAP_AXES_YXZ,
+                             dSAP_AXES_YZX, dSAP_AXES_ZXY, dSAP_AXES_ZYX):
+            raise ValueError, "Invalid axis order (%s)"%axisorder
+
+        parentid = NULL
+        if space!=None:
+            sp = space
+            parentid = sp.sid
+
+        self.sid = dSweepAndPruneSpaceCreate(parentid, axisorder)
+
+        # Copy the ID
+        self.gid = <dGeomID>self.sid
+
+        dSpaceSetCleanup(self.sid, 0)
+        dGeomSetData(self.gid, &self.odata)
+
+    def __init__(self, axisorder=dSAP_AXES_XZY, space=None):
+        pass
+
+
 def Space(space_type=0):
     """Space factory function.
 
     Depending on the type argument this function either returns a
-    SimpleSpace (space_type=0) or a HashSpace (space_type=1).
+    SimpleSpace (space_type=0), a HashSpace (space_type=1) or a
+    SweepAndPruneSpace with the default axis order (space_type=2).
 
     This function is provided to remain compatible with previous
     versions of PyODE where there was only one Space class.
     
      >>> space = Space(space_type=0)   # Create a SimpleSpace
      >>> space = Space(space_type=1)   # Create a HashSpace
+     >>> space = Space(space_type=2)   # Create a SweepAndPruneSpace
     """
     if space_type==0:
         return SimpleSpace()
     elif space_type==1:
         return HashSpace()
+    elif space_type==2:
+        return SweepAndPruneSpace()
     else:
         raise ValueError, "Unknown space type (%d)"%space_type
 
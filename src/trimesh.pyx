@@ -50,7 +50,7 @@ cdef class GeomTriMesh(GeomObject):
             sid = sp.sid
         self.gid = dCreateTriMesh(sid, data.tmdid, NULL, NULL, NULL)
 
-        _geom_c2py_lut[<long>self.gid] = self
+        dGeomSetData(self.gid, &self.odata)
 
 
     def __init__(self, TriMeshData data not None, space=None):
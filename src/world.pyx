@@ -19,6 +19,47 @@
 # LICENSE and LICENSE-BSD for more details. 
 ######################################################################
 
+# Number of floats per body in a world snapshot (see World.snapshot())
+cdef enum:
+    _BODY_SNAPSHOT_SIZE = 23
+
+# A joint with break thresholds (see Joint.setBreakThresholds())
+cdef struct _Breakable:
+    dJointID jid
+    # Squared thresholds
+    dReal maxforce2
+    dReal maxtorque2
+    # Borrowed pointer to the Joint object
+    void* joint
+    # Set when the joint broke
+    int broken
+
+# _check_breakables
+cdef int _check_breakables(_Breakable* b, int n) nogil:
+    """Check the joint feedback against the break thresholds.
+
+    Joints that exceed a threshold are disabled and flagged as broken.
+    Returns the number of newly broken joints.
+    """
+    cdef dJointFeedback* fb
+    cdef int i, res
+
+    res = 0
+    for i from 0 <= i < n:
+        if b[i].broken:
+            continue
+        fb = dJointGetFeedback(b[i].jid)
+        if fb==NULL:
+            continue
+        if (fb.f1[0]*fb.f1[0]+fb.f1[1]*fb.f1[1]+fb.f1[2]*fb.f1[2]>b[i].maxforce2
+            or fb.f2[0]*fb.f2[0]+fb.f2[1]*fb.f2[1]+fb.f2[2]*fb.f2[2]>b[i].maxforce2
+            or fb.t1[0]*fb.t1[0]+fb.t1[1]*fb.t1[1]+fb.t1[2]*fb.t1[2]>b[i].maxtorque2
+            or fb.t2[0]*fb.t2[0]+fb.t2[1]*fb.t2[1]+fb.t2[2]*fb.t2[2]>b[i].maxtorque2):
+            dJointDisable(b[i].jid)
+            b[i].broken = 1
+            res = res+1
+    return res
+
 # World
 cdef class World:
     """Dynamics world.
@@ -33,12 +74,269 @@ cdef class World:
 
     cdef dWorldID wid
 
+    # The ids of all bodies in the world (in creation order). ODE has no
+    # API to enumerate the bodies of a world, so the Body objects register
+    # themselves here.
+    cdef dBodyID* bodies
+    cdef int nbodies
+    cdef int maxbodies
+
+    # The joints with break thresholds and the joints that broke since
+    # the last call of getBrokenJoints()
+    cdef _Breakable* breakables
+    cdef int nbreakables
+    cdef int maxbreakables
+    cdef object brokenjoints
+
     def __cinit__(self):
         self.wid = dWorldCreate()
+        self.bodies = NULL
+        self.nbodies = 0
+        self.maxbodies = 0
+        self.breakables = NULL
+        self.nbreakables = 0
+        self.maxbreakables = 0
+        self.brokenjoints = []
 
     def __dealloc__(self):
         if self.wid!=NULL:
             dWorldDestroy(self.wid)
+        if self.bodies!=NULL:
+            free(self.bodies)
+        if self.breakables!=NULL:
+            free(self.breakables)
+
+    # _addBody
+    cdef int _addBody(self, dBodyID bid) except -1:
+        """Register a new body (called by the Body constructor)."""
+        cdef dBodyID* bodies
+        cdef int n
+
+        if self.nbodies==self.maxbodies:
+            n = 2*self.maxbodies
+            if n<16:
+                n = 16
+            bodies = <dBodyID*>realloc(self.bodies, n*sizeof(dBodyID))
+            if bodies==NULL:
+                raise MemoryError("can't allocate body array")
+            self.bodies = bodies
+            self.maxbodies = n
+        self.bodies[self.nbodies] = bid
+        self.nbodies = self.nbodies+1
+        return 0
+
+    # _removeBody
+    cdef void _removeBody(self, dBodyID bid):
+        """Unregister a body (called when the body is destroyed)."""
+        cdef int i
+
+        # Search backwards as the most recently created bodies are
+        # usually destroyed first
+        i = self.nbodies-1
+        while i>=0:
+            if self.bodies[i]==bid:
+                memmove(&self.bodies[i], &self.bodies[i+1],
+                        (self.nbodies-i-1)*sizeof(dBodyID))
+                self.nbodies = self.nbodies-1
+                return
+            i = i-1
+
+    # _setBreakable
+    cdef int _setBreakable(self, dJointID jid, void* joint,
+                           dReal maxforce, dReal maxtorque) except -1:
+        """Register a joint with break thresholds or update its thresholds."""
+        cdef _Breakable* b
+        cdef int i, n
+
+        i = 0
+        while i<self.nbreakables and self.breakables[i].jid!=jid:
+            i = i+1
+        if i==self.nbreakables:
+            if self.nbreakables==self.maxbreakables:
+                n = 2*self.maxbreakables
+                if n<16:
+                    n = 16
+                b = <_Breakable*>realloc(self.breakables, n*sizeof(_Breakable))
+                if b==NULL:
+                    raise MemoryError("can't allocate breakable joint array")
+                self.breakables = b
+                self.maxbreakables = n
+            self.nbreakables = self.nbreakables+1
+        self.breakables[i].jid = jid
+        self.breakables[i].joint = joint
+        self.breakables[i].maxforce2 = maxforce*maxforce
+        self.breakables[i].maxtorque2 = maxtorque*maxtorque
+        self.breakables[i].broken = 0
+        return 0
+
+    # _removeBreakable
+    cdef void _removeBreakable(self, dJointID jid):
+        """Unregister a joint with break thresholds."""
+        cdef int i
+
+        i = 0
+        while i<self.nbreakables:
+            if self.breakables[i].jid==jid:
+                self.nbreakables = self.nbreakables-1
+                self.breakables[i] = self.breakables[self.nbreakables]
+                return
+            i = i+1
+
+    # _collectBroken
+    cdef void _collectBroken(self):
+        """Move the joints that were flagged as broken to the broken list."""
+        cdef int i
+
+        i = 0
+        while i<self.nbreakables:
+            if self.breakables[i].broken:
+                self.brokenjoints.append(<object>self.breakables[i].joint)
+                self.nbreakables = self.nbreakables-1
+                self.breakables[i] = self.breakables[self.nbreakables]
+            else:
+                i = i+1
+
+    # _checkBreakables
+    cdef void _checkBreakables(self):
+        """Check the break thresholds after a step."""
+        if self.nbreakables>0:
+            if _check_breakables(self.breakables, self.nbreakables):
+                self._collectBroken()
+
+    # getBrokenJoints
+    def getBrokenJoints(self):
+        """getBrokenJoints() -> list
+
+        Return the joints that broke since the last call (in the order
+        in which they were detected) and clear the list.
+
+        After every step (step(), quickStep(), collideStep() and
+        WorldBatch.step()) the forces and torques of all joints with
+        break thresholds (see Joint.setBreakThresholds()) are checked
+        in C. A joint that exceeds one of its thresholds is disabled
+        and added to this list.
+        """
+        res = self.brokenjoints
+        self.brokenjoints = []
+        return res
+
+    # getNumBodies
+    def getNumBodies(self):
+        """getNumBodies() -> int
+
+        Return the number of bodies in the world.
+        """
+        return self.nbodies
+
+    # snapshot
+    def snapshot(self, out=None):
+        """snapshot(out=None) -> array
+
+        Save the state of all bodies in the world. The returned array
+        can be passed to restore() to reset the bodies to the saved
+        state (e.g. for rollback).
+
+        For every body (in creation order) the snapshot stores the
+        position, quaternion, linear and angular velocity, the
+        accumulated force and torque, the enabled flag and the
+        auto-disable settings (flag, steps and time). The internal
+        auto-disable idle counters of ODE are not accessible; restoring
+        an enabled body resets them.
+
+        If out is given it must be a writable contiguous buffer of C
+        doubles with getNumBodies()*23 elements (for example the array
+        returned by a previous call). The snapshot is written into
+        this buffer and out is returned. Otherwise a new array.array
+        is returned.
+
+        @param out: Output buffer
+        @type out: buffer of doubles
+        """
+        cdef double* buf
+        cdef long size
+        cdef int i
+        cdef dBodyID b
+        cdef dReal* p
+
+        if out is None:
+            out = _newdoubles(self.nbodies*_BODY_SNAPSHOT_SIZE)
+        _getdoubles(out, 1, &buf, &size)
+        _checkcount("out", size, self.nbodies*_BODY_SNAPSHOT_SIZE)
+
+        for i from 0 <= i < self.nbodies:
+            b = self.bodies[i]
+            p = <dReal*>dBodyGetPosition(b)
+            buf[0] = p[0]
+            buf[1] = p[1]
+            buf[2] = p[2]
+            p = <dReal*>dBodyGetQuaternion(b)
+            buf[3] = p[0]
+            buf[4] = p[1]
+            buf[5] = p[2]
+            buf[6] = p[3]
+            p = <dReal*>dBodyGetLinearVel(b)
+            buf[7] = p[0]
+            buf[8] = p[1]
+            buf[9] = p[2]
+            p = <dReal*>dBodyGetAngularVel(b)
+            buf[10] = p[0]
+            buf[11] = p[1]
+            buf[12] = p[2]
+            p = <dReal*>dBodyGetForce(b)
+            buf[13] = p[0]
+            buf[14] = p[1]
+            buf[15] = p[2]
+            p = <dReal*>dBodyGetTorque(b)
+            buf[16] = p[0]
+            buf[17] = p[1]
+            buf[18] = p[2]
+            buf[19] = dBodyIsEnabled(b)
+            buf[20] = dBodyGetAutoDisableFlag(b)
+            buf[21] = dBodyGetAutoDisableSteps(b)
+            buf[22] = dBodyGetAutoDisableTime(b)
+            buf = buf+_BODY_SNAPSHOT_SIZE
+        return out
+
+    # restore
+    def restore(self, snapshot):
+        """restore(snapshot)
+
+        Reset all bodies to the state saved by snapshot(). The number
+        of bodies in the world must not have changed since the
+        snapshot was taken.
+
+        @param snapshot: A snapshot returned by snapshot()
+        @type snapshot: buffer of doubles
+        """
+        cdef double* buf
+        cdef long size
+        cdef int i
+        cdef dBodyID b
+        cdef dQuaternion q
+
+        _getdoubles(snapshot, 0, &buf, &size)
+        _checkcount("snapshot", size, self.nbodies*_BODY_SNAPSHOT_SIZE)
+
+        for i from 0 <= i < self.nbodies:
+            b = self.bodies[i]
+            dBodySetPosition(b, buf[0], buf[1], buf[2])
+            q[0] = buf[3]
+            q[1] = buf[4]
+            q[2] = buf[5]
+            q[3] = buf[6]
+            dBodySetQuaternion(b, q)
+            dBodySetLinearVel(b, buf[7], buf[8], buf[9])
+            dBodySetAngularVel(b, buf[10], buf[11], buf[12])
+            dBodySetForce(b, buf[13], buf[14], buf[15])
+            dBodySetTorque(b, buf[16], buf[17], buf[18])
+            dBodySetAutoDisableFlag(b, <int>buf[20])
+            dBodySetAutoDisableSteps(b, <int>buf[21])
+            dBodySetAutoDisableTime(b, buf[22])
+            if buf[19]!=0:
+                dBodyEnable(b)
+            else:
+                dBodyDisable(b)
+            buf = buf+_BODY_SNAPSHOT_SIZE
 
     # setGravity
     def setGravity(self, gravity):
@@ -120,11 +418,26 @@ cdef class World:
         For large systems this will use a lot of memory and can be
         very slow, but this is currently the most accurate method.
 
+        The Python global interpreter lock is released while ODE
+        computes the step. Joints that exceed their break thresholds
+        are disabled after the step (see getBrokenJoints()).
+
         @param stepsize: Time step
         @type stepsize: float
         """
-
-        dWorldStep(self.wid, stepsize)
+        cdef dWorldID wid
+        cdef dReal h
+        cdef double t
+
+        wid = self.wid
+        h = stepsize
+        if _profiling:
+            t = pyode_timer()
+        with nogil:
+            dWorldStep(wid, h)
+        if _profiling:
+            _profile_step(t, self.bodies, self.nbodies)
+        self._checkBreakables()
 
     # quickStep
     def quickStep(self, stepsize):
@@ -138,10 +451,74 @@ cdef class World:
         For large systems this is a lot faster than dWorldStep, but it
         is less accurate.
 
+        The Python global interpreter lock is released while ODE
+        computes the step. Joints that exceed their break thresholds
+        are disabled after the step (see getBrokenJoints()).
+
         @param stepsize: Time step
         @type stepsize: float        
         """
-        dWorldQuickStep(self.wid, stepsize)
+        cdef dWorldID wid
+        cdef dReal h
+        cdef double t
+
+        wid = self.wid
+        h = stepsize
+        if _profiling:
+            t = pyode_timer()
+        with nogil:
+            dWorldQuickStep(wid, h)
+        if _profiling:
+            _profile_step(t, self.bodies, self.nbodies)
+        self._checkBreakables()
+
+    # collideStep
+    def collideStep(self, space, jointgroup, stepsize, int steps=1,
+                    contact=None, int maxcontacts=4, quickstep=False):
+        """collideStep(space, jointgroup, stepsize, steps=1, contact=None, maxcontacts=4, quickstep=False) -> int
+
+        Run several simulation steps without returning to Python in
+        between. Each step does the equivalent of::
+
+          space.collide(None, near_callback)
+          world.step(stepsize)      # or world.quickStep(stepsize)
+          jointgroup.empty()
+
+        where near_callback calls collide() on each pair of potentially
+        intersecting geoms and creates a ContactJoint (inside
+        jointgroup) for every contact point. The contact surface
+        parameters are copied from the contact argument, which is used
+        as a template (the geometry information of the template is
+        ignored). If contact is None, a default Contact object is used.
+
+        Pairs of geoms that are both attached to the same body (or
+        that are both not attached to any body) are skipped. If the
+        space contains other spaces, their geoms are tested against
+        the other geoms using collide2() and against each other (the
+        broadphase runs once on every enabled sub-space).
+
+        The joint group is empty when the method returns. The Python
+        global interpreter lock is released while the steps are
+        computed.
+
+        @param space: The space containing the geoms
+        @type space: SpaceBase
+        @param jointgroup: The joint group that receives the contact joints
+        @type jointgroup: JointGroup
+        @param stepsize: Time step
+        @type stepsize: float
+        @param steps: Number of steps to take
+        @type steps: int
+        @param contact: Template for the contact surface parameters
+        @type contact: Contact
+        @param maxcontacts: Maximum number of contacts per geom pair
+        @type maxcontacts: int
+        @param quickstep: Use quickStep() instead of step()
+        @type quickstep: bool
+        @returns: The total number of contact joints that were created.
+        """
+        return _collide_step(self, space, jointgroup, stepsize, steps,
+                             contact, maxcontacts, quickstep)
 
     # setQuickStepNumIterations
     def setQuickStepNumIterations(self, num):
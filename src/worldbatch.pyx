@@ -0,0 +1,410 @@
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+import threading
+
+# Step the worlds start..end-1 of a batch
+cdef void _batch_step(_NativeCollideData* cds, dSpaceID* sids, int start,
+                      int end, dReal stepsize, int steps,
+                      int quickstep) nogil:
+    cdef int i
+
+    i = start
+    while i<end:
+        _native_collide_step(sids[i], &cds[i], stepsize, steps, quickstep)
+        i = i+1
+
+# _BatchWorker
+cdef class _BatchWorker:
+    """A long-lived thread that steps a range of worlds of a WorldBatch.
+
+    The thread allocates its ODE thread data once when it starts and
+    then waits for work. WorldBatch.step() fills in the parameters of
+    the step, sets the start event and waits for the done event. The
+    worker doesn't reference the batch, so the batch can be
+    deallocated while the thread is waiting (see stop()).
+    """
+
+    # Parameters of the current step
+    cdef _NativeCollideData* cds
+    cdef dSpaceID* sids
+    cdef int start
+    cdef int end
+    cdef dReal stepsize
+    cdef int steps
+    cdef int quickstep
+    # Set when the thread should terminate
+    cdef int stopped
+
+    cdef object startevent
+    cdef object doneevent
+    cdef object thread
+
+    def __cinit__(self):
+        self.cds = NULL
+        self.sids = NULL
+        self.start = 0
+        self.end = 0
+        self.stopped = 0
+
+    def __init__(self):
+        self.startevent = threading.Event()
+        self.doneevent = threading.Event()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    # _run
+    def _run(self):
+        """Main loop of the thread."""
+        cdef _NativeCollideData* cds
+        cdef dSpaceID* sids
+        cdef int start, end, steps, quickstep
+        cdef dReal stepsize
+
+        dAllocateODEDataForThread(dAllocateMaskAll)
+        try:
+            while 1:
+                self.startevent.wait()
+                self.startevent.clear()
+                if self.stopped:
+                    break
+                cds = self.cds
+                sids = self.sids
+                start = self.start
+                end = self.end
+                stepsize = self.stepsize
+                steps = self.steps
+                quickstep = self.quickstep
+                with nogil:
+                    _batch_step(cds, sids, start, end, stepsize, steps, quickstep)
+                self.doneevent.set()
+        finally:
+            dCleanupODEAllDataForThread()
+
+    # run
+    cdef void run(self, _NativeCollideData* cds, dSpaceID* sids, int start,
+                  int end, dReal stepsize, int steps, int quickstep):
+        """Start stepping the worlds start..end-1 (see wait())."""
+        self.cds = cds
+        self.sids = sids
+        self.start = start
+        self.end = end
+        self.stepsize = stepsize
+        self.steps = steps
+        self.quickstep = quickstep
+        self.doneevent.clear()
+        self.startevent.set()
+
+    # wait
+    cdef void wait(self):
+        """Wait until the work passed to run() is done."""
+        self.doneevent.wait()
+        self.cds = NULL
+        self.sids = NULL
+
+    # stop
+    cdef void stop(self):
+        """Let the thread terminate (without waiting for it)."""
+        self.stopped = 1
+        self.startevent.set()
+
+
+# WorldBatch
+cdef class WorldBatch:
+    """A batch of structurally identical worlds that are stepped together.
+
+    The batch owns n worlds, each with its own space and contact joint
+    group. The content of every world is created by a build function
+    which is called as build(world, space) and has to return a
+    sequence of bodies or a tuple (bodies, objects) where objects is
+    a sequence of all other objects that build() created (geoms,
+    joints, ...). Every call must return the same number of bodies
+    (the batch is meant for n copies of the same setup, e.g. for
+    batched rollouts). The batch keeps a reference to the bodies and
+    the objects of every world (see the objects attribute), so geoms
+    and joints that are only referenced by build() stay alive as long
+    as the batch.
+
+    The state of all bodies can be read or written with one call,
+    using arrays with one row per world. The bodies of a row appear in
+    the order returned by build().
+
+    Constructor::
+
+      WorldBatch(n, build, space_type=0)
+
+    space_type is passed to the Space() factory function.
+
+    If step() is called with threads>1 the batch starts worker threads
+    which are kept until the batch is deallocated or close() is
+    called.
+    """
+
+    cdef readonly object worlds
+    cdef readonly object spaces
+    cdef readonly object jointgroups
+    # A tuple with the objects returned by build() for every world
+    cdef readonly object objects
+    # All bodies of all worlds (world-major order)
+    cdef BodySet bodies
+    cdef int nworlds
+    cdef int nbodies
+    cdef dSpaceID* sids
+
+    # The collision data of the current step() call (NULL when step()
+    # isn't running)
+    cdef _NativeCollideData* cds
+    # The _BatchWorker objects (started on demand by step())
+    cdef object workers
+
+    def __cinit__(self, *a, **kw):
+        self.sids = NULL
+        self.cds = NULL
+        self.nworlds = 0
+        self.nbodies = 0
+        self.workers = []
+
+    def __init__(self, int n, build, space_type=0):
+        cdef SpaceBase sp
+        cdef int i
+
+        if n<1:
+            raise ValueError, "a WorldBatch needs at least one world (got %d)"%n
+
+        worlds = []
+        spaces = []
+        jointgroups = []
+        bodies = []
+        objects = []
+        for i from 0 <= i < n:
+            world = World()
+            space = Space(space_type)
+            res = build(world, space)
+            objs = ()
+            if isinstance(res, tuple) and len(res)==2 and not isinstance(res[0], Body):
+                res, objs = res
+                objs = tuple(objs)
+            res = list(res)
+            if i==0:
+                self.nbodies = len(res)
+            elif len(res)!=self.nbodies:
+                raise ValueError, "build() returned %d bodies for world %d (expected %d)"%(len(res), i, self.nbodies)
+            worlds.append(world)
+            spaces.append(space)
+            jointgroups.append(JointGroup())
+            bodies.extend(res)
+            objects.append(objs)
+
+        self.sids = <dSpaceID*>malloc(n*sizeof(dSpaceID))
+        if self.sids==NULL:
+            raise MemoryError("can't allocate space id array")
+        for i from 0 <= i < n:
+            sp = spaces[i]
+            self.sids[i] = sp.sid
+
+        self.worlds = tuple(worlds)
+        self.spaces = tuple(spaces)
+        self.jointgroups = tuple(jointgroups)
+        self.objects = tuple(objects)
+        self.bodies = BodySet(bodies)
+        self.nworlds = n
+
+    def __dealloc__(self):
+        self.close()
+        if self.sids!=NULL:
+            free(self.sids)
+
+    # close
+    def close(self):
+        """close()
+
+        Stop the worker threads that were started by step(). The batch
+        can still be used afterwards (the threads are started again
+        when needed).
+        """
+        cdef _BatchWorker wk
+
+        if self.cds!=NULL:
+            raise RuntimeError, "WorldBatch.step() is running"
+        for wk in self.workers:
+            wk.stop()
+        self.workers = []
+
+    def __len__(self):
+        return self.nworlds
+
+    # getNumBodies
+    def getNumBodies(self):
+        """getNumBodies() -> int
+
+        Return the number of bodies per world.
+        """
+        return self.nbodies
+
+    # getBodies
+    def getBodies(self):
+        """getBodies() -> BodySet
+
+        Return a BodySet with the bodies of all worlds (all bodies of
+        world 0, then all bodies of world 1, etc.).
+        """
+        return self.bodies
+
+    # step
+    def step(self, stepsize, int steps=1, contact=None, int maxcontacts=4,
+             quickstep=False, int threads=1):
+        """step(stepsize, steps=1, contact=None, maxcontacts=4, quickstep=False, threads=1) -> int
+
+        Step all worlds. For every world this does the same as
+        World.collideStep() with the respective space and joint group
+        (see there for the meaning of the arguments).
+
+        If threads is greater than 1, the worlds are distributed over
+        that many threads which step their worlds in parallel (the
+        global interpreter lock is released while stepping). This
+        requires an ODE library that supports collision detection in
+        several threads (see the module documentation). The threads
+        are started on the first call and reused by later calls; each
+        allocates its ODE thread data only once (see close()).
+
+        @param stepsize: Time step
+        @type stepsize: float
+        @param steps: Number of steps to take
+        @type steps: int
+        @param contact: Template for the contact surface parameters
+        @type contact: Contact
+        @param maxcontacts: Maximum number of contacts per geom pair
+        @type maxcontacts: int
+        @param quickstep: Use quickStep() instead of step()
+        @type quickstep: bool
+        @param threads: Number of threads
+        @type threads: int
+        @returns: The total number of contact joints that were created.
+        """
+        cdef long ncontacts
+        cdef int i, n, chunk, end
+        cdef SpaceBase sp
+        cdef World w
+        cdef JointGroup jg
+        cdef _BatchWorker wk
+        cdef _NativeCollideData* cds
+        cdef dSpaceID* sids
+        cdef dReal h
+        cdef int qs
+
+        if self.cds!=NULL:
+            raise RuntimeError, "WorldBatch.step() is already running"
+
+        n = self.nworlds
+        self.cds = <_NativeCollideData*>malloc(n*sizeof(_NativeCollideData))
+        if self.cds==NULL:
+            raise MemoryError("can't allocate collision data")
+        for i from 0 <= i < n:
+            self.cds[i].contacts = NULL
+
+        try:
+            for i from 0 <= i < n:
+                sp = self.spaces[i]
+                _init_native_collide(&self.cds[i], self.worlds[i],
+                                     self.jointgroups[i], contact,
+                                     maxcontacts, sp.matrix, sp.combine)
+            cds = self.cds
+            sids = self.sids
+            h = stepsize
+            qs = quickstep
+
+            if threads>n:
+                threads = n
+            if threads<1:
+                threads = 1
+            chunk = (n+threads-1)/threads
+            while len(self.workers)<threads-1:
+                self.workers.append(_BatchWorker())
+            # Hand the other chunks to the workers and step the first
+            # chunk in this thread
+            for i from 1 <= i < threads:
+                end = (i+1)*chunk
+                if end>n:
+                    end = n
+                wk = self.workers[i-1]
+                wk.run(cds, sids, i*chunk, end, h, steps, qs)
+            with nogil:
+                _batch_step(cds, sids, 0, chunk, h, steps, qs)
+            for i from 1 <= i < threads:
+                wk = self.workers[i-1]
+                wk.wait()
+
+            ncontacts = 0
+            for i from 0 <= i < n:
+                ncontacts = ncontacts+self.cds[i].ncontacts
+                jg = self.jointgroups[i]
+                jg._peak(self.cds[i].peak)
+                w = self.worlds[i]
+                w._collectBroken()
+        finally:
+            for i from 0 <= i < n:
+                _free_native_collide(&self.cds[i])
+            free(self.cds)
+            self.cds = NULL
+
+        # Notify the Python wrappers of joints that were in the groups
+        for jg in self.jointgroups:
+            jg.empty()
+        return ncontacts
+
+    # getState
+    def getState(self, out=None, int fields=StateAll):
+        """getState(out=None, fields=StateAll) -> array
+
+        Return the state of all bodies as an array with one row per
+        world, i.e. an array of shape (n, bodies*k). See
+        BodySet.getState() for the meaning of the arguments.
+        """
+        return self.bodies.getState(out, fields)
+
+    # setState
+    def setState(self, state, int fields=StateAll):
+        """setState(state, fields=StateAll)
+
+        Set the state of all bodies from an array with one row per
+        world (shape (n, bodies*k)). See BodySet.setState() for the
+        meaning of the arguments.
+        """
+        self.bodies.setState(state, fields)
+
+    # addForces
+    def addForces(self, forces):
+        """addForces(forces)
+
+        Add external forces to all bodies. forces is an array of shape
+        (n, bodies*3) with one row per world.
+        """
+        self.bodies.addForces(forces)
+
+    # addTorques
+    def addTorques(self, torques):
+        """addTorques(torques)
+
+        Add external torques to all bodies. torques is an array of
+        shape (n, bodies*3) with one row per world.
+        """
+        self.bodies.addTorques(torques)
@@ -0,0 +1,1120 @@
+#!/usr/bin/env python
+
+######################################################################
+# Python Open Dynamics Engine Wrapper
+# Copyright (C) 2004 PyODE developers (see file AUTHORS)
+# All rights reserved.
+#
+# This library is free software; you can redistribute it and/or
+# modify it under the terms of EITHER:
+#   (1) The GNU Lesser General Public License as published by the Free
+#       Software Foundation; either version 2.1 of the License, or (at
+#       your option) any later version. The text of the GNU Lesser
+#       General Public License is included with this library in the
+#       file LICENSE.
+#   (2) The BSD-style license that is included with this library in
+#       the file LICENSE-BSD.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the files
+# LICENSE and LICENSE-BSD for more details. 
+######################################################################
+
+import unittest
+import array
+import threading
+import ode
+
+def _doubles(values):
+    return array.array("d", values)
+
+def _longs(values):
+    return array.array("l", values)
+
+class TestCollideStep(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.world.setGravity((0, -9.81, 0))
+        self.space = ode.SimpleSpace()
+        self.group = ode.JointGroup()
+        self.floor = ode.GeomPlane(self.space, (0, 1, 0), 0)
+        self.body = ode.Body(self.world)
+        m = ode.Mass()
+        m.setSphere(1000.0, 0.5)
+        self.body.setMass(m)
+        self.body.setPosition((0, 0.45, 0))
+        self.geom = ode.GeomSphere(self.space, 0.5)
+        self.geom.setBody(self.body)
+
+    def testContacts(self):
+        n = self.world.collideStep(self.space, self.group, 0.01, steps=5)
+        self.assertTrue(n>=5)
+        # The joints are destroyed after every step
+        self.assertEqual(self.group.stats()["joints"], 0)
+        # The sphere rests on the plane instead of falling through it
+        self.assertTrue(self.body.getPosition()[1]>0.3)
+
+    def testNoContacts(self):
+        self.body.setPosition((0, 10, 0))
+        n = self.world.collideStep(self.space, self.group, 0.01, steps=2)
+        self.assertEqual(n, 0)
+        self.assertTrue(self.body.getPosition()[1]<10)
+
+    def testNestedSpace(self):
+        # Geoms inside the same sub-space are collided with each other
+        space = ode.SimpleSpace()
+        sub = ode.SimpleSpace(space)
+        geoms = []
+        for z in (0.0, 0.9):
+            body = ode.Body(self.world)
+            body.setPosition((0, 10, z))
+            geom = ode.GeomSphere(sub, 0.5)
+            geom.setBody(body)
+            geoms.append(geom)
+        n = self.world.collideStep(space, self.group, 0.001)
+        self.assertTrue(n>=1)
+
+class TestSnapshot(unittest.TestCase):
+    def testRoundTrip(self):
+        world = ode.World()
+        world.setGravity((0, -9.81, 0))
+        bodies = [ode.Body(world) for i in range(3)]
+        for i, b in enumerate(bodies):
+            b.setPosition((i, 2.0*i, 0))
+            b.setLinearVel((0, 0, i))
+        snap = world.snapshot()
+        self.assertEqual(len(snap), 3*23)
+        before = [(b.getPosition(), b.getQuaternion(), b.getLinearVel(),
+                   b.getAngularVel()) for b in bodies]
+        for i in range(10):
+            world.step(0.01)
+        self.assertNotEqual(bodies[1].getPosition(), before[1][0])
+        world.restore(snap)
+        after = [(b.getPosition(), b.getQuaternion(), b.getLinearVel(),
+                  b.getAngularVel()) for b in bodies]
+        self.assertEqual(after, before)
+        # A snapshot can be written into an existing buffer
+        self.assertTrue(world.snapshot(snap) is snap)
+
+    def testWrongSize(self):
+        world = ode.World()
+        ode.Body(world)
+        self.assertRaises(ValueError, world.restore, array.array("d", [0.0]*5))
+
+class TestBodySet(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.bodies = [ode.Body(self.world) for i in range(2)]
+        self.set = ode.BodySet(self.bodies)
+
+    def testGetState(self):
+        self.bodies[1].setPosition((1, 2, 3))
+        self.bodies[1].setAngularVel((4, 5, 6))
+        state = self.set.getState()
+        self.assertEqual(len(state), 2*13)
+        self.assertEqual(list(state[13:16]), [1, 2, 3])
+        self.assertEqual(list(state[16:20]), [1, 0, 0, 0])
+        self.assertEqual(list(state[23:26]), [4, 5, 6])
+
+    def testFields(self):
+        self.bodies[0].setLinearVel((7, 8, 9))
+        state = self.set.getState(fields=ode.StateLinearVel)
+        self.assertEqual(list(state), [7, 8, 9, 0, 0, 0])
+
+    def testSetState(self):
+        state = _doubles([1, 2, 3, 4, 5, 6])
+        self.set.setState(state, ode.StatePosition)
+        self.assertEqual(self.bodies[0].getPosition(), (1, 2, 3))
+        self.assertEqual(self.bodies[1].getPosition(), (4, 5, 6))
+        # Round trip of the complete state
+        full = self.set.getState()
+        other = ode.BodySet([ode.Body(self.world) for i in range(2)])
+        other.setState(full)
+        self.assertEqual(list(other.getState()), list(full))
+
+    def testWrongSize(self):
+        self.assertRaises(ValueError, self.set.setState, _doubles([0.0]*5))
+
+    def testWrongType(self):
+        # Arrays with the right number of bytes but another item type
+        # are rejected instead of being reinterpreted
+        floats = array.array("f", [0.0]*(2*2*13))
+        self.assertRaises(TypeError, self.set.setState, floats)
+        self.assertRaises(TypeError, self.set.getState, floats)
+        longs = array.array("l", [0]*(2*13*8//array.array("l").itemsize))
+        self.assertRaises(TypeError, self.set.setState, longs)
+        # The same applies to integer arrays
+        world = ode.World()
+        group = ode.JointGroup()
+        contacts = (_doubles([0.0]*3), _doubles([0.0, 0.0, 1.0]), _doubles([0.0]))
+        pairs = _doubles([0.0])
+        self.assertRaises(TypeError, group.addContacts, world, contacts,
+                          pairs, self.set)
+
+class TestContactBuffer(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.group = ode.JointGroup()
+        self.geoms = []
+        for x in (0.0, 0.9):
+            body = ode.Body(self.world)
+            body.setPosition((x, 0, 0))
+            geom = ode.GeomSphere(None, 0.5)
+            geom.setBody(body)
+            self.geoms.append(geom)
+
+    def testCollide(self):
+        buf = ode.ContactBuffer(8)
+        self.assertEqual(buf.getNumContacts(), 0)
+        n = ode.collide(self.geoms[0], self.geoms[1], buf)
+        self.assertTrue(n>=1)
+        self.assertEqual(buf.getNumContacts(), n)
+        self.assertEqual(buf.createJoints(self.world, self.group), n)
+        self.assertEqual(self.group.stats()["joints"], n)
+
+    def testStaleContacts(self):
+        buf = ode.ContactBuffer(8)
+        # Nothing was collided yet, so there are no contacts to use
+        self.assertEqual(buf.createJoints(self.world, self.group), 0)
+        n = ode.collide(self.geoms[0], self.geoms[1], buf)
+        self.assertRaises(IndexError, buf.createJoints, self.world,
+                          self.group, 0, n+1)
+        # A collide() without contacts invalidates the previous ones
+        self.geoms[1].getBody().setPosition((5, 0, 0))
+        self.assertEqual(ode.collide(self.geoms[0], self.geoms[1], buf), 0)
+        self.assertEqual(buf.createJoints(self.world, self.group), 0)
+        self.assertEqual(self.group.addContacts(self.world, buf), 0)
+
+class TestJointBodies(unittest.TestCase):
+    def testGetBody(self):
+        world = ode.World()
+        b1 = ode.Body(world)
+        b2 = ode.Body(world)
+        j = ode.BallJoint(world)
+        j.attach(b1, b2)
+        self.assertTrue(j.getBody(0) is b1)
+        self.assertTrue(j.getBody(1) is b2)
+        j.attach(None, b2)
+        self.assertTrue(j.getBody(0) is None)
+        self.assertTrue(j.getBody(1) is b2)
+        self.assertRaises(IndexError, j.getBody, 2)
+
+def _sliding_box(world, space):
+    """Create a box that slides along a plane (category 0 on category 1).
+    """
+    body = ode.Body(world)
+    m = ode.Mass()
+    m.setBoxTotal(1.0, 1, 1, 1)
+    body.setMass(m)
+    body.setPosition((0, 0.49, 0))
+    body.setLinearVel((2, 0, 0))
+    box = ode.GeomBox(space, (1, 1, 1))
+    box.setBody(body)
+    box.setCategoryBits(1<<0)
+    floor = ode.GeomPlane(space, (0, 1, 0), 0)
+    floor.setCategoryBits(1<<1)
+    return body, box, floor
+
+class TestCollideIntoJointGroup(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.world.setGravity((0, -9.81, 0))
+        self.space = ode.SimpleSpace()
+        self.group = ode.JointGroup()
+        self.body, self.box, self.floor = _sliding_box(self.world, self.space)
+
+    def testJointCount(self):
+        n = self.space.collideIntoJointGroup(self.world, self.group,
+                                             maxcontacts=4)
+        # The box touches the plane with its four bottom corners
+        self.assertEqual(n, 4)
+        self.assertEqual(self.group.stats()["joints"], 4)
+        n = self.space.collideIntoJointGroup(self.world, self.group,
+                                             maxcontacts=1)
+        self.assertEqual(n, 1)
+        self.assertEqual(self.group.stats()["joints"], 5)
+        self.group.empty()
+
+    def testSameBody(self):
+        # Two overlapping geoms of the same body don't create joints
+        space = ode.SimpleSpace()
+        body = ode.Body(self.world)
+        body.setPosition((0, 10, 0))
+        for r in (0.5, 0.4):
+            geom = ode.GeomSphere(space, r)
+            geom.setBody(body)
+        n = space.collideIntoJointGroup(self.world, self.group)
+        self.assertEqual(n, 0)
+
+    def step(self, **kw):
+        for i in range(10):
+            self.space.collideIntoJointGroup(self.world, self.group, **kw)
+            self.world.step(0.01)
+            self.group.empty()
+        return self.body.getLinearVel()[0]
+
+    def testFrictionless(self):
+        # The surface parameters reach the joints: mu=0 lets the box slide
+        self.assertTrue(self.step(mu=0.0, mode=0)>1.9)
+
+    def testFriction(self):
+        self.assertTrue(self.step(mu=ode.Infinity)<1.0)
+
+class TestRaycast(unittest.TestCase):
+    def setUp(self):
+        # Three spheres on the x axis at distances 1.5, 4.5 and 7.5 from
+        # the origin (inserted out of order)
+        self.space = ode.SimpleSpace()
+        self.spheres = {}
+        for x in (5.0, 2.0, 8.0):
+            geom = ode.GeomSphere(self.space, 0.5)
+            geom.setPosition((x, 0, 0))
+            self.spheres[x] = geom
+        # The first ray hits all spheres, the second one misses them
+        self.origins = _doubles([0, 0, 0, 0, 5, 0])
+        self.directions = _doubles([1, 0, 0, 1, 0, 0])
+
+    def testOrdering(self):
+        dist, pts, nrm, idx, geoms = self.space.raycast(
+            self.origins, self.directions, _doubles([20, 20]), max_hits=2)
+        self.assertEqual(len(dist), 2*2)
+        self.assertEqual(len(pts), 2*2*3)
+        self.assertEqual(len(nrm), 2*2*3)
+        self.assertEqual(len(idx), 2*2)
+        # The closest two hits of the first ray sorted by distance
+        self.assertAlmostEqual(dist[0], 1.5)
+        self.assertAlmostEqual(dist[1], 4.5)
+        self.assertAlmostEqual(pts[0], 1.5)
+        self.assertAlmostEqual(pts[3], 4.5)
+        self.assertTrue(geoms[idx[0]] is self.spheres[2.0])
+        self.assertTrue(geoms[idx[1]] is self.spheres[5.0])
+        self.assertEqual(len(geoms), 2)
+
+    def testPadding(self):
+        dist, pts, nrm, idx, geoms = self.space.raycast(
+            self.origins, self.directions, _doubles([20, 20]), max_hits=4)
+        self.assertAlmostEqual(dist[2], 7.5)
+        self.assertTrue(geoms[idx[2]] is self.spheres[8.0])
+        # The first ray has only three hits, the second one none
+        self.assertEqual(list(dist[3:]), [-1.0]*5)
+        self.assertEqual(list(idx[3:]), [-1]*5)
+
+    def testScalarLength(self):
+        # A single length is used for all rays
+        dist, pts, nrm, idx, geoms = self.space.raycast(
+            self.origins, self.directions, 5.0, max_hits=3)
+        self.assertAlmostEqual(dist[0], 1.5)
+        self.assertAlmostEqual(dist[1], 4.5)
+        self.assertEqual(dist[2], -1.0)
+        self.assertEqual(list(dist[3:]), [-1.0]*3)
+
+    def testValidation(self):
+        raycast = self.space.raycast
+        self.assertRaises(ValueError, raycast, _doubles([0, 0]),
+                          self.directions, 1.0)
+        self.assertRaises(ValueError, raycast, self.origins,
+                          _doubles([1, 0, 0]), 1.0)
+        self.assertRaises(ValueError, raycast, self.origins,
+                          self.directions, _doubles([1, 2, 3]))
+        self.assertRaises(ValueError, raycast, self.origins,
+                          self.directions, 1.0, max_hits=0)
+        # No rays
+        res = raycast(_doubles([]), _doubles([]), 1.0)
+        self.assertEqual(len(res[0]), 0)
+        self.assertEqual(res[4], [])
+
+def _pairset(pairs, geoms):
+    """Return the pairs of getCandidatePairs() as a set of geom sets.
+    """
+    return set([frozenset((geoms[pairs[2*i]], geoms[pairs[2*i+1]]))
+                for i in range(len(pairs)//2)])
+
+class TestCandidatePairs(unittest.TestCase):
+    def testEmpty(self):
+        pairs, geoms = ode.SimpleSpace().getCandidatePairs()
+        self.assertEqual(len(pairs), 0)
+        self.assertEqual(geoms, [])
+
+    def testPairs(self):
+        space = ode.SimpleSpace()
+        a = ode.GeomSphere(space, 0.5)
+        b = ode.GeomSphere(space, 0.5)
+        b.setPosition((0.9, 0, 0))
+        c = ode.GeomSphere(space, 0.5)
+        c.setPosition((5, 0, 0))
+        pairs, geoms = space.getCandidatePairs()
+        self.assertEqual(len(pairs), 2)
+        self.assertEqual(_pairset(pairs, geoms), set([frozenset((a, b))]))
+        # Only geoms that appear in a pair are returned
+        self.assertEqual(len(geoms), 2)
+
+    def testNestedSpaces(self):
+        space = ode.SimpleSpace()
+        a = ode.GeomSphere(space, 0.5)
+        sub = ode.SimpleSpace(space)
+        b = ode.GeomSphere(sub, 0.5)
+        c = ode.GeomSphere(sub, 0.5)
+        ode.SimpleSpace(space)
+        pairs, geoms = space.getCandidatePairs()
+        # The pair inside the sub-space is reported and no pair
+        # contains a space (the empty sub-space is skipped)
+        self.assertEqual(_pairset(pairs, geoms),
+                         set([frozenset((a, b)), frozenset((a, c)),
+                              frozenset((b, c))]))
+        self.assertEqual(len(pairs), 2*3)
+        # Disabled sub-spaces are not descended into
+        sub.disable()
+        pairs, geoms = space.getCandidatePairs()
+        self.assertEqual(len(pairs), 0)
+
+    def testBufferGrowth(self):
+        # 12 overlapping geoms produce 66 pairs which is more than the
+        # initial size of the pair buffer
+        space = ode.SimpleSpace()
+        spheres = [ode.GeomSphere(space, 0.5) for i in range(12)]
+        pairs, geoms = space.getCandidatePairs()
+        self.assertEqual(len(pairs), 2*66)
+        self.assertEqual(len(_pairset(pairs, geoms)), 66)
+        self.assertEqual(len(geoms), 12)
+
+class TestCollideContacts(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+
+    def sphere(self, space, x, body=None):
+        if body is None:
+            body = ode.Body(self.world)
+        body.setPosition((x, 0, 0))
+        geom = ode.GeomSphere(space, 0.5)
+        geom.setBody(body)
+        return geom
+
+    def buffers(self, n):
+        return (_doubles([0.0]*3*n), _doubles([0.0]*3*n), _doubles([0.0]*n),
+                _longs([0]*2*n))
+
+    def testEmpty(self):
+        n, geoms = ode.SimpleSpace().collideContacts(*self.buffers(4))
+        self.assertEqual(n, 0)
+        self.assertEqual(geoms, [])
+
+    def testContacts(self):
+        space = ode.SimpleSpace()
+        a = self.sphere(space, 0.0)
+        b = self.sphere(space, 0.9)
+        pos, nrm, dep, pairs = self.buffers(4)
+        n, geoms = space.collideContacts(pos, nrm, dep, pairs)
+        self.assertEqual(n, 1)
+        self.assertAlmostEqual(dep[0], 0.1)
+        self.assertAlmostEqual(abs(nrm[0]), 1.0)
+        self.assertEqual(set([geoms[pairs[0]], geoms[pairs[1]]]), set([a, b]))
+        # Arrays that aren't needed can be omitted
+        n, geoms = space.collideContacts(None, None, dep, None)
+        self.assertEqual(n, 1)
+        self.assertEqual(geoms, [])
+
+    def testSameBody(self):
+        space = ode.SimpleSpace()
+        a = self.sphere(space, 0.0)
+        self.sphere(space, 0.1, a.getBody())
+        n, geoms = space.collideContacts(*self.buffers(4))
+        self.assertEqual(n, 0)
+
+    def testNestedSpaces(self):
+        space = ode.SimpleSpace()
+        sub = ode.SimpleSpace(space)
+        ode.SimpleSpace(space)
+        a = self.sphere(sub, 0.0)
+        b = self.sphere(sub, 0.9)
+        pos, nrm, dep, pairs = self.buffers(4)
+        n, geoms = space.collideContacts(pos, nrm, dep, pairs)
+        self.assertEqual(n, 1)
+        self.assertEqual(set(geoms), set([a, b]))
+
+    def testBufferGrowth(self):
+        # 12 overlapping spheres produce 66 contacts which is more than
+        # the initial size of the contact buffer
+        space = ode.SimpleSpace()
+        for i in range(12):
+            self.sphere(space, 0.05*i)
+        pos, nrm, dep, pairs = self.buffers(100)
+        n, geoms = space.collideContacts(pos, nrm, dep, pairs, maxcontacts=1)
+        self.assertEqual(n, 66)
+        self.assertEqual(len(geoms), 12)
+        self.assertTrue(min(dep[:66])>0.0)
+        # Small arrays only receive the first contacts
+        pos, nrm, dep, pairs = self.buffers(10)
+        n, geoms = space.collideContacts(pos, nrm, dep, pairs, maxcontacts=1)
+        self.assertEqual(n, 66)
+        self.assertTrue(max(pairs)<len(geoms))
+
+    def testMaxContacts(self):
+        space = ode.SimpleSpace()
+        self.assertRaises(ValueError, space.collideContacts, None, None,
+                          None, None, 0)
+
+class TestMaterialCombine(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.geoms = []
+        for x in (0.0, 0.9):
+            body = ode.Body(self.world)
+            body.setPosition((x, 0, 0))
+            geom = ode.GeomSphere(None, 0.5)
+            geom.setBody(body)
+            self.geoms.append(geom)
+
+    def combine(self, m1, m2, rule):
+        """Return the combined contact of two materials.
+        """
+        self.geoms[0].setMaterial(m1)
+        self.geoms[1].setMaterial(m2)
+        buf = ode.ContactBuffer(4)
+        n = ode.collide(self.geoms[0], self.geoms[1], buf)
+        self.assertEqual(n, 1)
+        self.assertEqual(buf.applyMaterials(combine=rule), 1)
+        return buf[0]
+
+    def testRules(self):
+        m1 = ode.Material(mu=1.0, bounce=0.2, soft_cfm=0.01,
+                          mode=ode.ContactBounce)
+        m2 = ode.Material(mu=3.0, bounce=0.6, soft_cfm=0.03,
+                          mode=ode.ContactSoftCFM)
+        for rule, mu, bounce, cfm in [(ode.MaterialCombineAverage, 2.0, 0.4, 0.02),
+                                      (ode.MaterialCombineMin, 1.0, 0.2, 0.01),
+                                      (ode.MaterialCombineMax, 3.0, 0.6, 0.03),
+                                      (ode.MaterialCombineMultiply, 3.0, 0.12, 0.0003)]:
+            c = self.combine(m1, m2, rule)
+            self.assertAlmostEqual(c.getMu(), mu)
+            self.assertAlmostEqual(c.getBounce(), bounce)
+            self.assertAlmostEqual(c.getSoftCFM(), cfm)
+            # The flags are or'ed
+            self.assertEqual(c.getMode(), ode.ContactBounce | ode.ContactSoftCFM)
+
+    def testInfinity(self):
+        inf = ode.Material()
+        zero = ode.Material(mu=0.0)
+        two = ode.Material(mu=2.0)
+        for rule, m, mu in [(ode.MaterialCombineAverage, two, ode.Infinity),
+                            (ode.MaterialCombineMin, two, 2.0),
+                            (ode.MaterialCombineMin, zero, 0.0),
+                            (ode.MaterialCombineMax, zero, ode.Infinity),
+                            (ode.MaterialCombineMultiply, two, ode.Infinity),
+                            (ode.MaterialCombineMultiply, zero, 0.0)]:
+            self.assertEqual(self.combine(inf, m, rule).getMu(), mu)
+            self.assertEqual(self.combine(m, inf, rule).getMu(), mu)
+
+    def testSingleMaterial(self):
+        # The material of the other geom is used unchanged
+        m = ode.Material(mu=5.0, bounce=0.5)
+        for rule in range(4):
+            c = self.combine(m, None, rule)
+            self.assertEqual(c.getMu(), 5.0)
+            self.assertEqual(c.getBounce(), 0.5)
+
+    def testBodyMaterial(self):
+        # The geom material takes precedence over the body material
+        self.geoms[0].getBody().setMaterial(ode.Material(mu=7.0))
+        c = self.combine(None, None, ode.MaterialCombineAverage)
+        self.assertEqual(c.getMu(), 7.0)
+        c = self.combine(ode.Material(mu=1.0), None, ode.MaterialCombineAverage)
+        self.assertEqual(c.getMu(), 1.0)
+
+    def testNoMaterial(self):
+        buf = ode.ContactBuffer(4)
+        ode.collide(self.geoms[0], self.geoms[1], buf)
+        self.assertEqual(buf.applyMaterials(), 0)
+
+    def testNative(self):
+        # The combine rule of the space is used by collideStep()
+        world = ode.World()
+        world.setGravity((0, -9.81, 0))
+        space = ode.SimpleSpace()
+        group = ode.JointGroup()
+        body, box, floor = _sliding_box(world, space)
+        box.setMaterial(ode.Material(mu=0.0))
+        floor.setMaterial(ode.Material())
+        space.setMaterialCombine(ode.MaterialCombineMultiply)
+        self.assertEqual(space.getMaterialCombine(), ode.MaterialCombineMultiply)
+        self.assertRaises(ValueError, space.setMaterialCombine, 4)
+        world.collideStep(space, group, 0.01, steps=10)
+        self.assertTrue(body.getLinearVel()[0]>1.9)
+        space.setMaterialCombine(ode.MaterialCombineMax)
+        world.collideStep(space, group, 0.01, steps=10)
+        self.assertTrue(body.getLinearVel()[0]<1.0)
+
+class TestPointDepths(unittest.TestCase):
+    def check(self, geom, points, expected):
+        res = geom.pointDepths(_doubles(points))
+        self.assertEqual(len(res), len(expected))
+        for i, d in enumerate(expected):
+            self.assertAlmostEqual(res[i], d)
+            # Same result as the single point version
+            self.assertAlmostEqual(res[i], geom.pointDepth(points[3*i:3*i+3]))
+
+    def testGeoms(self):
+        sphere = ode.GeomSphere(None, 1.0)
+        sphere.setPosition((1, 0, 0))
+        self.check(sphere, [1, 0, 0, 1.5, 0, 0, 3, 0, 0], [1.0, 0.5, -1.0])
+        box = ode.GeomBox(None, (2, 2, 2))
+        self.check(box, [0, 0, 0, 0.5, 0, 0, 0, 0.8, 0], [1.0, 0.5, 0.2])
+        plane = ode.GeomPlane(None, (0, 1, 0), 0)
+        self.check(plane, [0, 2, 0, 5, -1, 5], [-2.0, 1.0])
+        capsule = ode.GeomCapsule(None, 0.5, 2.0)
+        self.check(capsule, [0, 0, 0, 0, 0, 1.25, 0, 0.25, -1],
+                   [0.5, 0.25, 0.25])
+
+    def testOut(self):
+        sphere = ode.GeomSphere(None, 1.0)
+        out = _doubles([0.0]*2)
+        self.assertTrue(sphere.pointDepths(_doubles([0, 0, 0, 2, 0, 0]), out) is out)
+        self.assertEqual(list(out), [1.0, -1.0])
+        self.assertEqual(len(sphere.pointDepths(_doubles([]))), 0)
+        self.assertRaises(ValueError, sphere.pointDepths, _doubles([0, 0]))
+        self.assertRaises(ValueError, sphere.pointDepths, _doubles([0, 0, 0]),
+                          _doubles([0.0]*2))
+
+    def testSpace(self):
+        space = ode.SimpleSpace()
+        self.assertEqual(list(space.pointDepths(_doubles([0, 0, 0]))),
+                         [-ode.Infinity])
+        sphere = ode.GeomSphere(space, 1.0)
+        sphere.setPosition((0, 2, 0))
+        # Planes in nested spaces are used, rays are ignored
+        sub = ode.SimpleSpace(space)
+        ode.GeomPlane(sub, (0, 1, 0), 0)
+        ode.GeomRay(space, 10.0)
+        # Disabled geoms are ignored
+        box = ode.GeomBox(space, (10, 10, 10))
+        box.disable()
+        res = space.pointDepths(_doubles([0, 2.5, 0, 0, -1, 0, 0, 5, 0]))
+        # The largest depth of all geoms
+        self.assertAlmostEqual(res[0], 0.5)
+        self.assertAlmostEqual(res[1], 1.0)
+        self.assertAlmostEqual(res[2], -2.0)
+        # Disabled sub-spaces are skipped
+        sub.disable()
+        res = space.pointDepths(_doubles([0, -1, 0]))
+        self.assertAlmostEqual(res[0], -2.0)
+
+class TestSpaceAABBs(unittest.TestCase):
+    def setUp(self):
+        self.space = ode.SimpleSpace()
+        self.sphere = ode.GeomSphere(self.space, 0.5)
+        self.sphere.setPosition((1, 2, 3))
+        self.box = ode.GeomBox(self.space, (2, 4, 6))
+
+    def testGeoms(self):
+        geoms = self.space.geoms()
+        self.assertEqual(len(geoms), 2)
+        self.assertEqual(set(geoms), set([self.sphere, self.box]))
+        for i, g in enumerate(geoms):
+            self.assertTrue(g is self.space.getGeom(i))
+        self.assertEqual(ode.SimpleSpace().geoms(), [])
+
+    def testAABBs(self):
+        aabbs = self.space.getAABBs()
+        self.assertEqual(len(aabbs), 2*6)
+        expected = {self.sphere: [0.5, 1.5, 1.5, 2.5, 2.5, 3.5],
+                    self.box: [-1, 1, -2, 2, -3, 3]}
+        # The rows are in space order
+        for i in range(2):
+            g = self.space.getGeom(i)
+            self.assertEqual(list(aabbs[6*i:6*i+6]), expected[g])
+            self.assertEqual(tuple(aabbs[6*i:6*i+6]), g.getAABB())
+
+    def testOut(self):
+        out = _doubles([0.0]*12)
+        res, geoms = self.space.getAABBs(out, geoms=True)
+        self.assertTrue(res is out)
+        self.assertEqual(geoms, self.space.geoms())
+        self.assertRaises(ValueError, self.space.getAABBs, _doubles([0.0]*6))
+        self.assertEqual(len(ode.SimpleSpace().getAABBs()), 0)
+
+class TestSpaceIteration(unittest.TestCase):
+    def testIteration(self):
+        space = ode.SimpleSpace()
+        self.assertEqual(list(space), [])
+        geoms = [ode.GeomSphere(space, 0.5) for i in range(5)]
+        sub = ode.SimpleSpace(space)
+        self.assertEqual(len(space), 6)
+        # Iteration yields the same geoms in the same order as geoms()
+        # (nested spaces are returned as geoms, not descended into)
+        res = list(space)
+        self.assertEqual(res, space.geoms())
+        self.assertEqual(set(res), set(geoms+[sub]))
+        self.assertTrue(res[0] is space.getGeom(0))
+
+    def testKeepAlive(self):
+        space = ode.SimpleSpace()
+        geom = ode.GeomSphere(space, 0.5)
+        it = iter(space)
+        del space
+        self.assertTrue(next(it) is geom)
+        self.assertRaises(StopIteration, next, it)
+
+class TestCollideFilter(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.space = ode.SimpleSpace()
+
+    def geom(self, body=None, x=0.0):
+        geom = ode.GeomSphere(self.space, 0.5)
+        if body is not None:
+            geom.setBody(body)
+        geom.setPosition((x, 0, 0))
+        return geom
+
+    def body(self):
+        return ode.Body(self.world)
+
+    def pairs(self, filter):
+        res = []
+        self.space.collide(None, lambda arg, g1, g2: res.append((g1, g2)),
+                           filter)
+        return len(res)
+
+    def testNoFilter(self):
+        self.geom()
+        self.geom()
+        self.assertEqual(self.pairs(0), 1)
+
+    def testSameBody(self):
+        b = self.body()
+        self.geom(b)
+        self.geom(b, 0.1)
+        self.assertEqual(self.pairs(ode.FilterSameBody), 0)
+        self.assertEqual(self.pairs(ode.FilterConnected | ode.FilterStatic), 1)
+
+    def testConnected(self):
+        b1 = self.body()
+        b2 = self.body()
+        self.geom(b1)
+        self.geom(b2, 0.1)
+        self.assertEqual(self.pairs(ode.FilterConnected), 1)
+        j = ode.BallJoint(self.world)
+        j.attach(b1, b2)
+        self.assertEqual(self.pairs(ode.FilterConnected), 0)
+        self.assertEqual(self.pairs(ode.FilterSameBody), 1)
+        # Contact joints don't count as a connection
+        j.attach(None, None)
+        cj = ode.ContactJoint(self.world, None, ode.Contact())
+        cj.attach(b1, b2)
+        self.assertEqual(self.pairs(ode.FilterConnected), 1)
+
+    def testDisabled(self):
+        b1 = self.body()
+        b2 = self.body()
+        self.geom(b1)
+        self.geom(b2, 0.1)
+        b1.disable()
+        self.assertEqual(self.pairs(ode.FilterDisabled), 1)
+        b2.disable()
+        self.assertEqual(self.pairs(ode.FilterDisabled), 0)
+        self.assertEqual(self.pairs(ode.FilterStatic), 1)
+        # A disabled body against a static geom can't move either, so
+        # only the two pairs with the enabled body remain
+        b2.enable()
+        self.geom(None, -0.1)
+        self.assertEqual(self.pairs(ode.FilterDisabled), 2)
+
+    def testStatic(self):
+        self.geom()
+        self.geom()
+        self.assertEqual(self.pairs(ode.FilterStatic), 0)
+        self.assertEqual(self.pairs(ode.FilterDisabled), 0)
+        self.assertEqual(self.pairs(ode.FilterSameBody | ode.FilterConnected), 1)
+        # Only one of the geoms is static
+        self.geom(self.body(), 0.1)
+        self.assertEqual(self.pairs(ode.FilterStatic), 2)
+
+    def testSpacePairs(self):
+        # Pairs that contain a space reach the callback unfiltered
+        space = self.space
+        self.space = ode.SimpleSpace()
+        self.geom()
+        self.space.add(space)
+        ode.GeomSphere(space, 0.5)
+        ode.GeomSphere(space, 0.5)
+        self.assertEqual(self.pairs(ode.FilterStatic), 1)
+
+    def testCollide2(self):
+        b = self.body()
+        g1 = self.geom(b)
+        g2 = self.geom(b, 0.1)
+        res = []
+        cb = lambda arg, g1, g2: res.append((g1, g2))
+        ode.collide2(g1, g2, None, cb)
+        self.assertEqual(len(res), 1)
+        ode.collide2(g1, g2, None, cb, ode.FilterSameBody)
+        self.assertEqual(len(res), 1)
+
+class TestCollisionMatrix(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.world.setGravity((0, -9.81, 0))
+        self.space = ode.SimpleSpace()
+        self.group = ode.JointGroup()
+        self.body, self.box, self.floor = _sliding_box(self.world, self.space)
+        self.matrix = ode.CollisionMatrix(4)
+        self.space.setCollisionMatrix(self.matrix)
+
+    def pairs(self):
+        res = []
+        self.space.collide(None, lambda arg, g1, g2: res.append((g1, g2)))
+        return res
+
+    def testDisabledPython(self):
+        self.assertEqual(len(self.pairs()), 1)
+        self.matrix.setEnabled(0, 1, False)
+        self.assertFalse(self.matrix.isEnabled(1, 0))
+        self.assertEqual(self.pairs(), [])
+        self.space.setCollisionMatrix(None)
+        self.assertEqual(len(self.pairs()), 1)
+
+    def testDisabledNative(self):
+        self.matrix.setEnabled(0, 1, False)
+        n = self.space.collideIntoJointGroup(self.world, self.group)
+        self.assertEqual(n, 0)
+        self.matrix.setEnabled(0, 1, True)
+        n = self.space.collideIntoJointGroup(self.world, self.group)
+        self.assertTrue(n>=1)
+
+    def testSurfaceNative(self):
+        # The template has infinite friction, the matrix cell none
+        c = ode.Contact()
+        c.setMode(0)
+        c.setMu(0.0)
+        self.matrix.setSurface(0, 1, c)
+        self.assertEqual(self.matrix.getSurface(1, 0).getMu(), 0.0)
+        self.world.collideStep(self.space, self.group, 0.01, steps=10)
+        self.assertTrue(self.body.getLinearVel()[0]>1.9)
+        # Without the custom surface the box is stopped by the friction
+        self.matrix.setSurface(0, 1, None)
+        self.world.collideStep(self.space, self.group, 0.01, steps=10)
+        self.assertTrue(self.body.getLinearVel()[0]<1.0)
+
+    def testSurfacePython(self):
+        # The Python path passes the pair on but doesn't apply the
+        # surface parameters of the matrix
+        c = ode.Contact()
+        c.setMu(0.0)
+        self.matrix.setSurface(0, 1, c)
+        pairs = self.pairs()
+        self.assertEqual(len(pairs), 1)
+        contacts = ode.collide(pairs[0][0], pairs[0][1])
+        self.assertTrue(contacts[0].getMu()>1e10)
+
+class TestAddContacts(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.group = ode.JointGroup()
+        self.b1 = ode.Body(self.world)
+        self.b2 = ode.Body(self.world)
+        self.bodies = ode.BodySet([self.b1, self.b2])
+
+    def addContacts(self, pairs, bodies=None, **kw):
+        if bodies is None:
+            bodies = self.bodies
+        n = len(pairs)//2
+        contacts = (_doubles([0.0]*(3*n)), _doubles([0.0, 0.0, 1.0]*n),
+                    _doubles([0.01]*n))
+        return self.group.addContacts(self.world, contacts, _longs(pairs),
+                                      bodies, **kw)
+
+    def testCreate(self):
+        n = self.addContacts([0, 1, 1, -1])
+        self.assertEqual(n, 2)
+        self.assertEqual(self.group.stats()["joints"], 2)
+        self.group.empty()
+        self.assertEqual(self.group.stats()["joints"], 0)
+
+    def testCount(self):
+        self.assertEqual(self.addContacts([0, 1, 1, -1], count=1), 1)
+
+    def testIndexOutOfRange(self):
+        self.assertRaises(IndexError, self.addContacts, [0, 2])
+        self.assertEqual(self.group.stats()["joints"], 0)
+
+    def testSameBody(self):
+        self.assertRaises(ValueError, self.addContacts, [0, 1, 1, 1])
+        self.assertEqual(self.group.stats()["joints"], 0)
+
+    def testForeignBody(self):
+        other = ode.Body(ode.World())
+        bodies = ode.BodySet([self.b1, other])
+        self.assertRaises(ValueError, self.addContacts, [0, 1], bodies)
+
+    def testBufferSameBody(self):
+        # Two geoms on the same body: ODE would abort on the joint
+        body = ode.Body(self.world)
+        g1 = ode.GeomSphere(None, 0.5)
+        g2 = ode.GeomSphere(None, 0.5)
+        g1.setBody(body)
+        g2.setBody(body)
+        buf = ode.ContactBuffer(8)
+        self.assertTrue(ode.collide(g1, g2, buf)>=1)
+        self.assertEqual(self.group.addContacts(self.world, buf), 0)
+        self.assertEqual(buf.createJoints(self.world, self.group), 0)
+        self.assertEqual(self.group.stats()["joints"], 0)
+
+    def testBufferWithPairs(self):
+        buf = ode.ContactBuffer(4)
+        self.assertRaises(TypeError, self.group.addContacts, self.world,
+                          buf, _longs([0, 1]))
+        self.assertRaises(TypeError, self.group.addContacts, self.world,
+                          buf, contact=ode.Contact())
+
+def _build_drop(world, space):
+    """Build function for WorldBatch: a sphere falling onto a plane."""
+    world.setGravity((0, -9.81, 0))
+    body = ode.Body(world)
+    m = ode.Mass()
+    m.setSphere(1000.0, 0.5)
+    body.setMass(m)
+    body.setPosition((0, 0.45, 0))
+    geom = ode.GeomSphere(space, 0.5)
+    geom.setBody(body)
+    floor = ode.GeomPlane(space, (0, 1, 0), 0)
+    return [body], [geom, floor]
+
+class TestWorldBatch(unittest.TestCase):
+    def testStep(self):
+        batch = ode.WorldBatch(3, _build_drop)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.getNumBodies(), 1)
+        n = batch.step(0.01, steps=2)
+        # Every sphere touches the plane in both steps
+        self.assertTrue(n>=6)
+        for jg in batch.jointgroups:
+            self.assertEqual(jg.stats()["joints"], 0)
+            self.assertTrue(jg.stats()["peak_joints"]>=1)
+
+    def testStepThreads(self):
+        batch = ode.WorldBatch(4, _build_drop)
+        n1 = batch.step(0.01, threads=2)
+        n2 = batch.step(0.01, threads=2)
+        self.assertTrue(n1>=4 and n2>=4)
+        batch.close()
+        self.assertTrue(batch.step(0.01)>=4)
+
+    def testObjectsKept(self):
+        batch = ode.WorldBatch(2, _build_drop)
+        self.assertEqual(len(batch.objects), 2)
+        for space in batch.spaces:
+            self.assertEqual(space.getNumGeoms(), 2)
+
+    def testBodyCountMismatch(self):
+        worlds = []
+        def build(world, space):
+            worlds.append(world)
+            return [ode.Body(world) for i in range(len(worlds))]
+        self.assertRaises(ValueError, ode.WorldBatch, 2, build)
+
+class TestConcurrentCollision(unittest.TestCase):
+    # These tests need an ODE library that supports collision detection
+    # in several threads at the same time (see the module docs).
+
+    def batch(self, n):
+        batch = ode.WorldBatch(n, _build_drop)
+        # Start the spheres at different heights so that the worlds
+        # collide at different times
+        batch.setState(_doubles(sum([[0, 0.45+0.1*i, 0] for i in range(n)], [])),
+                       ode.StatePosition)
+        return batch
+
+    def testBatchThreads(self):
+        # Stepping with workers gives the same result as stepping the
+        # worlds one after another
+        ref = self.batch(6)
+        batch = self.batch(6)
+        for i in range(10):
+            n1 = ref.step(0.01, steps=2)
+            n2 = batch.step(0.01, steps=2, threads=3)
+            self.assertEqual(n1, n2)
+        self.assertEqual(list(batch.getState()), list(ref.getState()))
+        self.assertTrue(n1>=6)
+        batch.close()
+
+    def testPythonThreads(self):
+        def drop(height):
+            world = ode.World()
+            space = ode.HashSpace()
+            group = ode.JointGroup()
+            [body], geoms = _build_drop(world, space)
+            body.setPosition((0, height, 0))
+            n = world.collideStep(space, group, 0.01, steps=50)
+            return n, body.getPosition()
+
+        def run(height, results):
+            results[height] = (ode.AllocateODEDataForThread(), drop(height))
+
+        # Every thread steps its own world
+        heights = [0.45+0.1*i for i in range(4)]
+        results = {}
+        threads = [threading.Thread(target=run, args=(h, results))
+                   for h in heights]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for h in heights:
+            self.assertEqual(results[h], (True, drop(h)))
+
+class TestJointFeedbackSet(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.world.setGravity((0, -9.81, 0))
+        self.joints = []
+        for x in (0.0, 2.0):
+            body = ode.Body(self.world)
+            m = ode.Mass()
+            m.setSphereTotal(2.0*(x+1), 0.5)
+            body.setMass(m)
+            body.setPosition((x, 0, 0))
+            j = ode.BallJoint(self.world)
+            j.attach(body, None)
+            j.setAnchor((x, 0, 0))
+            self.joints.append(j)
+        self.set = ode.JointFeedbackSet(self.joints)
+
+    def testGetFeedback(self):
+        self.world.step(0.01)
+        fb = self.set.getFeedback()
+        self.assertEqual(len(fb), 2*12)
+        # Each row matches the feedback of the joint
+        for i, j in enumerate(self.joints):
+            f1, t1, f2, t2 = j.getFeedback()
+            self.assertEqual(tuple(fb[12*i:12*i+3]), f1)
+            self.assertEqual(tuple(fb[12*i+3:12*i+6]), t1)
+        # The heavier body needs the larger holding force
+        self.assertTrue(fb[12+1]>fb[1]>0.0)
+        out = array.array("d", [0.0]*24)
+        self.assertTrue(self.set.getFeedback(out) is out)
+        self.assertEqual(list(out), list(fb))
+        self.assertRaises(ValueError, self.set.getFeedback,
+                          array.array("d", [0.0]*12))
+
+    def testBuffer(self):
+        self.assertEqual(len(self.set), 2)
+        self.assertTrue(self.set.getItemSize() in (4, 8))
+
+    def testRelease(self):
+        del self.set
+        # The joints don't have a buffer of their own
+        self.assertEqual(self.joints[0].getFeedback(), None)
+
+class TestBreakThresholds(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.world.setGravity((0, -9.81, 0))
+        self.body = ode.Body(self.world)
+        m = ode.Mass()
+        m.setSphereTotal(10.0, 0.5)
+        self.body.setMass(m)
+        self.joint = ode.BallJoint(self.world)
+        self.joint.attach(self.body, None)
+        self.joint.setAnchor((0, 0, 0))
+
+    def testBreak(self):
+        self.joint.setBreakThresholds(maxforce=1.0)
+        self.assertEqual(self.joint.getBreakThresholds(), (1.0, None))
+        self.world.step(0.01)
+        self.assertEqual(self.world.getBrokenJoints(), [self.joint])
+        self.assertFalse(self.joint.isEnabled())
+        # The list is cleared and a broken joint isn't reported again
+        self.world.step(0.01)
+        self.assertEqual(self.world.getBrokenJoints(), [])
+
+    def testNoBreak(self):
+        self.joint.setBreakThresholds(maxforce=1000.0, maxtorque=1000.0)
+        self.world.quickStep(0.01)
+        self.assertEqual(self.world.getBrokenJoints(), [])
+        self.assertTrue(self.joint.isEnabled())
+
+    def testUnbreakable(self):
+        self.joint.setBreakThresholds(maxforce=1.0)
+        self.joint.setBreakThresholds(None, None)
+        self.assertEqual(self.joint.getBreakThresholds(), None)
+        self.world.step(0.01)
+        self.assertEqual(self.world.getBrokenJoints(), [])
+
+    def testCollideStep(self):
+        space = ode.SimpleSpace()
+        group = ode.JointGroup()
+        self.joint.setBreakThresholds(maxforce=1.0)
+        self.world.collideStep(space, group, 0.01, steps=3)
+        self.assertEqual(self.world.getBrokenJoints(), [self.joint])
+
+    def testFeedbackSet(self):
+        # The thresholds use the feedback block of a JointFeedbackSet
+        fb = ode.JointFeedbackSet([self.joint])
+        self.joint.setBreakThresholds(maxforce=1000.0)
+        self.world.step(0.01)
+        self.assertEqual(self.world.getBrokenJoints(), [])
+        # force1 holds the body against gravity
+        self.assertTrue(fb.getFeedback()[1]>1.0)
+        # After the set is gone the joint still has feedback and breaks
+        del fb
+        self.assertTrue(self.joint.getFeedback() is not None)
+        self.joint.setBreakThresholds(maxforce=1.0)
+        self.world.step(0.01)
+        self.assertEqual(self.world.getBrokenJoints(), [self.joint])
+
+    def testJointGroup(self):
+        group = ode.JointGroup()
+        j = ode.BallJoint(self.world, group)
+        self.assertRaises(ValueError, j.setBreakThresholds, 1.0)
+
+    def testNegative(self):
+        self.assertRaises(ValueError, self.joint.setBreakThresholds, -1.0)
+
+class TestJointSet(unittest.TestCase):
+    def setUp(self):
+        self.world = ode.World()
+        self.joints = []
+        for i in range(3):
+            b1 = ode.Body(self.world)
+            b2 = ode.Body(self.world)
+            j = ode.Hinge2Joint(self.world)
+            j.attach(b1, b2)
+            self.joints.append(j)
+        self.set = ode.JointSet(self.joints)
+
+    def testSetParam(self):
+        self.set.setParam(ode.ParamVel, _doubles([1.0, 2.0, 3.0]))
+        self.assertEqual([j.getParam(ode.ParamVel) for j in self.joints],
+                         [1.0, 2.0, 3.0])
+        self.assertEqual(list(self.set.getParam(ode.ParamVel)),
+                         [1.0, 2.0, 3.0])
+
+    def testScalar(self):
+        self.set.setParam(ode.ParamFMax2, 50.0)
+        self.assertEqual(list(self.set.getParam(ode.ParamFMax2)),
+                         [50.0]*3)
+        # The first axis is not affected
+        self.assertEqual(list(self.set.getParam(ode.ParamFMax)), [0.0]*3)
+
+    def testOut(self):
+        self.joints[1].setParam(ode.ParamLoStop, -0.5)
+        out = _doubles([9.0]*3)
+        self.assertTrue(self.set.getParam(ode.ParamLoStop, out) is out)
+        self.assertEqual(out[1], -0.5)
+
+    def testWrongSize(self):
+        self.assertRaises(ValueError, self.set.setParam, ode.ParamVel,
+                          _doubles([1.0, 2.0]))
+        self.assertRaises(ValueError, self.set.getParam, ode.ParamVel,
+                          _doubles([0.0]*4))
+
+    def testInvalidJoints(self):
+        group = ode.JointGroup()
+        self.assertRaises(ValueError, ode.JointSet,
+                          [ode.HingeJoint(self.world, group)])
+        self.assertRaises(TypeError, ode.JointSet,
+                          [ode.ContactJoint(self.world, None, ode.Contact())])
+        self.assertRaises(TypeError, ode.JointSet, [None])
+
+if (__name__ == '__main__'):
+    unittest.main()
@@ -393,6 +393,18 @@ class TestSpaceParser(TestParser):
         self.root3 = self.p3.parseString(doc)
         self.quadSpace = self.root3.namedChild('space1').getODEObject()
 
+        doc = '''<?xml version="1.0" encoding="iso-8859-1"?>
+        <xode><world>
+          <space name="space1" type="sap" axes="xyz"/>
+          <space name="space2" type="hash"/>
+        </world></xode>
+        '''
+
+        self.p4 = parser.Parser()
+        self.root4 = self.p4.parseString(doc)
+        self.sapSpace = self.root4.namedChild('space1').getODEObject()
+        self.typedHashSpace = self.root4.namedChild('space2').getODEObject()
+
     def testSimpleInstance(self):
         self.assert_(isinstance(self.simpleSpace, ode.SimpleSpace))
 
@@ -402,10 +414,31 @@ class TestSpaceParser(TestParser):
     def testQuadInstance(self):
         self.assert_(isinstance(self.quadSpace, ode.QuadTreeSpace))
 
+    def testSAPInstance(self):
+        self.assert_(isinstance(self.sapSpace, ode.SweepAndPruneSpace))
+
+    def testTypeAttribute(self):
+        self.assert_(isinstance(self.typedHashSpace, ode.HashSpace))
+
+    def testInvalidType(self):
+        doc = '''<?xml version="1.0" encoding="iso-8859-1"?>
+        <xode><world><space type="octree"/></world></xode>
+        '''
+        self.assertRaises(errors.InvalidError, parser.Parser().parseString,
+                          doc)
+
+    def testInvalidAxes(self):
+        doc = '''<?xml version="1.0" encoding="iso-8859-1"?>
+        <xode><world><space type="sap" axes="xxy"/></world></xode>
+        '''
+        self.assertRaises(errors.InvalidError, parser.Parser().parseString,
+                          doc)
+
     def testSpaceBase(self):
         self.assert_(isinstance(self.simpleSpace, ode.SpaceBase))
         self.assert_(isinstance(self.hashSpace, ode.SpaceBase))
         self.assert_(isinstance(self.quadSpace, ode.SpaceBase))
+        self.assert_(isinstance(self.sapSpace, ode.SpaceBase))
 
 class TestBodyParser(TestParser):
     def setUp(self):
@@ -111,6 +111,18 @@ class Parser:
         |
         | p = parser.Parser()
         | p.setParams(spaceFactory=makeSpace)
+
+    Space types
+    ===========
+
+    The class of a space can also be selected in the XODE file with the
+    C{type} attribute of the <space> tag, which overrides
+    C{spaceFactory}. Valid types are C{simple} (L{ode.SimpleSpace}),
+    C{hash} (L{ode.HashSpace}) and C{sap} (L{ode.SweepAndPruneSpace}).
+    The axis order of a sweep and prune space can be set with the
+    C{axes} attribute (e.g. C{axes="zyx"}, the default is C{xzy})::
+
+        | <space name="corridor" type="sap" axes="xyz">
     """
 
     def __init__(self):
@@ -292,7 +304,7 @@ class World(node.TreeNode):
             t.takeParser(self._parser, self, attrs)
         elif (name == 'space'):
             space = Space(nodeName, self)
-            space.takeParser(self._parser)
+            space.takeParser(self._parser, attrs)
         elif (name == 'ext'):
             pass
         else:
@@ -310,16 +322,39 @@ class Space(node.TreeNode):
     def __init__(self, name, parent):
         node.TreeNode.__init__(self, name, parent)
 
-    def takeParser(self, parser):
+    def takeParser(self, parser, attrs=None):
         """
         Handles further parsing. It should be called immediately after the
         <space> tag is encountered.
 
         @param parser: The parser.
         @type parser: instance of L{Parser}
+
+        @param attrs: The attributes of the <space> tag.
+        @type attrs: dict
         """
 
-        self.setODEObject(parser.getParam('spaceFactory')())
+        if (attrs is None):
+            attrs = {}
+
+        spaceType = attrs.get('type', None)
+        if (spaceType is None):
+            self.setODEObject(parser.getParam('spaceFactory')())
+        elif (spaceType == 'simple'):
+            self.setODEObject(ode.SimpleSpace())
+        elif (spaceType == 'hash'):
+            self.setODEObject(ode.HashSpace())
+        elif (spaceType == 'sap'):
+            axes = attrs.get('axes', 'xzy')
+            try:
+                axisOrder = getattr(ode, 'SAPAxes' + axes.upper())
+            except AttributeError:
+                raise errors.InvalidError("Invalid axes attribute '%s'." % \
+                                          axes)
+            self.setODEObject(ode.SweepAndPruneSpace(axisOrder))
+        else:
+            raise errors.InvalidError("Space type must be 'simple', 'hash'"\
+                                      " or 'sap'.")
         
         self._parser = parser
         self._parser.push(startElement=self._startElement,